@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,22 +47,35 @@ INSTALLED_APPS = [
 ]
 
 REST_FRAMEWORK = {
+    # Validates JWTs without touching the database (property/authentication.py).
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'property.authentication.StatelessJWTAuthentication',
     )
 }
 
-# AUTHENTICATION_BACKENDS = [
-#     'django.contrib.auth.backends.ModelBackend',
-# ]
+# Keyset pagination for the property list endpoint
+PROPERTY_PAGE_SIZE = 20
+PROPERTY_MAX_PAGE_SIZE = 100
+
+# Write-behind buffer for Property.views (see property/view_counter.py)
+PROPERTY_VIEW_FLUSH_INTERVAL = 10
+PROPERTY_VIEW_FLUSH_ON_ERROR = 'requeue'
+PROPERTY_VIEW_MAX_PENDING = 5000
+
+# Same checks as ModelBackend; also loads the profile for the login response.
+AUTHENTICATION_BACKENDS = [
+    'property.backends.ProfileModelBackend',
+]
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
+    'TOKEN_USER_CLASS': 'property.authentication.ProfileTokenUser',
 }
 
 MIDDLEWARE = [
+    'property.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -95,13 +109,103 @@ WSGI_APPLICATION = 'properties.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connection pragmas and read routing are set up in property/database.py.
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 5,
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Read-only connection to the same file, used when PROPERTY_SQLITE_READ_REPLICA is on.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': (BASE_DIR / 'db.sqlite3').as_uri() + '?mode=ro',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['property.database.ReadReplicaRouter']
+
+# The journal mode is written into the database file, so it is left to the
+# deployment (e.g. PROPERTY_SQLITE_JOURNAL_MODE=WAL) rather than applied to
+# the development database.
+PROPERTY_SQLITE_JOURNAL_MODE = os.environ.get('PROPERTY_SQLITE_JOURNAL_MODE') or None
+PROPERTY_SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'cache_size': -20000,  # KiB
+    'mmap_size': 134217728,
+    'temp_store': 'MEMORY',
+}
+PROPERTY_SQLITE_READ_REPLICA = False
+
+
+# Rows fetched per query by the streaming catalogue export
+PROPERTY_EXPORT_CHUNK_SIZE = 2000
+
+# Resized image variants (property/thumbnails.py)
+PROPERTY_IMAGE_VARIANTS = {'thumb': 320, 'medium': 800, 'large': 1600}
+PROPERTY_IMAGE_FORMATS = ['webp', 'jpeg']
+PROPERTY_IMAGE_WORKERS = None
+PROPERTY_IMAGE_ASYNC = True
+PROPERTY_IMAGE_BATCH_MAX_FILES = 50
+
+# Proximity search (property/geo.py)
+PROPERTY_GEO_DEFAULT_RADIUS_KM = 5
+PROPERTY_GEO_MAX_RADIUS_KM = 50
+PROPERTY_GEO_MAX_BBOX_DEGREES = 1
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Swap in FileBasedCache or RedisCache to share entries between workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'properties',
     }
 }
 
+# Response cache for the property/location read endpoints (property/response_cache.py)
+PROPERTY_RESPONSE_CACHE_ENABLED = True
+PROPERTY_RESPONSE_CACHE_TIMEOUT = 300
+
+# Facet counts per filter signature (property/facets.py)
+PROPERTY_FACET_CACHE_TIMEOUT = 300
+
+# Chunked mass deletes (property/mass_delete.py)
+PROPERTY_DELETE_CHUNK_SIZE = 500
+PROPERTY_DELETE_FILES_ASYNC = True
+
+# Property <-> amenity links per batch request (property/amenity_links.py)
+PROPERTY_AMENITY_BATCH_MAX = 500
+
+# Per-user favorite id sets (property/favorites.py)
+PROPERTY_FAVORITES_CACHE_TIMEOUT = 600
+PROPERTY_FAVORITES_MAX_BATCH = 200
+
+# Owner/manager inquiry inbox (property/inbox.py)
+PROPERTY_INBOX_MAX_BATCH = 200
+
+# Changelist counts in the admin (property/admin.py)
+PROPERTY_ADMIN_COUNT_LIMIT = 10000
+
+# In-process location get-or-create resolver (property/locations.py)
+PROPERTY_LOCATION_CACHE_SIZE = 4096
+PROPERTY_LOCATION_CACHE_TIMEOUT = 300
+
+# Per-route request metrics served at /metrics (property/metrics.py)
+PROPERTY_METRICS_ENABLED = True
+PROPERTY_METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+PROPERTY_METRICS_REPEATED_QUERY_THRESHOLD = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
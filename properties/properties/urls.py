@@ -1,17 +1,54 @@
 from django.contrib import admin
-from django.urls import path
-from property.views import RegisterView, CustomTokenObtainPairView
+from django.urls import include, path
+from property.views import RegisterView, CustomTokenObtainPairView, LogoutView, RevocableTokenRefreshView
+from property.Amenity_views import AmenityView
+from property.browse_view import LocationBrowseView
 from property.location_view import LocationView
+from property.metrics import metrics_view
+from property.PropertyImageviews import PropertyImageBatchView
 from property.views import PropertyView  
+from property.views import FavoriteBulkView, FavoriteLookupView, FavoriteView, InquiryView
+from property.inbox_view import InquiryInboxView, InquiryStatusView, InquiryUnreadView
+from property.export_view import PropertyExportView
+from property.import_view import PropertyImportView
+from property.search_view import (
+    PropertyFacetView, PropertyNearbyView, PropertySearchView, PropertyTextSearchView,
+)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
+    path('', include('property.urls')),
     path('api/properties/', PropertyView.as_view(), name='property-list'),
+    path('api/properties/search/', PropertySearchView.as_view(), name='property-search'),
+    path('api/properties/search/text/', PropertyTextSearchView.as_view(), name='property-text-search'),
+    path('api/properties/search/facets/', PropertyFacetView.as_view(), name='property-facets'),
+    path('api/properties/nearby/', PropertyNearbyView.as_view(), name='property-nearby'),
+    path('api/properties/export/', PropertyExportView.as_view(), name='property-export'),
+    path('api/properties/import/', PropertyImportView.as_view(), name='property-import'),
     path('api/property/<int:pk>/', PropertyView.as_view(), name='Property-detail'),
+    path('api/property/<int:pk>/images/', PropertyImageBatchView.as_view(), name='property-image-batch'),
 
     path('api/locations/', LocationView.as_view(), name='locations-list'),
     path('api/location/<int:pk>/', LocationView.as_view(), name='location-detail'),
+    path('api/locations/browse/', LocationBrowseView.as_view(), name='location-browse'),
+
+    path('api/amenities/', AmenityView.as_view(), name='amenity-list'),
+    path('api/amenity/<int:pk>/', AmenityView.as_view(), name='amenity-detail'),
+
+    path('api/favorites/', FavoriteView.as_view(), name='favorite-list'),
+    path('api/favorites/ids/', FavoriteLookupView.as_view(), name='favorite-lookup'),
+    path('api/favorites/bulk/', FavoriteBulkView.as_view(), name='favorite-bulk'),
+    path('api/favorite/<int:pk>/', FavoriteView.as_view(), name='favorite-detail'),
+
+    path('api/inquiries/', InquiryView.as_view(), name='inquiry-list'),
+    path('api/inquiries/inbox/', InquiryInboxView.as_view(), name='inquiry-inbox'),
+    path('api/inquiries/inbox/unread/', InquiryUnreadView.as_view(), name='inquiry-unread'),
+    path('api/inquiries/inbox/status/', InquiryStatusView.as_view(), name='inquiry-status'),
+    path('api/inquiry/<int:pk>/', InquiryView.as_view(), name='inquiry-detail'),
 
     path('api/auth/register/', RegisterView.as_view(), name='register'),
     path('api/auth/login/', CustomTokenObtainPairView.as_view(), name='login'),
+    path('api/auth/refresh/', RevocableTokenRefreshView.as_view(), name='token-refresh'),
+    path('api/auth/logout/', LogoutView.as_view(), name='logout'),
 ]
\ No newline at end of file
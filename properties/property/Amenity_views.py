@@ -1,6 +1,7 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from . import mass_delete
 from .models import Amenity
 from .serializers import AmenitySerializer
 
@@ -48,4 +49,5 @@ class AmenityView(APIView):
             amenity.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
         else:
-            Amenity.objects.all().delete()
+            queryset = mass_delete.scoped_queryset(Amenity, request.query_params)
+            return Response({'deleted': mass_delete.delete_queryset(queryset)})
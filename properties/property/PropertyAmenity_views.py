@@ -1,10 +1,82 @@
-from rest_framework import viewsets
-from .models import PropertyAmenity
-from .serializers import PropertyAmenitySerializer
+from django.conf import settings
+from django.db.models import Prefetch
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from .amenity_links import add_links, set_links
+from .authentication import get_profile_id
+from .filters import parse_ids
+from .models import Property, PropertyAmenity
+from .serializers import (
+    PropertyAmenityBatchItemSerializer, PropertyAmenityReadSerializer, PropertyAmenitySerializer,
+    PropertyAmenitySetSerializer,
+)
 
 class PropertyAmenityViewSet(viewsets.ModelViewSet):
     """
     A viewset for viewing and editing PropertyAmenity instances.
+
+    Batch forms: ``GET ?property=1,2`` lists the links of several
+    properties, POSTing a list creates many links at once, and
+    ``POST set/`` replaces the amenities of one or more properties.
     """
     queryset = PropertyAmenity.objects.all()
     serializer_class = PropertyAmenitySerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        property_ids = parse_ids(self.request.query_params, 'property')
+        if property_ids:
+            queryset = queryset.filter(property_id__in=property_ids)
+        return queryset
+
+    def get_batch(self, serializer_class, data, size):
+        serializer = serializer_class(data=data if isinstance(data, list) else [data], many=True)
+        serializer.is_valid(raise_exception=True)
+        max_rows = getattr(settings, 'PROPERTY_AMENITY_BATCH_MAX', 500)
+        if sum(size(item) for item in serializer.validated_data) > max_rows:
+            raise ValidationError({'error': f'At most {max_rows} links per request.'})
+        return serializer.validated_data
+
+    def profile_id(self):
+        user = self.request.user
+        return get_profile_id(user) if user.is_authenticated else None
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        items = self.get_batch(PropertyAmenityBatchItemSerializer, request.data, lambda item: 1)
+        created = add_links(items, self.profile_id())
+        pairs = {(item['property'], item['amenity']) for item in items}
+        links = [
+            link for link in PropertyAmenity.objects.filter(
+                property_id__in={p for p, _ in pairs}, amenity_id__in={a for _, a in pairs},
+            ) if (link.property_id, link.amenity_id) in pairs
+        ]
+        return Response(
+            {'created': created, 'results': PropertyAmenitySerializer(links, many=True).data},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=False, methods=['post'], url_path='set')
+    def set_amenities(self, request):
+        """``{"property": 1, "amenities": [2, 3]}`` or a list of them; returns the final sets."""
+        items = self.get_batch(PropertyAmenitySetSerializer, request.data, lambda item: len(item['amenities']) or 1)
+        assignments = {}
+        for item in items:
+            assignments.setdefault(item['property'], set()).update(item['amenities'])
+        created, deleted = set_links(assignments, self.profile_id())
+        links = Prefetch('propertyamenity_set', queryset=PropertyAmenity.objects.select_related('amenity'))
+        properties = Property.objects.filter(pk__in=assignments).order_by('pk').prefetch_related(links)
+        return Response({
+            'created': created,
+            'deleted': deleted,
+            'results': [
+                {
+                    'property': prop.pk,
+                    'amenities': PropertyAmenityReadSerializer(prop.propertyamenity_set.all(), many=True).data,
+                }
+                for prop in properties
+            ],
+        })
@@ -1,8 +1,15 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Case, Value, When
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from property.models import PropertyImage
-from property.serializers import PropertyImageSerializer
+from property import response_cache, thumbnails
+from property.authentication import HasProfile, get_profile_id
+from property.models import Profile, Property, PropertyImage
+from property.parsers import DiskMultiPartParser
+from property.serializers import PropertyImageBatchSerializer, PropertyImageSerializer
 
 class PropertyImageView(APIView):
     def get(self, request, pk=None):
@@ -30,4 +37,72 @@ class PropertyImageView(APIView):
         except PropertyImage.DoesNotExist:
             return Response({'error': 'Image not found'}, status=status.HTTP_404_NOT_FOUND)
         image.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class PropertyImageBatchView(APIView):
+    """Upload images to a property; only its owner or manager may."""
+    permission_classes = [IsAuthenticated, HasProfile]
+    parser_classes = [DiskMultiPartParser]
+
+    def post(self, request, pk):
+        try:
+            property_obj = Property.objects.get(pk=pk)
+        except Property.DoesNotExist:
+            return Response({'error': 'Property not found.'}, status=status.HTTP_404_NOT_FOUND)
+        profile_id = get_profile_id(request.user)
+        if profile_id not in (property_obj.owner_id, property_obj.managed_by_id):
+            return Response({'error': 'Only the owner or manager can add images.'}, status=status.HTTP_403_FORBIDDEN)
+
+        data = {'images': request.FILES.getlist('images'), 'captions': request.data.getlist('captions')}
+        if request.data.get('featured') not in (None, ''):
+            data['featured'] = request.data['featured']
+        serializer = PropertyImageBatchSerializer(data=data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        uploader = Profile.objects.filter(pk=profile_id).first()
+        images = save_image_batch(property_obj, uploader, **serializer.validated_data)
+        return Response(PropertyImageSerializer(images, many=True, context={'request': request}).data,
+                        status=status.HTTP_201_CREATED)
+
+
+def save_image_batch(property_obj, uploader, images, captions=(), featured=None):
+    """
+    Store ``images`` for one property and create their rows with a single
+    bulk_create. When ``featured`` is given, one UPDATE makes that image the
+    property's only featured image.
+    """
+    field = PropertyImage._meta.get_field('image')
+    rows = []
+    stored = []
+    try:
+        for index, upload in enumerate(images):
+            row = PropertyImage(
+                property=property_obj,
+                caption=captions[index] if index < len(captions) else None,
+                uploaded_by=uploader,
+            )
+            name = default_storage.save(field.generate_filename(row, upload.name), upload)
+            stored.append(name)
+            row.image = name
+            rows.append(row)
+
+        with transaction.atomic():
+            PropertyImage.objects.bulk_create(rows)
+            if featured is not None:
+                featured_pk = rows[featured].pk
+                PropertyImage.objects.filter(property=property_obj).update(
+                    is_featured=Case(When(pk=featured_pk, then=Value(True)), default=Value(False))
+                )
+                for index, row in enumerate(rows):
+                    row.is_featured = index == featured
+    except Exception:
+        for name in stored:
+            default_storage.delete(name)
+        raise
+
+    # bulk_create skips post_save, so queue the follow-up work by hand.
+    response_cache.invalidate_property(property_obj.pk)
+    for row in rows:
+        transaction.on_commit(lambda row=row: thumbnails.generate_for(row))
+    return rows
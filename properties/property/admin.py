@@ -1,173 +1,237 @@
+"""
+Admin for the property app, tuned for large tables.
+
+* list_select_related covers every foreign key the list columns (and the
+  models' __str__) walk, so a changelist page is a fixed number of queries.
+* Foreign keys to Profile, Property and Location use raw_id_fields: a
+  select box would load every row of those tables into each form.
+* list_filter sticks to booleans and choices, which need no
+  ``SELECT DISTINCT`` to build, on indexed columns where the model has one.
+* Big tables page with EstimatedCountPaginator and show_full_result_count
+  off, so no page runs ``COUNT(*)`` over the whole table, and order by
+  primary key (or an index) rather than an unindexed date.
+* The amenity select of PropertyAmenityInline reuses one list of choices
+  for every row instead of querying the amenities per row.
+
+Settings:
+    PROPERTY_ADMIN_COUNT_LIMIT  rows a filtered changelist counts at most.
+"""
+from django.conf import settings
 from django.contrib import admin
-# from django.contrib.auth.admin import UserAdmin
-# from django.contrib.auth.models import User
-# from .models import User
-from .models import Profile, Location, Amenity, Property, PropertyAmenity, PropertyImage, Land, Rental, Apartment, CampusHostel, Favorite, Inquiry, Review
-
-
-# Unregister the default User admin
-# admin.site.unregister(User)
-
-# class ProfileInline(admin.StackedInline):
-#     model = Profile
-#     can_delete = False
-#     verbose_name_plural = 'Profile'
-#     fk_name = 'user'
-#     readonly_fields = ('created_at', 'updated_at')
-#     fieldsets = (
-#         (None, {'fields': ('user_type', 'bio', 'profile_picture')}),
-#         ('Contact Info', {'fields': ('phone_number', 'date_of_birth')}),
-#         ('Verification', {'fields': ('email_verified', 'phone_verified', 'identity_verified')}),
-#     )
-
-# # 2. Register User with custom admin
-# @admin.register(User)
-# class CustomUserAdmin(UserAdmin):
-#     inlines = (ProfileInline,)
-#     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'get_user_type')
-#     list_select_related = ('profile',)
-
-#     def get_user_type(self, instance):
-#         if hasattr(instance, 'profile'):
-#             return instance.profile.user_type
-#         return None
-#     get_user_type.short_description = 'User Type'
-
-#     def get_inline_instances(self, request, obj=None):
-#         if not obj:  # Don't show inlines when adding a user
-#             return []
-#         return super().get_inline_instances(request, obj)
-
-# 3. Profile Admin (optional - only if you need standalone profile admin)
-admin.site.register(Profile)
-# class ProfileAdmin(admin.ModelAdmin):
-#     list_display = ('user', 'user_type', 'phone_number', 'email_verified')
-#     readonly_fields = ('created_at', 'updated_at')
-#     list_filter = ('user_type', 'email_verified', 'phone_verified')
-#     search_fields = ('user__username', 'user__email', 'phone_number')
-    
-#     def get_readonly_fields(self, request, obj=None):
-#         readonly_fields = ['created_at', 'updated_at']
-#         if obj:  # Editing existing profile
-#             return readonly_fields + ['user']
-#         return readonly_fields
-
-#     def formfield_for_foreignkey(self, db_field, request, **kwargs):
-#         if db_field.name == "user":
-#             # Only show users that don't already have a profile
-#             kwargs["queryset"] = User.objects.filter(profile__isnull=True)
-#         return super().formfield_for_foreignkey(db_field, request, **kwargs)
-
-admin.site.register(Location)
-# class LocationAdmin(admin.ModelAdmin):
-#     list_display = ('__str__', 'country', 'region', 'city', 'district')
-#     list_filter = ('country', 'region', 'city')
-#     search_fields = ('country', 'region', 'city', 'district', 'street')
-#     readonly_fields = ('created_at', 'updated_at')
-
-admin.site.register(Amenity)
-# class AmenityAdmin(admin.ModelAdmin):
-#     list_display = ('name', 'icon')
-#     search_fields = ('name',)
-#     readonly_fields = ('created_at', 'updated_at')
-
-# class PropertyImageInline(admin.TabularInline):
-#     model = PropertyImage
-#     extra = 1
-#     readonly_fields = ('uploaded_at', 'updated_at')
-
-# class PropertyAmenityInline(admin.TabularInline):
-#     model = PropertyAmenity
-#     extra = 1
-#     readonly_fields = ('added_at', 'updated_at')
-
-admin.site.register(Property)
-# class PropertyAdmin(admin.ModelAdmin):
-#     list_display = ('title', 'property_type', 'owner', 'price', 'is_available', 'featured')
-#     list_filter = ('property_type', 'is_available', 'featured', 'price_period')
-#     search_fields = ('title', 'description', 'owner__user__username')
-#     readonly_fields = ('date_created', 'date_updated', 'views')
-#     inlines = [PropertyImageInline, PropertyAmenityInline]
-    
-#     def get_fieldsets(self, request, obj=None):
-#         fieldsets = [
-#             (None, {
-#                 'fields': ('owner', 'title', 'description', 'property_type')
-#             }),
-#             ('Pricing', {
-#                 'fields': ('price', 'price_period')
-#             }),
-#             ('Status', {
-#                 'fields': ('is_available', 'featured', 'views')
-#             }),
-#             ('Location', {
-#                 'fields': ('location',)
-#             }),
-#             ('Management', {
-#                 'fields': ('managed_by',),
-#                 'classes': ('collapse',)
-#             }),
-#         ]
-        
-#         if obj:
-#             fieldsets.append((
-#                 'Metadata', {
-#                     'fields': ('date_created', 'date_updated', 'created_by', 'modified_by'),
-#                     'classes': ('collapse',)
-#                 }
-#             ))
-#         return fieldsets
-
-admin.site.register(PropertyImage)
-# class PropertyImageAdmin(admin.ModelAdmin):
-#     list_display = ('property', 'is_featured', 'uploaded_at')
-#     list_filter = ('is_featured',)
-#     readonly_fields = ('uploaded_at', 'updated_at')
-
-admin.site.register(PropertyAmenity)
-# class PropertyAmenityAdmin(admin.ModelAdmin):
-#     list_display = ('property', 'amenity', 'added_at')
-#     list_filter = ('amenity',)
-#     readonly_fields = ('added_at', 'updated_at')
-
-admin.site.register(Land)
-# class LandAdmin(admin.ModelAdmin):
-#     list_display = ('property', 'land_type', 'area', 'has_utilities')
-#     list_filter = ('land_type', 'has_utilities')
-#     readonly_fields = ('created_at', 'updated_at')
-
-admin.site.register(Rental)
-# class RentalAdmin(admin.ModelAdmin):
-#     list_display = ('property', 'rental_type', 'bedrooms', 'bathrooms', 'furnished')
-#     list_filter = ('rental_type', 'furnished')
-#     readonly_fields = ('created_at', 'updated_at')
-
-admin.site.register(Apartment)
-# class ApartmentAdmin(admin.ModelAdmin):
-#     list_display = ('property', 'apartment_type', 'bedrooms', 'bathrooms', 'furnished')
-#     list_filter = ('apartment_type', 'furnished')
-#     readonly_fields = ('created_at', 'updated_at')
-
-admin.site.register(CampusHostel)
-# class CampusHostelAdmin(admin.ModelAdmin):
-#     list_display = ('property', 'hostel_type', 'room_type', 'capacity', 'meals_included')
-#     list_filter = ('hostel_type', 'room_type', 'meals_included')
-#     readonly_fields = ('created_at', 'updated_at')
-
-admin.site.register(Favorite)
-# class FavoriteAdmin(admin.ModelAdmin):
-#     list_display = ('user', 'property', 'date_added')
-#     list_filter = ('date_added',)
-#     readonly_fields = ('date_added', 'updated_at')
-
-admin.site.register(Inquiry)
-# class InquiryAdmin(admin.ModelAdmin):
-#     list_display = ('property', 'user', 'status', 'date_sent', 'responded_at')
-#     list_filter = ('status', 'date_sent')
-#     readonly_fields = ('date_sent', 'updated_at')
-
-admin.site.register(Review)
-# class ReviewAdmin(admin.ModelAdmin):
-#     list_display = ('property', 'reviewer', 'rating', 'title', 'is_approved')
-#     list_filter = ('rating', 'is_approved')
-    # readonly_fields = ('created_at', 'updated_at')
\ No newline at end of file
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from .models import (
+    Amenity, Apartment, CampusHostel, Favorite, Inquiry, Land, Location, LocationRollup, Profile, Property,
+    PropertyAmenity, PropertyImage, Rental, Review,
+)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts an unfiltered changelist by its highest primary key (one index
+    lookup; deleted rows make it an overestimate, so the last pages can be
+    empty) and a filtered one up to PROPERTY_ADMIN_COUNT_LIMIT rows.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            return queryset.model._default_manager.order_by('-pk').values_list('pk', flat=True).first() or 0
+        limit = getattr(settings, 'PROPERTY_ADMIN_COUNT_LIMIT', 10000)
+        return queryset.order_by()[:limit].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ('-pk',)
+
+
+@admin.register(Profile)
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = ('user', 'user_type', 'phone_number', 'email_verified')
+    list_select_related = ('user',)
+    list_filter = ('user_type', 'email_verified', 'phone_verified')
+    search_fields = ('user__username', 'user__email', 'phone_number')
+    raw_id_fields = ('user',)
+    readonly_fields = ('created_at', 'updated_at', 'unread_inquiries')
+
+
+@admin.register(Location)
+class LocationAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'country', 'region', 'city', 'district')
+    search_fields = ('country', 'region', 'city', 'district', 'street')
+    raw_id_fields = ('created_by', 'modified_by')
+    readonly_fields = ('created_at', 'updated_at')
+    ordering = ('-pk',)
+
+
+@admin.register(LocationRollup)
+class LocationRollupAdmin(admin.ModelAdmin):
+    """Read-only: the counts are maintained by property/browse.py."""
+    list_display = ('name', 'level', 'available', 'path')
+    list_filter = ('level',)
+    search_fields = ('path',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Amenity)
+class AmenityAdmin(admin.ModelAdmin):
+    list_display = ('name', 'icon')
+    search_fields = ('name',)
+    raw_id_fields = ('created_by', 'modified_by')
+    readonly_fields = ('created_at', 'updated_at')
+
+
+class PropertyImageInline(admin.TabularInline):
+    model = PropertyImage
+    extra = 0
+    fields = ('image', 'caption', 'is_featured', 'uploaded_at')
+    readonly_fields = ('uploaded_at',)
+
+    def get_queryset(self, request):
+        # The tabular template prints each row's __str__.
+        return super().get_queryset(request).select_related('property')
+
+
+class PropertyAmenityInline(admin.TabularInline):
+    model = PropertyAmenity
+    extra = 0
+    fields = ('amenity', 'notes', 'added_at')
+    readonly_fields = ('added_at',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('property', 'amenity')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        field = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'amenity':
+            # Each inline form deep-copies the field; a plain list is copied
+            # without re-running the query.
+            if not hasattr(request, '_amenity_choices'):
+                request._amenity_choices = list(field.choices)
+            field.choices = request._amenity_choices
+        return field
+
+
+@admin.register(Property)
+class PropertyAdmin(LargeTableAdmin):
+    list_display = ('title', 'property_type', 'owner', 'price', 'is_available', 'featured')
+    list_select_related = ('owner__user',)
+    list_filter = ('is_available', 'featured', 'property_type', 'price_period')
+    search_fields = ('title', 'owner__user__username')
+    raw_id_fields = ('owner', 'location', 'managed_by', 'created_by', 'modified_by')
+    # The counters are maintained with UPDATEs elsewhere, and saves skip them.
+    readonly_fields = ('date_created', 'date_updated', 'views', 'review_count', 'rating_average')
+    # Matches the property_created_id_idx index.
+    ordering = ('-date_created', '-id')
+    inlines = [PropertyImageInline, PropertyAmenityInline]
+
+    def get_fieldsets(self, request, obj=None):
+        fieldsets = [
+            (None, {
+                'fields': ('owner', 'title', 'description', 'property_type')
+            }),
+            ('Pricing', {
+                'fields': ('price', 'price_period')
+            }),
+            ('Status', {
+                'fields': ('is_available', 'featured', 'views', 'review_count', 'rating_average')
+            }),
+            ('Location', {
+                'fields': ('location',)
+            }),
+            ('Management', {
+                'fields': ('managed_by',),
+                'classes': ('collapse',)
+            }),
+        ]
+        if obj:
+            fieldsets.append((
+                'Metadata', {
+                    'fields': ('date_created', 'date_updated', 'created_by', 'modified_by'),
+                    'classes': ('collapse',)
+                }
+            ))
+        return fieldsets
+
+
+@admin.register(PropertyImage)
+class PropertyImageAdmin(LargeTableAdmin):
+    list_display = ('property', 'is_featured', 'uploaded_at')
+    list_select_related = ('property',)
+    list_filter = ('is_featured',)
+    raw_id_fields = ('property', 'uploaded_by', 'modified_by')
+    readonly_fields = ('uploaded_at', 'updated_at')
+
+
+@admin.register(PropertyAmenity)
+class PropertyAmenityAdmin(LargeTableAdmin):
+    list_display = ('property', 'amenity', 'added_at')
+    list_select_related = ('property', 'amenity')
+    list_filter = ('amenity',)
+    raw_id_fields = ('property', 'added_by', 'modified_by')
+    readonly_fields = ('added_at', 'updated_at')
+
+
+class SubtypeAdmin(LargeTableAdmin):
+    list_select_related = ('property',)
+    raw_id_fields = ('property', 'created_by', 'modified_by')
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(Land)
+class LandAdmin(SubtypeAdmin):
+    list_display = ('property', 'land_type', 'area', 'has_utilities')
+    list_filter = ('land_type', 'has_utilities')
+
+
+@admin.register(Rental)
+class RentalAdmin(SubtypeAdmin):
+    list_display = ('property', 'rental_type', 'bedrooms', 'bathrooms', 'furnished')
+    list_filter = ('rental_type', 'furnished')
+
+
+@admin.register(Apartment)
+class ApartmentAdmin(SubtypeAdmin):
+    list_display = ('property', 'apartment_type', 'bedrooms', 'bathrooms', 'furnished')
+    list_filter = ('apartment_type', 'furnished')
+
+
+@admin.register(CampusHostel)
+class CampusHostelAdmin(SubtypeAdmin):
+    list_display = ('property', 'hostel_type', 'room_type', 'capacity', 'meals_included')
+    list_filter = ('hostel_type', 'room_type', 'meals_included')
+
+
+@admin.register(Favorite)
+class FavoriteAdmin(LargeTableAdmin):
+    list_display = ('__str__', 'date_added')
+    list_select_related = ('user__user', 'property')
+    raw_id_fields = ('user', 'property', 'created_by', 'modified_by')
+    readonly_fields = ('date_added', 'updated_at')
+
+
+@admin.register(Inquiry)
+class InquiryAdmin(LargeTableAdmin):
+    list_display = ('__str__', 'status', 'date_sent', 'responded_at')
+    list_select_related = ('property', 'user__user')
+    list_filter = ('status',)
+    raw_id_fields = ('property', 'user', 'responded_by', 'created_by', 'modified_by')
+    readonly_fields = ('date_sent', 'updated_at')
+
+
+@admin.register(Review)
+class ReviewAdmin(LargeTableAdmin):
+    list_display = ('__str__', 'rating', 'title', 'is_approved')
+    list_select_related = ('property', 'reviewer__user')
+    list_filter = ('is_approved', 'rating')
+    raw_id_fields = ('property', 'reviewer', 'responded_by', 'created_by', 'modified_by')
+    readonly_fields = ('created_at', 'updated_at')
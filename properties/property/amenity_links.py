@@ -0,0 +1,88 @@
+"""
+Batch writes of property <-> amenity links.
+
+``add_links`` inserts many (property, amenity) pairs and ``set_links``
+makes the amenities of many properties exactly the given sets. Both check
+every referenced id with one query per table, diff against the existing
+links with one query, then write with bulk_create(ignore_conflicts=True)
+(the ('property', 'amenity') unique constraint makes repeats harmless) and
+a single ``DELETE ... WHERE id IN``, all in one transaction.
+
+bulk_create skips the post_save receivers, so the response cache of every
+changed property is invalidated here.
+
+Settings:
+    PROPERTY_AMENITY_BATCH_MAX  links accepted per batch request.
+"""
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from . import response_cache
+from .models import Amenity, Property, PropertyAmenity
+
+
+def check_ids(property_ids, amenity_ids):
+    """Raise ValidationError naming any property or amenity id that does not exist."""
+    errors = {}
+    for name, model, ids in (('property', Property, property_ids), ('amenity', Amenity, amenity_ids)):
+        missing = set(ids) - set(model.objects.filter(pk__in=set(ids)).order_by().values_list('pk', flat=True))
+        if missing:
+            errors[name] = [f'Unknown ids: {", ".join(map(str, sorted(missing)))}.']
+    if errors:
+        raise ValidationError(errors)
+
+
+def existing_links(property_ids):
+    """{property_id: {amenity_id: link id}} for ``property_ids``."""
+    links = {}
+    rows = PropertyAmenity.objects.filter(property_id__in=property_ids).values_list('property_id', 'amenity_id', 'id')
+    for property_id, amenity_id, pk in rows:
+        links.setdefault(property_id, {})[amenity_id] = pk
+    return links
+
+
+def add_links(items, profile_id=None):
+    """
+    Link the (property, amenity, notes) dicts in ``items``; pairs that are
+    already linked keep their row. Returns the number of links created.
+    """
+    pairs = {(item['property'], item['amenity']): item.get('notes') for item in items}
+    check_ids({p for p, _ in pairs}, {a for _, a in pairs})
+    with transaction.atomic():
+        links = existing_links({p for p, _ in pairs})
+        new = [
+            PropertyAmenity(property_id=p, amenity_id=a, notes=notes, added_by_id=profile_id)
+            for (p, a), notes in pairs.items() if a not in links.get(p, {})
+        ]
+        PropertyAmenity.objects.bulk_create(new, ignore_conflicts=True)
+    for property_id in {link.property_id for link in new}:
+        response_cache.invalidate_property(property_id)
+    return len(new)
+
+
+def set_links(assignments, profile_id=None):
+    """
+    Make the amenities of each property in ``assignments``
+    ({property_id: amenity ids}) exactly the given set. Links that stay keep
+    their notes. Returns (created, deleted) counts.
+    """
+    assignments = {p: set(amenity_ids) for p, amenity_ids in assignments.items()}
+    check_ids(assignments, set().union(*assignments.values()))
+    with transaction.atomic():
+        links = existing_links(assignments)
+        new, stale, changed = [], [], set()
+        for property_id, wanted in assignments.items():
+            current = links.get(property_id, {})
+            new.extend(
+                PropertyAmenity(property_id=property_id, amenity_id=a, added_by_id=profile_id)
+                for a in sorted(wanted - current.keys())
+            )
+            stale.extend(pk for a, pk in current.items() if a not in wanted)
+            if wanted != current.keys():
+                changed.add(property_id)
+        PropertyAmenity.objects.bulk_create(new, ignore_conflicts=True)
+        if stale:
+            PropertyAmenity.objects.filter(pk__in=stale).delete()
+    for property_id in changed:
+        response_cache.invalidate_property(property_id)
+    return len(new), len(stale)
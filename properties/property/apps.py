@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PropertyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'property'
+
+    def ready(self):
+        # Connect the signal receivers that keep derived data in sync.
+        from . import browse, database, favorites, fulltext, geo, inbox, locations, response_cache, review_stats, thumbnails  # noqa: F401
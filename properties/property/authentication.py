@@ -0,0 +1,142 @@
+"""
+Stateless JWT authentication.
+
+Access tokens are validated in memory: the signature and expiry are checked
+by simplejwt and the request user is a ProfileTokenUser built from the
+claims, so no user, profile or token row is read. Tokens carry
+``profile_id`` and ``user_type`` claims (see CustomTokenObtainPairSerializer)
+which views read through ``get_profile_id``.
+
+Revocation (logout) is kept in an in-process list whose entries expire with
+the token they revoke, so it never holds more than the tokens still alive.
+With several worker processes each one keeps its own list; revoke on every
+worker or keep token lifetimes short if that matters.
+"""
+import heapq
+import threading
+import time
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import BasePermission
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import Profile
+
+
+class RevocationList:
+    """Thread-safe in-memory map whose entries are evicted at their expiry time."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}  # key -> (value, expires_at)
+        self.expiries = []  # heap of (expires_at, key)
+
+    def set(self, key, value, expires_at):
+        now = time.time()
+        if expires_at <= now:
+            return
+        with self.lock:
+            self.evict(now)
+            current = self.entries.get(key)
+            if current is not None and current[1] > expires_at:
+                expires_at = current[1]
+            self.entries[key] = (value, expires_at)
+            heapq.heappush(self.expiries, (expires_at, key))
+
+    def get(self, key):
+        # Plain dict read: no lock on the per-request path.
+        entry = self.entries.get(key)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    def evict(self, now):
+        while self.expiries and self.expiries[0][0] <= now:
+            expires_at, key = heapq.heappop(self.expiries)
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+            self.expiries = []
+
+    def __len__(self):
+        return len(self.entries)
+
+
+revocations = RevocationList()
+
+
+def _token_key(jti):
+    return f'jti:{jti}'
+
+
+def _user_key(user_id):
+    return f'user:{user_id}'
+
+
+def revoke_token(token):
+    """Reject ``token`` (a validated simplejwt token) until it expires."""
+    revocations.set(_token_key(token[api_settings.JTI_CLAIM]), True, token['exp'])
+
+
+def revoke_user(user_id):
+    """Reject every token issued to ``user_id`` up to now."""
+    lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+    now = time.time()
+    revocations.set(_user_key(user_id), now, now + lifetime.total_seconds())
+
+
+def is_revoked(token):
+    if revocations.get(_token_key(token.get(api_settings.JTI_CLAIM))):
+        return True
+    cutoff = revocations.get(_user_key(token.get(api_settings.USER_ID_CLAIM)))
+    return cutoff is not None and token.get('iat', 0) < cutoff
+
+
+class ProfileTokenUser(TokenUser):
+    """TokenUser exposing the profile claims."""
+
+    @property
+    def profile_id(self):
+        return self.token.get('profile_id')
+
+    @property
+    def user_type(self):
+        return self.token.get('user_type')
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if is_revoked(validated_token):
+            raise InvalidToken(_('Token has been revoked'))
+        return validated_token
+
+
+def get_profile_id(user):
+    """
+    The profile id of an authenticated request user: read from the token
+    claims for token users, otherwise from the user's profile.
+    """
+    profile_id = getattr(user, 'profile_id', None)
+    if profile_id is not None:
+        return profile_id
+    if isinstance(user, TokenUser):
+        # Tokens issued before the profile claims existed.
+        return Profile.objects.filter(user_id=user.id).values_list('id', flat=True).first()
+    profile = getattr(user, 'profile', None)
+    return profile.id if profile is not None else None
+
+
+class HasProfile(BasePermission):
+    """Refuses authenticated users without a profile, whose profile id would be None."""
+    message = _('Profile not found.')
+
+    def has_permission(self, request, view):
+        return get_profile_id(request.user) is not None
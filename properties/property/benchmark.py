@@ -0,0 +1,336 @@
+"""
+Benchmark harness for the REST API hot paths.
+
+``seed()`` fills the database with a synthetic catalogue, ``run()`` calls
+each scenario's view in-process through APIRequestFactory and records
+latency percentiles, throughput and SQL query counts, and ``compare()``
+checks a result set against an earlier one. The ``benchmark_api`` command
+wires these together on a throwaway test database and writes JSON.
+
+Seeding uses bulk_create, so it also refreshes what the model signals would
+otherwise maintain (geohashes, review aggregates, the full-text index).
+"""
+import platform
+import random
+import statistics
+import time
+import traceback
+from datetime import timedelta
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from . import browse, fulltext, geo, inbox, review_stats
+from .Amenity_views import AmenityView
+from .PropertyAmenity_views import PropertyAmenityViewSet
+from .PropertyImageviews import PropertyImageView
+from .location_view import LocationView
+from .locations import location_key
+from .models import (
+    Amenity, Apartment, CampusHostel, Favorite, Inquiry, Land, Location, Profile, Property, PropertyAmenity,
+    PropertyImage, Rental, Review, User,
+)
+from .search_view import PropertyFacetView, PropertyNearbyView, PropertySearchView, PropertyTextSearchView
+from .views import CustomTokenObtainPairView, PropertyView, RegisterView
+
+BENCHMARK_PASSWORD = 'bench-pass'
+PERCENTILES = (50, 90, 95, 99)
+
+CITIES = [
+    ('Greater Accra', 'Accra', 5.6037, -0.1870),
+    ('Greater Accra', 'Tema', 5.6698, -0.0166),
+    ('Ashanti', 'Kumasi', 6.6885, -1.6244),
+    ('Central', 'Cape Coast', 5.1053, -1.2466),
+    ('Northern', 'Tamale', 9.4008, -0.8393),
+]
+AMENITIES = [
+    'WiFi', 'Parking', 'Security', 'Water', 'Generator', 'Air conditioning', 'Laundry', 'Gym',
+    'Pool', 'Garden', 'Balcony', 'Study room', 'CCTV', 'Kitchen', 'Borehole', 'Solar',
+]
+WORDS = ['quiet', 'spacious', 'modern', 'garden', 'close', 'campus', 'market', 'view', 'bright', 'secure']
+
+
+def dataset_sizes(properties):
+    """Row counts derived from the number of properties."""
+    return {
+        'profiles': max(properties // 10, 10),
+        'locations': max(properties // 5, 5),
+        'properties': properties,
+        'images_per_property': 3,
+        'amenities_per_property': 4,
+        'reviews_per_property': 5,
+        'favorites_per_property': 2,
+        'inquiries_per_property': 1,
+    }
+
+
+def seed(properties=1000, rng_seed=1, batch_size=500):
+    """Create a synthetic catalogue of ``properties`` listings. Returns the sizes used."""
+    rng = random.Random(rng_seed)
+    sizes = dataset_sizes(properties)
+    password = make_password(BENCHMARK_PASSWORD)
+
+    User.objects.bulk_create(
+        [User(username=f'bench{i}', email=f'bench{i}@example.com', password=password) for i in range(sizes['profiles'])],
+        batch_size=batch_size,
+    )
+    users = list(User.objects.filter(username__startswith='bench').order_by('id'))
+    Profile.objects.bulk_create(
+        [Profile(user=user, user_type=rng.choice(Profile.USER_TYPES)[0]) for user in users], batch_size=batch_size,
+    )
+    profiles = list(Profile.objects.filter(user__in=users).order_by('id'))
+
+    locations = []
+    for i in range(sizes['locations']):
+        region, city, lat, lng = CITIES[i % len(CITIES)]
+        latitude, longitude = lat + rng.uniform(-0.1, 0.1), lng + rng.uniform(-0.1, 0.1)
+        locations.append(Location(
+            country='Ghana', region=region, city=city, district=f'District {i % 20}', street=f'Bench street {i}',
+            latitude=latitude, longitude=longitude, geohash=geo.encode(latitude, longitude),
+        ))
+        locations[-1].normalized_key = location_key(locations[-1])
+    locations = Location.objects.bulk_create(locations, batch_size=batch_size)
+    amenities = Amenity.objects.bulk_create(
+        [Amenity(name=f'{name} (bench)') for name in AMENITIES], batch_size=batch_size,
+    )
+
+    now = timezone.now()
+    types = [key for key, _ in Property.PROPERTY_TYPES]
+    periods = [key for key, _ in Property.PRICE_PERIODS]
+    listings = Property.objects.bulk_create([
+        Property(
+            owner=rng.choice(profiles), location=rng.choice(locations),
+            title=' '.join(rng.sample(WORDS, 3)).capitalize() + f' {i}',
+            description=' '.join(rng.choice(WORDS) for _ in range(30)),
+            property_type=rng.choice(types), price_period=rng.choice(periods),
+            price=rng.randint(50, 500000), is_available=rng.random() < 0.9, featured=rng.random() < 0.05,
+            date_created=now - timedelta(minutes=i),
+        )
+        for i in range(properties)
+    ], batch_size=batch_size)
+
+    subtypes = {Land: [], Rental: [], Apartment: [], CampusHostel: []}
+    for prop in listings:
+        if prop.property_type == 'LAND':
+            subtypes[Land].append(Land(property=prop, land_type='RESIDENTIAL', area=rng.randint(100, 5000)))
+        elif prop.property_type == 'RENTAL':
+            subtypes[Rental].append(Rental(property=prop, rental_type='HOUSE', bedrooms=3, bathrooms=2))
+        elif prop.property_type == 'APARTMENT':
+            subtypes[Apartment].append(Apartment(
+                property=prop, apartment_type='STUDIO', bedrooms=1, bathrooms=1, floor_number=2, total_floors=5,
+            ))
+        else:
+            subtypes[CampusHostel].append(CampusHostel(
+                property=prop, hostel_type='MIXED', room_type='SHARED', capacity=4,
+                distance_to_campus=rng.randint(1, 50) / 10,
+            ))
+    for model, rows in subtypes.items():
+        model.objects.bulk_create(rows, batch_size=batch_size)
+
+    images, links, reviews, favorites, inquiries = [], [], [], [], []
+    for prop in listings:
+        for n in range(sizes['images_per_property']):
+            images.append(PropertyImage(
+                property=prop, image=f'property_images/bench_{prop.pk}_{n}.jpg', is_featured=n == 0,
+            ))
+        for amenity in rng.sample(amenities, sizes['amenities_per_property']):
+            links.append(PropertyAmenity(property=prop, amenity=amenity))
+        for reviewer in rng.sample(profiles, sizes['reviews_per_property']):
+            reviews.append(Review(
+                property=prop, reviewer=reviewer, rating=rng.randint(1, 5), title='Review',
+                comment='Benchmark review', is_approved=rng.random() < 0.8,
+            ))
+        for user in rng.sample(profiles, sizes['favorites_per_property']):
+            favorites.append(Favorite(user=user, property=prop))
+        for user in rng.sample(profiles, sizes['inquiries_per_property']):
+            inquiries.append(Inquiry(property=prop, user=user, message='Is this still available?'))
+    for model, rows in ((PropertyImage, images), (PropertyAmenity, links), (Review, reviews),
+                        (Favorite, favorites), (Inquiry, inquiries)):
+        model.objects.bulk_create(rows, batch_size=batch_size)
+
+    review_stats.reconcile()
+    inbox.reconcile()
+    browse.rebuild()
+    fulltext.rebuild()
+    return sizes
+
+
+class Scenario:
+    """One benchmarked request: a view and a function building its request."""
+
+    def __init__(self, name, view, build_request):
+        self.name = name
+        self.view = view
+        self.build_request = build_request
+
+    def call(self, factory, context, iteration):
+        request, kwargs = self.build_request(factory, context, iteration)
+        return self.view(request, **kwargs)
+
+
+def _get(path, **kwargs):
+    return lambda factory, context, i: (factory.get(path), kwargs)
+
+
+def _get_random(path, ids_key, param='pk'):
+    def build(factory, context, i):
+        pk = context['rng'].choice(context[ids_key])
+        return factory.get(path.format(pk=pk)), {param: pk}
+    return build
+
+
+def _login(factory, context, i):
+    data = {'username': context['username'], 'password': BENCHMARK_PASSWORD}
+    return factory.post('/api/auth/login/', data, format='json'), {}
+
+
+def _register(factory, context, i):
+    data = {
+        'username': f'bench-register-{context["run_id"]}-{i}', 'email': f'register{i}@example.com',
+        'password': BENCHMARK_PASSWORD,
+    }
+    return factory.post('/api/auth/register/', data, format='json'), {}
+
+
+def _nearby(factory, context, i):
+    _, _, lat, lng = context['rng'].choice(CITIES)
+    return factory.get(f'/api/properties/nearby/?lat={lat}&lng={lng}&radius=5'), {}
+
+
+def default_scenarios():
+    property_view = PropertyView.as_view()
+    location_view = LocationView.as_view()
+    amenity_view = AmenityView.as_view()
+    image_view = PropertyImageView.as_view()
+    return [
+        Scenario('property_list', property_view, _get('/api/properties/')),
+        Scenario('property_list_expanded', property_view, _get('/api/properties/?expand=1')),
+        Scenario('property_detail', property_view, _get_random('/api/property/{pk}/', 'property_ids')),
+        Scenario('property_detail_expanded', property_view, _get_random('/api/property/{pk}/?expand=1', 'property_ids')),
+        Scenario('property_search', PropertySearchView.as_view(),
+                 _get('/api/properties/search/?property_type=HOSTEL,RENTAL&max_price=100000&city=Accra')),
+        Scenario('property_text_search', PropertyTextSearchView.as_view(), _get('/api/properties/search/text/?q=garden')),
+        Scenario('property_facets', PropertyFacetView.as_view(), _get('/api/properties/search/facets/?city=Kumasi')),
+        Scenario('property_nearby', PropertyNearbyView.as_view(), _nearby),
+        Scenario('location_list', location_view, _get('/api/locations/')),
+        Scenario('location_detail', location_view, _get_random('/api/location/{pk}/', 'location_ids')),
+        Scenario('amenity_list', amenity_view, _get('/api/amenities/')),
+        Scenario('amenity_detail', amenity_view, _get_random('/api/amenity/{pk}/', 'amenity_ids')),
+        Scenario('property_image_list', image_view, _get('/api/property-images/')),
+        Scenario('property_image_detail', image_view, _get_random('/api/property-image/{pk}/', 'image_ids')),
+        Scenario('property_amenity_list', PropertyAmenityViewSet.as_view({'get': 'list'}),
+                 _get('/api/propertyamenities/')),
+        Scenario('property_amenity_detail', PropertyAmenityViewSet.as_view({'get': 'retrieve'}),
+                 _get_random('/api/propertyamenities/{pk}/', 'property_amenity_ids')),
+        Scenario('auth_login', CustomTokenObtainPairView.as_view(), _login),
+        Scenario('auth_register', RegisterView.as_view(), _register),
+    ]
+
+
+def build_context(rng_seed=1):
+    return {
+        'rng': random.Random(rng_seed),
+        'run_id': time.time_ns(),
+        'username': User.objects.filter(username__startswith='bench').order_by('id').values_list('username', flat=True).first(),
+        'property_ids': list(Property.objects.values_list('id', flat=True)),
+        'location_ids': list(Location.objects.values_list('id', flat=True)),
+        'amenity_ids': list(Amenity.objects.values_list('id', flat=True)),
+        'image_ids': list(PropertyImage.objects.values_list('id', flat=True)),
+        'property_amenity_ids': list(PropertyAmenity.objects.values_list('id', flat=True)),
+    }
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def measure(scenario, factory, context, iterations, warmup):
+    for i in range(warmup):
+        try:
+            scenario.call(factory, context, -1 - i)
+        except Exception:
+            pass
+
+    timings, queries, statuses = [], [], {}
+    errors = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            begin = time.perf_counter()
+            try:
+                response = scenario.call(factory, context, i)
+                if hasattr(response, 'render'):
+                    response.render()
+                code = str(response.status_code)
+            except Exception as exc:
+                code = 'exception'
+                if len(errors) < 3:
+                    errors.append(''.join(traceback.format_exception_only(type(exc), exc)).strip())
+            timings.append((time.perf_counter() - begin) * 1000)
+        queries.append(len(ctx.captured_queries))
+        statuses[code] = statuses.get(code, 0) + 1
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    result = {
+        'iterations': iterations,
+        'latency_ms': {
+            'mean': statistics.fmean(timings),
+            'min': timings[0],
+            'max': timings[-1],
+            **{f'p{pct}': percentile(timings, pct) for pct in PERCENTILES},
+        },
+        'throughput_rps': iterations / elapsed if elapsed else None,
+        'queries': {'mean': statistics.fmean(queries), 'min': min(queries), 'max': max(queries)},
+        'status_codes': statuses,
+    }
+    if errors:
+        result['errors'] = errors
+    return result
+
+
+def run(scenarios=None, iterations=50, warmup=5, rng_seed=1, only=None):
+    """Benchmark each scenario; returns {name: metrics}."""
+    scenarios = scenarios or default_scenarios()
+    if only:
+        scenarios = [scenario for scenario in scenarios if scenario.name in only]
+    factory = APIRequestFactory()
+    context = build_context(rng_seed)
+    return {scenario.name: measure(scenario, factory, context, iterations, warmup) for scenario in scenarios}
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'platform': platform.platform(),
+    }
+
+
+def compare(current, baseline, latency_tolerance=0.25, metric='p95'):
+    """
+    Compare two ``run()`` results. A scenario regresses when its ``metric``
+    latency grows by more than ``latency_tolerance`` (a fraction) or when it
+    issues more queries on average. Returns a list of regression dicts.
+    """
+    regressions = []
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        old, new = before['latency_ms'][metric], result['latency_ms'][metric]
+        if old and new > old * (1 + latency_tolerance):
+            regressions.append({'scenario': name, 'metric': f'latency_ms.{metric}', 'baseline': old, 'current': new})
+        old, new = before['queries']['mean'], result['queries']['mean']
+        if new > old:
+            regressions.append({'scenario': name, 'metric': 'queries.mean', 'baseline': old, 'current': new})
+    return regressions
@@ -0,0 +1,192 @@
+"""
+Country -> region -> city -> district browsing with precomputed counts.
+
+LocationRollup holds one row per hierarchy node with the number of
+available properties under it. A node's path is its normalized names from
+the country down joined with '|', i.e. a prefix of Location.normalized_key,
+so spellings that differ only in case or spacing share a node. Listing the
+children of a node is one range of the (parent, name) index.
+
+The receivers below turn every property save or delete (a new location,
+an is_available flip) and every location rename into
+``UPDATE ... SET available = available + delta`` on the affected nodes,
+creating missing ones. Node paths come from the location keys held by the
+resolver cache, so counting a property in a known location does not query
+the locations table. Bulk writes bypass the signals: the importer and mass
+deletes call ``apply_deltas`` themselves, and the ``rebuild_location_rollup``
+command (also run by benchmark seeding and dedupe_locations) recounts
+everything from scratch.
+"""
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import locations
+from .locations import SEPARATOR
+from .models import Location, LocationRollup, Property
+
+LEVELS = ('country', 'region', 'city', 'district')
+
+
+def paths_of(key):
+    """Paths of the nodes above the location with normalized ``key``, country first."""
+    paths, path = [], ''
+    for part in key.split(SEPARATOR)[:len(LEVELS)]:
+        if not part:
+            break
+        path = f'{path}{SEPARATOR}{part}' if path else part
+        paths.append(path)
+    return paths
+
+
+def apply_path_deltas(deltas, sources):
+    """
+    Apply {path: delta}, one UPDATE per distinct delta. Missing nodes are
+    created, named after the raw parts of ``sources[path]``, a location id.
+    """
+    deltas = {path: delta for path, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        existing = set(LocationRollup.objects.filter(path__in=deltas).values_list('path', flat=True))
+        by_delta = {}
+        for path in existing:
+            by_delta.setdefault(deltas[path], []).append(path)
+        for delta, paths in by_delta.items():
+            LocationRollup.objects.filter(path__in=paths).update(available=F('available') + delta)
+        # A missing node with a negative delta is drift for rebuild() to fix, not a node to create.
+        missing = [path for path, delta in deltas.items() if path not in existing and delta > 0]
+        if missing:
+            parts = {
+                pk: parts for pk, *parts in
+                Location.objects.filter(pk__in={sources[path] for path in missing}).values_list('pk', *LEVELS)
+            }
+            LocationRollup.objects.bulk_create([
+                new_node(path, parts[sources[path]], deltas[path]) for path in missing if sources[path] in parts
+            ])
+
+
+def new_node(path, parts, available):
+    level = path.count(SEPARATOR)
+    return LocationRollup(
+        path=path, parent=path.rpartition(SEPARATOR)[0], level=level,
+        name=' '.join(str(parts[level]).split()), available=available,
+    )
+
+
+def apply_deltas(deltas):
+    """Add {location_id: delta} available properties to the nodes above each location."""
+    deltas = {pk: delta for pk, delta in deltas.items() if pk is not None and delta}
+    if not deltas:
+        return
+    path_deltas, sources = {}, {}
+    for pk, key in locations.keys_of(deltas).items():
+        for path in paths_of(key):
+            path_deltas[path] = path_deltas.get(path, 0) + deltas[pk]
+            sources.setdefault(path, pk)
+    apply_path_deltas(path_deltas, sources)
+
+
+def contribution(location_id, is_available):
+    """The location whose nodes count a property, or None."""
+    return location_id if is_available else None
+
+
+def apply_change(old, new):
+    if old != new:
+        apply_deltas({old: -1, new: 1})
+
+
+@receiver(pre_save, sender=Property)
+def remember_property(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None
+    if instance.pk is not None:
+        previous = Property.objects.filter(pk=instance.pk).values_list('location_id', 'is_available').first()
+    instance._previous_rollup = contribution(*previous) if previous else None
+
+
+@receiver(post_save, sender=Property)
+def update_rollup_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    new = contribution(instance.location_id, instance.is_available)
+    apply_change(getattr(instance, '_previous_rollup', None), new)
+    instance._previous_rollup = new
+
+
+@receiver(post_delete, sender=Property)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    apply_change(contribution(instance.location_id, instance.is_available), None)
+
+
+@receiver(pre_save, sender=Location)
+def remember_location(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        instance._previous_key = None
+        return
+    instance._previous_key = Location.objects.filter(pk=instance.pk).values_list('normalized_key', flat=True).first()
+
+
+@receiver(post_save, sender=Location)
+def move_location_counts(sender, instance, raw=False, **kwargs):
+    """Move the counts of a renamed location to its new nodes."""
+    previous = getattr(instance, '_previous_key', None)
+    if raw or previous is None:
+        return
+    old, new = paths_of(previous), paths_of(locations.location_key(instance))
+    if old == new:
+        return
+    total = Property.objects.filter(location_id=instance.pk, is_available__in=[True]).count()
+    deltas = {path: -total for path in old}
+    for path in new:
+        deltas[path] = deltas.get(path, 0) + total
+    apply_path_deltas(deltas, dict.fromkeys(new, instance.pk))
+
+
+def available_by_location(property_ids):
+    """{location_id: available properties} among ``property_ids``."""
+    rows = (
+        Property.objects.filter(pk__in=property_ids, is_available__in=[True]).order_by()
+        .values_list('location_id').annotate(total=Count('id'))
+    )
+    return dict(rows)
+
+
+def children(parts):
+    """
+    The nodes under the node named by ``parts`` (country, region, ...; empty
+    for the countries) that have available properties, by name. Returns
+    (parent, nodes); the parent is None for the countries or when ``parts``
+    names no node, in which case there are no nodes either.
+    """
+    parent = SEPARATOR.join(locations.normalize(part) for part in parts)
+    node = None
+    if parts:
+        node = LocationRollup.objects.filter(path=parent).first()
+        if node is None:
+            return None, []
+    rows = LocationRollup.objects.filter(parent=parent, available__gt=0).order_by('name')
+    return node, list(rows)
+
+
+def rebuild():
+    """Recount every node from the properties table. Returns the number of nodes."""
+    rows = (
+        Property.objects.filter(is_available__in=[True]).order_by()
+        .values_list('location__normalized_key', *(f'location__{name}' for name in LEVELS))
+        .annotate(total=Count('id'))
+    )
+    nodes = {}
+    for key, *parts, total in rows.iterator():
+        for path in paths_of(key):
+            node = nodes.get(path)
+            if node is None:
+                node = nodes[path] = new_node(path, parts, 0)
+            node.available += total
+    with transaction.atomic():
+        LocationRollup.objects.all().delete()
+        LocationRollup.objects.bulk_create(nodes.values(), batch_size=500)
+    return len(nodes)
@@ -0,0 +1,36 @@
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from . import browse
+
+
+class LocationBrowseView(APIView):
+    """
+    Drill down country -> region -> city -> district with the number of
+    available properties under each node, read from the rollup table.
+
+    No parameters lists the countries, ``?country=Ghana`` its regions,
+    ``&region=Ashanti`` the cities of that region and ``&city=Kumasi`` the
+    districts of that city. Each parameter needs the ones before it.
+    """
+
+    def get(self, request):
+        parts = []
+        for name in browse.LEVELS[:-1]:
+            value = request.query_params.get(name, '').strip()
+            if not value:
+                break
+            parts.append(value)
+        skipped = [name for name in browse.LEVELS[len(parts):-1] if request.query_params.get(name, '').strip()]
+        if skipped:
+            missing = browse.LEVELS[len(parts)]
+            return Response({'error': f'{skipped[0]} needs {missing}.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        parent, nodes = browse.children(parts)
+        if parts and parent is None:
+            return Response({'error': 'Location not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'level': browse.LEVELS[len(parts)],
+            'parent': None if parent is None else {'name': parent.name, 'available': parent.available},
+            'results': [{'name': node.name, 'available': node.available} for node in nodes],
+        })
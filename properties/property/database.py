@@ -0,0 +1,204 @@
+"""
+SQLite connection tuning and read-replica routing.
+
+``configure_connection`` runs on every new SQLite connection
+(connection_created) and applies PROPERTY_SQLITE_JOURNAL_MODE and
+PROPERTY_SQLITE_PRAGMAS:
+
+    journal_mode=WAL     readers and the writer no longer block each other.
+                         Only set when PROPERTY_SQLITE_JOURNAL_MODE is: the
+                         mode is stored in the database file (and WAL leaves
+                         -wal/-shm files next to it), so it is a deployment
+                         choice.
+    synchronous=NORMAL   with WAL only: fsync at checkpoints rather than every
+                         commit; a power cut can lose the last commits but
+                         never corrupts the file.
+    busy_timeout         wait this many ms for a lock instead of failing
+                         with "database is locked".
+    cache_size, mmap_size, temp_store
+                         keep hot pages and temporary sort tables in memory.
+
+The page cache belongs to the connection, so DATABASES also sets
+CONN_MAX_AGE to keep connections (and their warm cache) across requests,
+and transaction_mode=IMMEDIATE so a write transaction takes the write lock
+at BEGIN: a deferred transaction that upgrades from read to write fails at
+once, whatever the busy timeout.
+
+With PROPERTY_SQLITE_READ_REPLICA on, ReadReplicaRouter sends reads to the
+``replica`` alias, a second connection to the same file opened read-only
+(``mode=ro``). Reads inside a transaction on the default connection stay on
+it so they see its uncommitted writes. Write-only pragmas are skipped on
+read-only connections. Without WAL the replica's reads still wait for the
+writer.
+
+``load_test`` runs concurrent writers and readers against a scratch file
+with and without the tuning; see the ``sqlite_load_test`` command.
+
+Settings:
+    PROPERTY_SQLITE_JOURNAL_MODE  journal mode to set, e.g. WAL; None leaves the file's.
+    PROPERTY_SQLITE_PRAGMAS       pragma name -> value, applied in order.
+    PROPERTY_SQLITE_READ_REPLICA  route reads to the ``replica`` alias.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+WAL_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+}
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'mmap_size': 134217728,
+    'temp_store': 'MEMORY',
+}
+# Pragmas that write to the database file.
+WRITE_PRAGMAS = {'journal_mode'}
+REPLICA = 'replica'
+
+
+def get_pragmas():
+    pragmas = {}
+    journal_mode = getattr(settings, 'PROPERTY_SQLITE_JOURNAL_MODE', None)
+    if journal_mode:
+        pragmas = dict(WAL_PRAGMAS) if journal_mode.upper() == 'WAL' else {'journal_mode': journal_mode}
+    pragmas.update(getattr(settings, 'PROPERTY_SQLITE_PRAGMAS', DEFAULT_PRAGMAS))
+    return pragmas
+
+
+def is_read_only(settings_dict):
+    return 'mode=ro' in str(settings_dict['NAME'])
+
+
+def apply_pragmas(cursor, pragmas, read_only=False):
+    for name, value in pragmas.items():
+        if read_only and name in WRITE_PRAGMAS:
+            continue
+        cursor.execute(f'PRAGMA {name} = {value}')
+    if read_only:
+        cursor.execute('PRAGMA query_only = ON')
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, get_pragmas(), read_only=is_read_only(connection.settings_dict))
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not getattr(settings, 'PROPERTY_SQLITE_READ_REPLICA', False) or REPLICA not in settings.DATABASES:
+            return None
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+def _connect(path, tuned, timeout):
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+    if tuned:
+        # A scratch file, so WAL whatever the configured journal mode.
+        apply_pragmas(conn, {**get_pragmas(), **WAL_PRAGMAS})
+    else:
+        # What a bare sqlite3 entry in DATABASES gives: a rollback journal,
+        # the 5s connect timeout and deferred transactions.
+        conn.execute('PRAGMA journal_mode = DELETE')
+    return conn
+
+
+def _worker(path, tuned, timeout, role, stop, results, lock):
+    conn = _connect(path, tuned, timeout)
+    ops, errors, latencies = 0, 0, []
+    begin = 'BEGIN IMMEDIATE' if tuned else 'BEGIN'
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            if role == 'writer':
+                conn.execute(begin)
+                row = conn.execute('SELECT id FROM counter ORDER BY RANDOM() LIMIT 1').fetchone()
+                conn.execute('UPDATE counter SET hits = hits + 1 WHERE id = ?', row)
+                conn.execute('INSERT INTO event (counter_id, created) VALUES (?, ?)', (row[0], time.time()))
+                conn.execute('COMMIT')
+            else:
+                conn.execute('SELECT COUNT(*), SUM(hits) FROM counter').fetchone()
+                conn.execute('SELECT counter_id, COUNT(*) FROM event GROUP BY counter_id').fetchall()
+            ops += 1
+            latencies.append(time.perf_counter() - start)
+        except sqlite3.OperationalError:
+            errors += 1
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+    conn.close()
+    with lock:
+        entry = results[role]
+        entry['ops'] += ops
+        entry['errors'] += errors
+        entry['latencies'].extend(latencies)
+
+
+def _run(path, tuned, writers, readers, duration, timeout):
+    setup = _connect(path, tuned, timeout)
+    setup.execute('DROP TABLE IF EXISTS event')
+    setup.execute('DROP TABLE IF EXISTS counter')
+    setup.execute('CREATE TABLE counter (id INTEGER PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0)')
+    setup.execute('CREATE TABLE event (id INTEGER PRIMARY KEY, counter_id INTEGER NOT NULL, created REAL)')
+    setup.executemany('INSERT INTO counter (id) VALUES (?)', [(i,) for i in range(1, 1001)])
+    setup.close()
+
+    results = {role: {'ops': 0, 'errors': 0, 'latencies': []} for role in ('writer', 'reader')}
+    stop, lock = threading.Event(), threading.Lock()
+    threads = [
+        threading.Thread(target=_worker, args=(path, tuned, timeout, role, stop, results, lock))
+        for role in ['writer'] * writers + ['reader'] * readers
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    report = {}
+    for role, entry in results.items():
+        latencies = sorted(entry['latencies'])
+        report[role] = {
+            'ops': entry['ops'],
+            'ops_per_second': entry['ops'] / duration,
+            'errors': entry['errors'],
+            'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+        }
+    return report
+
+
+def load_test(writers=4, readers=8, duration=5.0, timeout=5.0):
+    """
+    Run ``writers`` + ``readers`` threads for ``duration`` seconds against a
+    scratch database, first as the bare default setup then with the tuning.
+    Returns {'baseline': report, 'tuned': report}.
+    """
+    reports = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for label, tuned in (('baseline', False), ('tuned', True)):
+            path = os.path.join(directory, f'{label}.sqlite3')
+            reports[label] = _run(path, tuned, writers, readers, duration, timeout)
+    return reports
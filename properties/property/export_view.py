@@ -0,0 +1,24 @@
+from django.http import StreamingHttpResponse
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework import status
+from .exporter import STREAMERS, export_rows, parse_since
+
+
+class PropertyExportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        fmt = request.query_params.get('export_format', 'jsonl')
+        if fmt not in STREAMERS:
+            return Response({'error': 'export_format must be csv or jsonl.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            since = parse_since(request.query_params.get('since'))
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        streamer, content_type = STREAMERS[fmt]
+        response = StreamingHttpResponse(streamer(export_rows(since)), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="properties.{fmt}"'
+        return response
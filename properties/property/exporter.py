@@ -0,0 +1,115 @@
+"""
+Streaming export of the property catalogue as CSV or JSONL.
+
+Rows are flat and use the same column names as the importer, so an export
+can be fed back through ``import_properties``. Properties are read with
+``QuerySet.iterator(chunk_size=...)`` and each line is produced as it is
+needed, so memory stays bounded by the chunk size.
+
+``since`` limits the export to rows whose ``date_updated`` is later than the
+given moment. Only the property row bumps ``date_updated``; edits made
+directly to a location or subtype row are not picked up incrementally.
+"""
+import csv
+import json
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .importer import LOCATION_FIELDS, SUBTYPE_MODELS, subtype_fields
+from .models import Property, PropertyAmenity
+
+PROPERTY_COLUMNS = (
+    'id', 'title', 'description', 'property_type', 'price', 'price_period', 'is_available',
+    'featured', 'views', 'date_created', 'date_updated',
+)
+SUBTYPE_ACCESSORS = {
+    'LAND': 'land',
+    'RENTAL': 'rental',
+    'APARTMENT': 'apartment',
+    'HOSTEL': 'campushostel',
+}
+
+
+def subtype_columns():
+    columns = []
+    for model in SUBTYPE_MODELS.values():
+        for field in subtype_fields(model):
+            if field.name not in columns:
+                columns.append(field.name)
+    return columns
+
+
+COLUMNS = PROPERTY_COLUMNS + LOCATION_FIELDS + ('amenities',) + tuple(subtype_columns())
+
+
+def parse_since(value):
+    """Parse an ISO date or datetime; naive values are taken as UTC."""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value!r}')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    return moment
+
+
+def export_queryset(since=None):
+    queryset = Property.objects.select_related(
+        'location', 'land', 'rental', 'apartment', 'campushostel'
+    ).prefetch_related(
+        Prefetch('propertyamenity_set', queryset=PropertyAmenity.objects.select_related('amenity')),
+    )
+    if since is not None:
+        queryset = queryset.filter(date_updated__gt=since).order_by('date_updated', 'id')
+    else:
+        queryset = queryset.order_by('id')
+    return queryset
+
+
+def export_rows(since=None, chunk_size=None):
+    """Yield one dict per property, keyed by COLUMNS."""
+    chunk_size = chunk_size or getattr(settings, 'PROPERTY_EXPORT_CHUNK_SIZE', 2000)
+    for prop in export_queryset(since).iterator(chunk_size=chunk_size):
+        row = {name: getattr(prop, name) for name in PROPERTY_COLUMNS}
+        row.update({name: getattr(prop.location, name) for name in LOCATION_FIELDS})
+        row['amenities'] = [link.amenity.name for link in prop.propertyamenity_set.all()]
+        subtype = getattr(prop, SUBTYPE_ACCESSORS.get(prop.property_type, ''), None)
+        if subtype is not None:
+            for field in subtype_fields(type(subtype)):
+                row[field.name] = getattr(subtype, field.attname)
+        yield row
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.DictWriter(Echo(), fieldnames=COLUMNS, restval='')
+    yield writer.writeheader()
+    for row in rows:
+        row['amenities'] = ', '.join(row['amenities'])
+        yield writer.writerow(row)
+
+
+def stream_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+STREAMERS = {
+    'csv': (stream_csv, 'text/csv'),
+    'jsonl': (stream_jsonl, 'application/x-ndjson'),
+}
@@ -0,0 +1,89 @@
+"""
+Facet counts (amenity, property_type, price_period, city) for a search.
+
+Each dimension is one grouped query over the properties matched by
+``filter_properties``. Results are cached per filter signature: the
+normalized filter parameters plus the property list version from
+response_cache, so any change that invalidates cached listings also
+invalidates the facets. PROPERTY_RESPONSE_CACHE_ENABLED = False turns the
+facet cache off as well.
+
+Settings:
+    PROPERTY_FACET_CACHE_TIMEOUT  lifetime of cached facet counts in seconds.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from . import response_cache
+from .filters import filter_properties
+from .models import Property, PropertyAmenity
+
+# Parameters read by filter_properties; everything else (page, cursor, ...)
+# leaves the counts unchanged and is kept out of the signature.
+FILTER_PARAMS = (
+    'is_available', 'property_type', 'price_period', 'min_price', 'max_price', 'featured',
+    'min_rating', 'min_reviews', 'city', 'region', 'amenity',
+)
+LIST_PARAMS = ('property_type', 'price_period', 'amenity')
+
+
+def signature(params):
+    normalized = {}
+    for name in FILTER_PARAMS:
+        value = (params.get(name) or '').strip()
+        if not value:
+            continue
+        if name in LIST_PARAMS:
+            value = ','.join(sorted({part.strip().upper() for part in value.split(',') if part.strip()}))
+        elif name in ('is_available', 'featured'):
+            value = value.lower()
+        normalized[name] = value
+    return hashlib.md5(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+def count_by(queryset, field):
+    rows = queryset.order_by().values(field).annotate(count=Count('id')).order_by('-count', field)
+    return [{'value': row[field], 'count': row['count']} for row in rows]
+
+
+def compute_facets(params):
+    properties = filter_properties(Property.objects.all(), params)
+    amenities = (
+        PropertyAmenity.objects.filter(property_id__in=properties.order_by().values('id'))
+        .values('amenity_id', 'amenity__name')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'amenity__name')
+    )
+    labels = {
+        'property_type': dict(Property.PROPERTY_TYPES),
+        'price_period': dict(Property.PRICE_PERIODS),
+    }
+    facets = {
+        'amenity': [
+            {'id': row['amenity_id'], 'name': row['amenity__name'], 'count': row['count']} for row in amenities
+        ],
+    }
+    for field, choices in labels.items():
+        facets[field] = [
+            dict(entry, label=choices.get(entry['value'], entry['value'])) for entry in count_by(properties, field)
+        ]
+    facets['city'] = count_by(properties, 'location__city')
+    # Every property has exactly one type, so the total needs no extra query.
+    facets['total'] = sum(entry['count'] for entry in facets['property_type'])
+    return facets
+
+
+def get_facets(params):
+    """Facet counts for ``params``, through the cache. Invalid filters raise ValidationError."""
+    if not response_cache.is_enabled():
+        return compute_facets(params)
+    key = f'facets:{response_cache.get_version("property")}:{signature(params)}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(params)
+        cache.set(key, facets, getattr(settings, 'PROPERTY_FACET_CACHE_TIMEOUT', 300))
+    return facets
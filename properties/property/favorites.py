@@ -0,0 +1,85 @@
+"""
+Per-user favorite membership.
+
+Each profile's favorited property ids are cached as one set, so "which of
+these N listings are favorited" is N set lookups after at most one query.
+Adds and removes go through bulk_create(ignore_conflicts=True) and a single
+DELETE, relying on the (user, property) unique constraint to make repeats
+harmless; the cached set only answers lookups and never decides a write.
+Saving or deleting any Favorite (admin, cascade, plain ORM) drops the
+owner's cached set.
+
+Settings:
+    PROPERTY_FAVORITES_CACHE_TIMEOUT  lifetime of a cached id set in seconds.
+    PROPERTY_FAVORITES_MAX_BATCH      ids accepted per lookup or bulk request.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Favorite, Property
+
+
+def cache_key(profile_id):
+    return f'favorites:{profile_id}'
+
+
+def favorite_ids(profile_id):
+    """The set of property ids favorited by ``profile_id``."""
+    if profile_id is None:
+        return set()
+    key = cache_key(profile_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = set(Favorite.objects.filter(user_id=profile_id).values_list('property_id', flat=True))
+        cache.set(key, ids, getattr(settings, 'PROPERTY_FAVORITES_CACHE_TIMEOUT', 600))
+    return ids
+
+
+def invalidate(profile_id):
+    cache.delete(cache_key(profile_id))
+
+
+def membership(profile_id, property_ids):
+    ids = favorite_ids(profile_id)
+    return {pk: pk in ids for pk in property_ids}
+
+
+def add_favorites(profile_id, property_ids):
+    """
+    Favorite ``property_ids``; ids already favorited are left alone.
+    Returns (added ids, unknown ids).
+    """
+    wanted = set(property_ids)
+    existing = set(Property.objects.filter(id__in=wanted).values_list('id', flat=True))
+    if not existing:
+        return [], sorted(wanted)
+    with transaction.atomic():
+        rows = Favorite.objects.filter(user_id=profile_id, property_id__in=existing).order_by()
+        before = set(rows.values_list('property_id', flat=True))
+        Favorite.objects.bulk_create(
+            [Favorite(user_id=profile_id, property_id=pk, created_by_id=profile_id) for pk in sorted(existing)],
+            ignore_conflicts=True,
+        )
+        added = set(rows.values_list('property_id', flat=True)) - before
+    if added:
+        invalidate(profile_id)
+    return sorted(added), sorted(wanted - existing)
+
+
+def remove_favorites(profile_id, property_ids):
+    """Unfavorite ``property_ids``. Returns the ids that were favorited."""
+    rows = Favorite.objects.filter(user_id=profile_id, property_id__in=set(property_ids))
+    removed = sorted(rows.order_by().values_list('property_id', flat=True))
+    if removed:
+        rows.delete()
+        invalidate(profile_id)
+    return removed
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def invalidate_favorite(sender, instance, **kwargs):
+    invalidate(instance.user_id)
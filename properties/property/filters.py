@@ -0,0 +1,138 @@
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+
+from .models import Property, PropertyAmenity
+
+TRUE_VALUES = ('1', 'true', 'yes')
+FALSE_VALUES = ('0', 'false', 'no')
+MAX_ID = 2 ** 63 - 1
+
+
+def parse_bool(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    value = value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    if value == 'any':
+        return 'any'
+    raise ValidationError({name: 'Expected true, false or any.'})
+
+
+def parse_decimal(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        value = Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({name: 'Expected a number.'})
+    if not value.is_finite():
+        raise ValidationError({name: 'Expected a finite number.'})
+    return value
+
+
+def parse_int(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: 'Expected a whole number.'})
+    if abs(value) > MAX_ID:
+        raise ValidationError({name: 'Number out of range.'})
+    return value
+
+
+def parse_choices(params, name, choices):
+    value = params.get(name)
+    if not value:
+        return []
+    allowed = {key for key, _ in choices}
+    values = [v.strip().upper() for v in value.split(',') if v.strip()]
+    invalid = [v for v in values if v not in allowed]
+    if invalid:
+        raise ValidationError({name: f'Unknown value(s): {", ".join(invalid)}.'})
+    return values
+
+
+def parse_ids(params, name):
+    value = params.get(name)
+    if not value:
+        return []
+    try:
+        ids = [int(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise ValidationError({name: 'Expected a comma separated list of ids.'})
+    # Anything else is no row's primary key, and SQLite overflows on it.
+    if any(not 1 <= pk <= MAX_ID for pk in ids):
+        raise ValidationError({name: f'Ids must be between 1 and {MAX_ID}.'})
+    return ids
+
+
+def filter_properties(queryset, params):
+    """
+    Apply the search filters in ``params`` (usually request.query_params).
+
+    Supported filters: property_type, price_period (comma separated),
+    min_price, max_price, is_available (true/false/any, default true),
+    featured, city, region, amenity (comma separated ids, all required),
+    min_rating and min_reviews.
+
+    Boolean filters are written as ``IN (...)``: Django renders ``field=True``
+    as a bare column test on SQLite, which cannot use an index. For the same
+    reason ``is_available`` is always constrained (``IN (0, 1)`` for ``any``)
+    since it leads the composite indexes on Property.
+    """
+    is_available = parse_bool(params, 'is_available')
+    if is_available is None:
+        is_available = True
+    if is_available == 'any':
+        queryset = queryset.filter(is_available__in=[True, False])
+    else:
+        queryset = queryset.filter(is_available__in=[is_available])
+
+    property_types = parse_choices(params, 'property_type', Property.PROPERTY_TYPES)
+    if property_types:
+        queryset = queryset.filter(property_type__in=property_types)
+
+    price_periods = parse_choices(params, 'price_period', Property.PRICE_PERIODS)
+    if price_periods:
+        queryset = queryset.filter(price_period__in=price_periods)
+
+    min_price = parse_decimal(params, 'min_price')
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    max_price = parse_decimal(params, 'max_price')
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+
+    featured = parse_bool(params, 'featured')
+    if featured not in (None, 'any'):
+        queryset = queryset.filter(featured__in=[featured])
+
+    min_rating = parse_decimal(params, 'min_rating')
+    if min_rating is not None:
+        queryset = queryset.filter(rating_average__gte=float(min_rating))
+    min_reviews = parse_int(params, 'min_reviews')
+    if min_reviews is not None:
+        queryset = queryset.filter(review_count__gte=min_reviews)
+
+    city = params.get('city')
+    if city:
+        queryset = queryset.filter(location__city=city)
+    region = params.get('region')
+    if region:
+        queryset = queryset.filter(location__region=region)
+
+    for amenity_id in parse_ids(params, 'amenity'):
+        queryset = queryset.filter(
+            id__in=PropertyAmenity.objects.filter(amenity_id=amenity_id).values('property_id')
+        )
+
+    return queryset
@@ -0,0 +1,166 @@
+"""
+Keyword search over property titles, descriptions and locations.
+
+On SQLite the text lives in an FTS5 virtual table (``property_fts``, created
+by migration 0005) whose rowid is the property id. The table is kept in step
+with Property and Location through the signal receivers below. On other
+backends, or when SQLite was built without FTS5, search falls back to
+``icontains`` lookups.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .models import Location, Property
+
+FTS_TABLE = 'property_fts'
+
+# bm25() weights for the title, description and location columns.
+RANK_WEIGHTS = (10.0, 1.0, 3.0)
+
+INSERT_SQL = (
+    f'INSERT INTO {FTS_TABLE} (rowid, title, description, location) '
+    "SELECT p.id, p.title, p.description, "
+    "trim(coalesce(l.street, '') || ' ' || coalesce(l.district, '') || ' ' || l.city) "
+    f'FROM {Property._meta.db_table} p '
+    f'JOIN {Location._meta.db_table} l ON l.id = p.location_id'
+)
+
+CHUNK_SIZE = 500
+
+# Whether the FTS table exists; None until checked. Both answers are cached
+# so a database without it is not introspected on every save and search.
+_enabled = None
+
+
+def is_enabled():
+    global _enabled
+    if connection.vendor != 'sqlite':
+        return False
+    if _enabled is None:
+        _enabled = FTS_TABLE in connection.introspection.table_names()
+    return _enabled
+
+
+@receiver(post_migrate)
+def reset_enabled(sender, **kwargs):
+    """Migrations may have created or dropped the table."""
+    global _enabled
+    _enabled = None
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def index_properties(ids):
+    """(Re)index the given property ids. Missing ids are simply dropped."""
+    if not is_enabled():
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        for chunk in _chunks(ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', chunk)
+            cursor.execute(f'{INSERT_SQL} WHERE p.id IN ({placeholders})', chunk)
+
+
+def remove_properties(ids):
+    if not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', chunk)
+
+
+def index_location(location_id):
+    if not is_enabled():
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid IN '
+            f'(SELECT id FROM {Property._meta.db_table} WHERE location_id = %s)',
+            [location_id],
+        )
+        cursor.execute(f'{INSERT_SQL} WHERE p.location_id = %s', [location_id])
+
+
+def rebuild():
+    """Repopulate the whole index. Returns the number of indexed rows."""
+    if not is_enabled():
+        return 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(INSERT_SQL)
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def terms(text):
+    return re.findall(r'\w+', text or '')
+
+
+def build_match_query(text):
+    """
+    Turn free text into an FTS5 query: every word is required and quoted so
+    user input can't inject FTS syntax; the last word matches as a prefix.
+    """
+    words = terms(text)
+    if not words:
+        return ''
+    quoted = [f'"{word}"' for word in words]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search(text, limit, offset=0):
+    """Return up to ``limit`` property ids matching ``text``, best first."""
+    match = build_match_query(text)
+    if not match:
+        return []
+    if not is_enabled():
+        return _fallback_search(text, limit, offset)
+    weights = ', '.join(str(w) for w in RANK_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s OFFSET %s',
+            [match, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_search(text, limit, offset):
+    queryset = Property.objects.all()
+    for word in terms(text):
+        queryset = queryset.filter(
+            Q(title__icontains=word)
+            | Q(description__icontains=word)
+            | Q(location__street__icontains=word)
+            | Q(location__district__icontains=word)
+            | Q(location__city__icontains=word)
+        )
+    return list(queryset.values_list('id', flat=True)[offset:offset + limit])
+
+
+@receiver(post_save, sender=Property)
+def index_saved_property(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_properties([instance.pk])
+
+
+@receiver(post_delete, sender=Property)
+def remove_deleted_property(sender, instance, **kwargs):
+    remove_properties([instance.pk])
+
+
+@receiver(post_save, sender=Location)
+def index_saved_location(sender, instance, created, raw=False, **kwargs):
+    # A new location has no properties yet; theirs are indexed on save.
+    if not created and not raw:
+        index_location(instance.pk)
@@ -0,0 +1,160 @@
+"""
+Proximity search over Location coordinates without a GIS backend.
+
+Every Location with a latitude/longitude also stores its geohash, an
+indexed string in which nearby points share a prefix. A radius or bounding
+box search covers the area with a handful of geohash cells, turns each cell
+into an index range (``geohash >= cell AND geohash < cell + '~'``) and only
+computes exact distances for the rows found in those ranges.
+
+The geohash is filled in by the pre_save receiver below. QuerySet.update()
+and bulk_create() bypass it, so set ``geohash=encode(lat, lng)`` yourself
+on those paths.
+"""
+import math
+
+from django.db.models import Q
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+
+from .models import Location
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Stored precision: cells of about 5 x 5 metres.
+PRECISION = 9
+# Upper bound on the number of cells (index ranges) in one search.
+MAX_CELLS = 24
+EARTH_RADIUS_KM = 6371.0088
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    value = bits = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        if coordinate >= middle:
+            value = value << 1 | 1
+            interval[0] = middle
+        else:
+            value <<= 1
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            value = bits = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell of ``precision`` characters."""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    """Great-circle (haversine) distance."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(south, west, north, east) around a circle; west/east may run past +-180."""
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = latitude - delta_lat, latitude + delta_lat
+    if south <= -90 or north >= 90:
+        # The circle contains a pole, so it spans every longitude.
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    delta_lng = math.degrees(math.asin(math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude))))
+    return south, longitude - delta_lng, north, longitude + delta_lng
+
+
+def _wrap(longitude):
+    return (longitude + 180.0) % 360.0 - 180.0 if not -180.0 <= longitude <= 180.0 else longitude
+
+
+def covering_cells(south, west, north, east):
+    """
+    The geohash cells overlapping a box, at the finest precision that needs
+    no more than MAX_CELLS of them.
+    """
+    precision = 1
+    for candidate in range(PRECISION, 0, -1):
+        height, width = cell_size(candidate)
+        rows = math.ceil((north - south) / height) + 1
+        columns = math.ceil((east - west) / width) + 1
+        if rows * columns <= MAX_CELLS:
+            precision = candidate
+            break
+
+    height, width = cell_size(precision)
+    cells = set()
+    latitude = south
+    while True:
+        longitude = west
+        while True:
+            cells.add(encode(latitude, _wrap(longitude), precision))
+            if longitude >= east:
+                break
+            longitude = min(longitude + width, east)
+        if latitude >= north:
+            break
+        latitude = min(latitude + height, north)
+    return sorted(cells)
+
+
+def cells_filter(cells, prefix=''):
+    """Q matching rows whose geohash starts with one of ``cells``, as index ranges."""
+    query = Q()
+    for cell in cells:
+        query |= Q(**{f'{prefix}geohash__gte': cell, f'{prefix}geohash__lt': cell + '~'})
+    return query
+
+
+def within_radius(queryset, latitude, longitude, radius_km, prefix='location__'):
+    """
+    ``[(pk, distance_km)]`` for the rows of ``queryset`` within ``radius_km``,
+    nearest first. ``prefix`` is the lookup path from the model to Location.
+    """
+    cells = covering_cells(*bounding_box(latitude, longitude, radius_km))
+    rows = queryset.filter(cells_filter(cells, prefix)).order_by().values_list(
+        'pk', f'{prefix}latitude', f'{prefix}longitude'
+    )
+    matches = []
+    for pk, lat, lng in rows:
+        distance = distance_km(latitude, longitude, lat, lng)
+        if distance <= radius_km:
+            matches.append((pk, distance))
+    matches.sort(key=lambda match: (match[1], match[0]))
+    return matches
+
+
+def within_box(queryset, south, west, north, east, latitude, longitude, prefix='location__'):
+    """
+    ``[(pk, distance_km)]`` for the rows of ``queryset`` inside the box,
+    sorted by distance from (latitude, longitude).
+    """
+    cells = covering_cells(south, west, north, east)
+    rows = queryset.filter(
+        cells_filter(cells, prefix),
+        **{
+            f'{prefix}latitude__gte': south, f'{prefix}latitude__lte': north,
+            f'{prefix}longitude__gte': west, f'{prefix}longitude__lte': east,
+        },
+    ).order_by().values_list('pk', f'{prefix}latitude', f'{prefix}longitude')
+    matches = [(pk, distance_km(latitude, longitude, lat, lng)) for pk, lat, lng in rows]
+    matches.sort(key=lambda match: (match[1], match[0]))
+    return matches
+
+
+@receiver(pre_save, sender=Location)
+def set_geohash(sender, instance, raw=False, **kwargs):
+    if instance.latitude is None or instance.longitude is None:
+        instance.geohash = None
+    else:
+        instance.geohash = encode(instance.latitude, instance.longitude)
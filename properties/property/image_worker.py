@@ -0,0 +1,33 @@
+"""
+Image resizing run inside the thumbnail process pool.
+
+Kept free of Django imports so spawned workers start quickly and never touch
+settings or database connections.
+"""
+import os
+
+from PIL import Image, ImageOps
+
+SAVE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def render_variants(source_path, targets):
+    """
+    Render ``targets``, a list of (key, width, fmt, path), from the image at
+    ``source_path``. Returns the keys that were written.
+    """
+    written = []
+    with Image.open(source_path) as original:
+        original = ImageOps.exif_transpose(original)
+        for key, width, fmt, path in targets:
+            image = original.copy()
+            image.thumbnail((width, width))
+            if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            image.save(path, **SAVE_OPTIONS[fmt])
+            written.append(key)
+    return written
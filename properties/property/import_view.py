@@ -0,0 +1,29 @@
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework import status
+from .authentication import get_profile_id
+from .importer import DEFAULT_CHUNK_SIZE, detect_format, import_properties
+from .models import Profile
+
+
+class PropertyImportView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Please upload a CSV or JSONL file as "file".'}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.data.get('format') or detect_format(upload.name)
+        if fmt not in ('csv', 'jsonl'):
+            return Response({'error': 'Format must be csv or jsonl.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        owner = Profile.objects.filter(pk=get_profile_id(request.user)).first()
+        if owner is None:
+            return Response({'error': 'Profile not found.'}, status=status.HTTP_400_BAD_REQUEST)
+        # Uploads larger than FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to disk
+        # by Django, so reading upload.file line by line keeps memory flat.
+        report = import_properties(upload.file, fmt, owner, chunk_size=DEFAULT_CHUNK_SIZE)
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
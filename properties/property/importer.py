@@ -0,0 +1,235 @@
+"""
+Bulk import of property listings from CSV or JSONL.
+
+Each record is one flat row: the Property fields (title, description,
+property_type, price, price_period, is_available, featured), the Location
+fields (country, region, city, district, street), ``amenities`` (names,
+comma separated in CSV or a list in JSONL) and the fields of the subtype
+matching ``property_type`` (e.g. land_type/area for LAND).
+
+Rows are read lazily and written in chunks, one transaction per chunk, with
+bulk_create for locations, properties, subtype rows and amenity links, so
+memory use depends on the chunk size and not on the file size.
+"""
+import csv
+import io
+import json
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, models, transaction
+
+from . import browse, fulltext, locations, response_cache
+from .filters import FALSE_VALUES, TRUE_VALUES
+from .models import Amenity, Apartment, CampusHostel, Land, Location, Property, PropertyAmenity, Rental
+
+PROPERTY_FIELDS = ('title', 'description', 'property_type', 'price', 'price_period', 'is_available', 'featured')
+LOCATION_FIELDS = ('country', 'region', 'city', 'district', 'street')
+SUBTYPE_MODELS = {
+    'LAND': Land,
+    'RENTAL': Rental,
+    'APARTMENT': Apartment,
+    'HOSTEL': CampusHostel,
+}
+# Columns set by the importer itself rather than read from the row.
+MANAGED_FIELDS = {'property', 'created_at', 'updated_at', 'created_by', 'modified_by'}
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def detect_format(name):
+    return 'jsonl' if name.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def iter_records(stream, fmt):
+    """Yield (row_number, dict) pairs from a binary or text stream."""
+    if isinstance(stream, io.TextIOBase):
+        text = stream
+    else:
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'jsonl':
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield number, exc
+                continue
+            yield number, record
+    else:
+        # Row 1 is the header.
+        for number, record in enumerate(csv.DictReader(text), start=2):
+            yield number, record
+
+
+def _blank_to_none(value):
+    if isinstance(value, str):
+        value = value.strip()
+    return None if value in ('', None) else value
+
+
+def _coerce_booleans(model, values):
+    for name, value in values.items():
+        if isinstance(value, str) and isinstance(model._meta.get_field(name), models.BooleanField):
+            if value.lower() in TRUE_VALUES:
+                values[name] = True
+            elif value.lower() in FALSE_VALUES:
+                values[name] = False
+    return values
+
+
+def subtype_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if field.name not in MANAGED_FIELDS
+    ]
+
+
+def _errors_of(exc):
+    return exc.message_dict if hasattr(exc, 'error_dict') else {'__all__': exc.messages}
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row, errors):
+        self.failed += 1
+        self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self):
+        return {'created': self.created, 'failed': self.failed, 'errors': self.errors}
+
+
+class PropertyImporter:
+    def __init__(self, owner, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.owner = owner
+        self.chunk_size = chunk_size
+        self.report = ImportReport()
+        self.amenity_ids = {}
+
+    def run(self, records):
+        chunk = []
+        for number, record in records:
+            chunk.append((number, record))
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+        return self.report
+
+    def parse(self, record):
+        """Build unsaved Property/subtype instances for one row or raise ValidationError."""
+        if isinstance(record, Exception):
+            raise ValidationError(f'Malformed record: {record}')
+        if not isinstance(record, dict):
+            raise ValidationError('Each record must be an object.')
+        record = {key.strip(): _blank_to_none(value) for key, value in record.items() if key}
+
+        location_key = tuple(record.get(name) for name in LOCATION_FIELDS)
+        missing = {name: ['This field is required.'] for name in ('country', 'region', 'city') if not record.get(name)}
+        if missing:
+            raise ValidationError(missing)
+
+        values = {name: record[name] for name in PROPERTY_FIELDS if record.get(name) is not None}
+        prop = Property(owner=self.owner, created_by=self.owner, **_coerce_booleans(Property, values))
+        prop.clean_fields(exclude=['owner', 'location'])
+
+        subtype_model = SUBTYPE_MODELS[prop.property_type]
+        subtype_values = {
+            field.name: record[field.name]
+            for field in subtype_fields(subtype_model) if record.get(field.name) is not None
+        }
+        subtype = subtype_model(created_by=self.owner, **_coerce_booleans(subtype_model, subtype_values))
+        subtype.clean_fields(exclude=['property'])
+
+        amenities = record.get('amenities') or []
+        if isinstance(amenities, str):
+            amenities = amenities.split(',')
+        if not isinstance(amenities, list) or not all(isinstance(name, str) for name in amenities):
+            raise ValidationError({'amenities': ['Expected a list of amenity names.']})
+        amenities = sorted({name.strip() for name in amenities if name and name.strip()})
+        return prop, subtype, location_key, amenities
+
+    def resolve_locations(self, keys):
+        """{location tuple: id}; tuples normalizing to the same key share one location."""
+        normalized = {key: locations.location_key(dict(zip(LOCATION_FIELDS, key))) for key in keys}
+        ids = {value: locations.cached_id(value) for value in set(normalized.values())}
+        unknown = [value for value, pk in ids.items() if pk is None]
+        ids.update(Location.objects.filter(normalized_key__in=unknown).values_list('normalized_key', 'id'))
+        missing = {}
+        for key, value in normalized.items():
+            if ids[value] is None:
+                missing.setdefault(value, key)
+        # bulk_create skips the pre_save receiver that sets the key.
+        created = Location.objects.bulk_create(
+            Location(created_by=self.owner, normalized_key=value, **dict(zip(LOCATION_FIELDS, key)))
+            for value, key in missing.items()
+        )
+        for location in created:
+            ids[location.normalized_key] = location.pk
+        for value, pk in ids.items():
+            locations.remember(value, pk, created=value in missing)
+        return {key: ids[value] for key, value in normalized.items()}
+
+    def resolve_amenities(self, names):
+        missing = [name for name in names if name not in self.amenity_ids]
+        if missing:
+            Amenity.objects.bulk_create(
+                [Amenity(name=name, created_by=self.owner) for name in missing], ignore_conflicts=True
+            )
+            self.amenity_ids.update(Amenity.objects.filter(name__in=missing).values_list('name', 'id'))
+
+    def import_chunk(self, chunk):
+        parsed = []
+        for number, record in chunk:
+            try:
+                parsed.append((number,) + self.parse(record))
+            except ValidationError as exc:
+                self.report.add_error(number, _errors_of(exc))
+        if not parsed:
+            return
+
+        try:
+            with transaction.atomic():
+                location_ids = self.resolve_locations({row[3] for row in parsed})
+                self.resolve_amenities({name for row in parsed for name in row[4]})
+                properties = []
+                for _, prop, _, location_key, _ in parsed:
+                    prop.location_id = location_ids[location_key]
+                    properties.append(prop)
+                Property.objects.bulk_create(properties)
+
+                subtypes = {}
+                links = []
+                for _, prop, subtype, _, amenities in parsed:
+                    subtype.property = prop
+                    subtypes.setdefault(type(subtype), []).append(subtype)
+                    links.extend(
+                        PropertyAmenity(property=prop, amenity_id=self.amenity_ids[name], added_by=self.owner)
+                        for name in amenities
+                    )
+                for model, rows in subtypes.items():
+                    model.objects.bulk_create(rows)
+                PropertyAmenity.objects.bulk_create(links)
+                # In the chunk's transaction so a rollback leaves the browse counts alone.
+                browse.apply_deltas(Counter(prop.location_id for prop in properties if prop.is_available))
+        except DatabaseError as exc:
+            # Amenities created in the rolled back transaction are gone too.
+            self.amenity_ids = {}
+            for row in parsed:
+                self.report.add_error(row[0], {'__all__': [str(exc)]})
+            return
+
+        # bulk_create skips signals, so refresh derived data for the chunk here.
+        fulltext.index_properties(prop.pk for prop in properties)
+        response_cache.bump('property')
+        self.report.created += len(properties)
+
+
+def import_properties(stream, fmt, owner, chunk_size=DEFAULT_CHUNK_SIZE):
+    return PropertyImporter(owner, chunk_size).run(iter_records(stream, fmt))
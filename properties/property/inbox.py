@@ -0,0 +1,199 @@
+"""
+Inquiry inbox for property owners and managers.
+
+Every Inquiry carries copies of its property's owner and managed_by
+(property_owner, property_manager). Each is indexed together with
+(status, -date_sent, -id), so one recipient's queue for one status is a
+single index range scan that keyset pagination walks without sorting.
+
+Profile.unread_inquiries counts the NEW inquiries a profile receives. The
+receivers below apply each inquiry save or delete as
+``UPDATE ... SET unread_inquiries = unread_inquiries + delta`` and
+``transition`` does the same for bulk status changes, so reading the count
+is a primary key lookup. A profile that both owns and manages a property
+receives its inquiries once.
+
+QuerySet.update()/bulk_create() on Inquiry bypass the signals; use
+``transition`` for status changes and run the ``reconcile_inbox`` command
+after other bulk writes.
+
+Settings:
+    PROPERTY_INBOX_MAX_BATCH  inquiries accepted per bulk status change.
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Inquiry, Profile, Property
+
+UNREAD = 'NEW'
+ROLES = {
+    'owner': ('property_owner',),
+    'manager': ('property_manager',),
+    'any': ('property_owner', 'property_manager'),
+}
+RECONCILE_CHUNK_SIZE = 2000
+
+
+def recipients(owner_id, manager_id):
+    return {owner_id, manager_id} - {None}
+
+
+def contribution(inquiry):
+    """Profile ids whose unread count includes ``inquiry``."""
+    if inquiry is None or inquiry.status != UNREAD:
+        return set()
+    return recipients(inquiry.property_owner_id, inquiry.property_manager_id)
+
+
+def apply_deltas(deltas):
+    """Apply {profile_id: delta}, one UPDATE per distinct delta."""
+    by_delta = {}
+    for profile_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(profile_id)
+    for delta, profile_ids in by_delta.items():
+        Profile.objects.filter(pk__in=profile_ids).update(unread_inquiries=F('unread_inquiries') + delta)
+
+
+def apply_change(old, new):
+    deltas = {pk: -1 for pk in old - new}
+    deltas.update({pk: 1 for pk in new - old})
+    apply_deltas(deltas)
+
+
+@receiver(pre_save, sender=Inquiry)
+def copy_recipients(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    prop = instance.property
+    instance.property_owner_id = prop.owner_id
+    instance.property_manager_id = prop.managed_by_id
+    previous = None
+    if instance.pk is not None:
+        previous = (
+            Inquiry.objects.filter(pk=instance.pk)
+            .only('status', 'property_owner', 'property_manager').first()
+        )
+    instance._previous_unread = contribution(previous)
+
+
+@receiver(post_save, sender=Inquiry)
+def update_unread_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    with transaction.atomic():
+        apply_change(getattr(instance, '_previous_unread', set()), contribution(instance))
+    instance._previous_unread = contribution(instance)
+
+
+@receiver(post_delete, sender=Inquiry)
+def update_unread_on_delete(sender, instance, **kwargs):
+    apply_change(contribution(instance), set())
+
+
+@receiver(post_save, sender=Property)
+def follow_property_recipients(sender, instance, created, raw=False, **kwargs):
+    """Move a property's inquiries to its new owner or manager."""
+    if created or raw:
+        return
+    stale = Inquiry.objects.filter(property_id=instance.pk).exclude(
+        property_owner_id=instance.owner_id, property_manager_id=instance.managed_by_id,
+    )
+    previous = list(stale.order_by().values_list('property_owner_id', 'property_manager_id').distinct())
+    if not previous:
+        return
+    affected = set()
+    for owner_id, manager_id in previous:
+        affected |= recipients(owner_id, manager_id)
+    with transaction.atomic():
+        stale.update(property_owner_id=instance.owner_id, property_manager_id=instance.managed_by_id)
+        recompute(affected | recipients(instance.owner_id, instance.managed_by_id))
+
+
+def received(profile_id, role='any'):
+    """Inquiries ``profile_id`` receives as ``role`` (a key of ROLES)."""
+    if profile_id is None:
+        # A NULL manager would otherwise match every unmanaged property.
+        return Inquiry.objects.none()
+    condition = Q()
+    for field in ROLES[role]:
+        condition |= Q(**{field: profile_id})
+    return Inquiry.objects.filter(condition)
+
+
+def unread_count(profile_id):
+    return Profile.objects.filter(pk=profile_id).values_list('unread_inquiries', flat=True).first() or 0
+
+
+def transition(profile_id, inquiry_ids, new_status):
+    """
+    Move the inquiries in ``inquiry_ids`` received by ``profile_id`` to
+    ``new_status`` with a single UPDATE, stamping responded_at/responded_by
+    unless they are being reopened. Returns the ids that changed.
+    """
+    rows = received(profile_id).filter(pk__in=inquiry_ids).exclude(status=new_status)
+    with transaction.atomic():
+        changed = list(rows.order_by().values_list('id', 'status', 'property_owner_id', 'property_manager_id'))
+        if not changed:
+            return []
+        now = timezone.now()
+        fields = {'status': new_status, 'updated_at': now, 'modified_by_id': profile_id}
+        if new_status != UNREAD:
+            fields.update(responded_at=now, responded_by_id=profile_id)
+        Inquiry.objects.filter(pk__in=[row[0] for row in changed]).update(**fields)
+
+        deltas = {}
+        for _, old_status, owner_id, manager_id in changed:
+            delta = (new_status == UNREAD) - (old_status == UNREAD)
+            for pk in recipients(owner_id, manager_id):
+                deltas[pk] = deltas.get(pk, 0) + delta
+        apply_deltas(deltas)
+    return sorted(row[0] for row in changed)
+
+
+def recompute(profile_ids):
+    """Rebuild unread_inquiries of ``profile_ids`` from the inquiries table."""
+    counts = dict.fromkeys(profile_ids, 0)
+    unread = Inquiry.objects.filter(status=UNREAD).order_by()
+    owned = unread.filter(property_owner__in=counts).values_list('property_owner').annotate(total=Count('id'))
+    # Inquiries on a property its owner also manages were counted above.
+    managed = (
+        unread.filter(property_manager__in=counts).exclude(property_owner=F('property_manager'))
+        .values_list('property_manager').annotate(total=Count('id'))
+    )
+    for rows in (owned, managed):
+        for profile_id, total in rows:
+            counts[profile_id] += total
+    Profile.objects.bulk_update(
+        [Profile(pk=pk, unread_inquiries=total) for pk, total in counts.items()], ['unread_inquiries'],
+    )
+
+
+def sync_recipients():
+    """Copy owner/managed_by from every property onto its inquiries."""
+    prop = Property.objects.filter(pk=OuterRef('property_id'))
+    return Inquiry.objects.update(
+        property_owner_id=Subquery(prop.values('owner_id')[:1]),
+        property_manager_id=Subquery(prop.values('managed_by_id')[:1]),
+    )
+
+
+def reconcile(chunk_size=RECONCILE_CHUNK_SIZE):
+    """Resync recipients, then recount every profile in chunks of ids. Returns the number of profiles."""
+    sync_recipients()
+    total = 0
+    last_pk = 0
+    while True:
+        ids = list(
+            Profile.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            recompute(ids)
+        total += len(ids)
+        last_pk = ids[-1]
+    return total
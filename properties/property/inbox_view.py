@@ -0,0 +1,63 @@
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from . import inbox
+from .authentication import HasProfile, get_profile_id
+from .models import Inquiry
+from .pagination import InquiryCursorPagination
+from .serializers import InquirySerializer, InquiryTransitionSerializer
+
+STATUSES = {value for value, _ in Inquiry.INQUIRY_STATUS}
+
+
+class InquiryInboxView(APIView):
+    """
+    Inquiries received on the caller's properties, newest first.
+
+    ``?status=NEW`` (comma separated) and ``?role=owner|manager|any`` narrow
+    the queue; a single status with role owner or manager reads one index
+    range. Pages are keyset cursors; ``unread`` is the caller's count of NEW
+    inquiries.
+    """
+    permission_classes = [IsAuthenticated, HasProfile]
+
+    def get(self, request):
+        role = request.query_params.get('role') or 'any'
+        if role not in inbox.ROLES:
+            raise ValidationError({'role': f'Choose one of: {", ".join(inbox.ROLES)}.'})
+        statuses = [s for s in request.query_params.get('status', '').upper().split(',') if s]
+        if not set(statuses) <= STATUSES:
+            raise ValidationError({'status': f'Choose from: {", ".join(sorted(STATUSES))}.'})
+
+        profile_id = get_profile_id(request.user)
+        queryset = inbox.received(profile_id, role)
+        if statuses:
+            queryset = queryset.filter(status__in=statuses)
+
+        paginator = InquiryCursorPagination()
+        page = paginator.paginate_queryset(queryset, request)
+        response = paginator.get_paginated_response(InquirySerializer(page, many=True).data)
+        response.data['unread'] = inbox.unread_count(profile_id)
+        return response
+
+
+class InquiryUnreadView(APIView):
+    permission_classes = [IsAuthenticated, HasProfile]
+
+    def get(self, request):
+        return Response({'unread': inbox.unread_count(get_profile_id(request.user))})
+
+
+class InquiryStatusView(APIView):
+    """``POST {"ids": [...], "status": "CONTACTED"}`` moves many inquiries at once."""
+    permission_classes = [IsAuthenticated, HasProfile]
+
+    def post(self, request):
+        serializer = InquiryTransitionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        profile_id = get_profile_id(request.user)
+        updated = inbox.transition(profile_id, serializer.validated_data['ids'], serializer.validated_data['status'])
+        return Response({'updated': updated, 'unread': inbox.unread_count(profile_id)})
@@ -2,12 +2,17 @@ from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from . import mass_delete
 from .models import Location
+from .response_cache import cached_response
 from .serializers import LocationSerializer
 
 
 class LocationView(APIView):
     def get(self, request, pk=None):
+        return cached_response(request, 'location', pk, lambda: self.build_get(request, pk))
+
+    def build_get(self, request, pk=None):
         if pk is not None:
             try:
                 Location_obj = Location.objects.get(pk=pk)
@@ -50,7 +55,7 @@ class LocationView(APIView):
             Location_obj.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
         else:
-            Location.objects.all().delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
+            queryset = mass_delete.scoped_queryset(Location, request.query_params)
+            return Response({'deleted': mass_delete.delete_queryset(queryset)})
 
 # Create your views here.
@@ -0,0 +1,226 @@
+"""
+Location normalization and get-or-create resolution.
+
+Location.normalized_key holds the five address parts casefolded, with
+whitespace collapsed and NULL read as empty, joined with '|'. Its unique
+index replaces the old unique_together on the raw columns, which SQLite
+never enforced for rows with a NULL district or street.
+
+``resolve`` maps address parts to a location id through an in-process LRU
+cache, creating the row the first time, so creating properties in a known
+location does not query the locations table. Entries expire after
+PROPERTY_LOCATION_CACHE_TIMEOUT seconds: with several worker processes a
+location deleted or merged elsewhere is forgotten by then at the latest.
+
+``dedupe`` recomputes every key (e.g. after the normalization changes),
+repoints the properties of duplicate locations at the oldest one and
+deletes the rest; see the ``dedupe_locations`` command.
+
+Settings:
+    PROPERTY_LOCATION_CACHE_SIZE     entries kept by the resolver.
+    PROPERTY_LOCATION_CACHE_TIMEOUT  seconds an entry stays valid.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import fulltext, response_cache
+from .models import Location, Property
+
+LOCATION_FIELDS = ('country', 'region', 'city', 'district', 'street')
+SEPARATOR = '|'
+
+
+def normalize(value):
+    return ' '.join(str(value or '').replace(SEPARATOR, ' ').split()).casefold()
+
+
+def location_key(fields):
+    """The normalized key of a mapping (or Location) holding the address parts."""
+    get = fields.get if isinstance(fields, dict) else lambda name: getattr(fields, name)
+    return SEPARATOR.join(normalize(get(name)) for name in LOCATION_FIELDS)
+
+
+class LRUCache:
+    """Thread-safe mapping keeping the most recently used entries, each for ``timeout`` seconds."""
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (value, expires_at)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def pop(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+        return None if entry is None else entry[0]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+cache = LRUCache(
+    getattr(settings, 'PROPERTY_LOCATION_CACHE_SIZE', 4096),
+    getattr(settings, 'PROPERTY_LOCATION_CACHE_TIMEOUT', 300),
+)
+
+
+def remember(key, pk, created=False):
+    """Cache ``key`` -> ``pk``; a row created in the current transaction only once it commits."""
+    def store():
+        cache.set(('key', key), pk)
+        cache.set(('id', pk), key)
+
+    if created:
+        transaction.on_commit(store)
+    else:
+        store()
+
+
+def forget(pk):
+    key = cache.pop(('id', pk))
+    if key is not None:
+        cache.pop(('key', key))
+
+
+def cached_id(key):
+    return cache.get(('key', key))
+
+
+def exists(pk):
+    """Whether location ``pk`` exists, answered from the cache when possible."""
+    if cache.get(('id', pk)) is not None:
+        return True
+    key = Location.objects.filter(pk=pk).values_list('normalized_key', flat=True).first()
+    if key is None:
+        return False
+    remember(key, pk)
+    return True
+
+
+def keys_of(location_ids):
+    """{location id: normalized key} for ``location_ids``, from the cache where possible."""
+    keys, unknown = {}, []
+    for pk in location_ids:
+        key = cache.get(('id', pk))
+        if key is None:
+            unknown.append(pk)
+        else:
+            keys[pk] = key
+    if unknown:
+        for pk, key in Location.objects.filter(pk__in=unknown).values_list('pk', 'normalized_key'):
+            remember(key, pk)
+            keys[pk] = key
+    return keys
+
+
+def get_or_create(fields, created_by=None):
+    """
+    The Location matching the address parts in ``fields``, created with
+    all of ``fields`` when there is none. Returns (location, created).
+    """
+    key = location_key(fields)
+    location = Location.objects.filter(normalized_key=key).first()
+    created = False
+    if location is None:
+        try:
+            with transaction.atomic():
+                location = Location.objects.create(**{'created_by': created_by, **fields})
+            created = True
+        except IntegrityError:
+            # Another request created it in the meantime.
+            location = Location.objects.get(normalized_key=key)
+    remember(key, location.pk, created)
+    return location, created
+
+
+def resolve(fields, created_by=None):
+    """The id of the location matching ``fields``, created if needed. Returns (id, created)."""
+    pk = cached_id(location_key(fields))
+    if pk is not None:
+        return pk, False
+    location, created = get_or_create(fields, created_by)
+    return location.pk, created
+
+
+@receiver(pre_save, sender=Location)
+def set_normalized_key(sender, instance, **kwargs):
+    instance.normalized_key = location_key(instance)
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def forget_location(sender, instance, **kwargs):
+    forget(instance.pk)
+
+
+def dedupe():
+    """
+    Recompute every normalized key and merge locations sharing one into the
+    oldest. Returns (merged locations, repointed properties).
+    """
+    groups = {}
+    stored = {}
+    for row in Location.objects.order_by('pk').values('pk', 'normalized_key', *LOCATION_FIELDS).iterator():
+        groups.setdefault(location_key(row), []).append(row['pk'])
+        stored[row['pk']] = row['normalized_key']
+
+    merged = repointed = 0
+    with transaction.atomic():
+        for key, ids in groups.items():
+            keep, extras = ids[0], ids[1:]
+            if extras:
+                moved = list(Property.objects.filter(location_id__in=extras).values_list('pk', flat=True))
+                repointed += Property.objects.filter(pk__in=moved).update(location_id=keep)
+                fill_coordinates(keep, extras)
+                Location.objects.filter(pk__in=extras).delete()
+                merged += len(extras)
+                fulltext.index_properties(moved)
+                for pk in moved:
+                    response_cache.bump('property', pk)
+        # Only after the duplicates are gone can the new keys be unique.
+        for key, ids in groups.items():
+            if stored[ids[0]] != key:
+                Location.objects.filter(pk=ids[0]).update(normalized_key=key)
+    cache.clear()
+    response_cache.bump('property')
+    response_cache.bump('location')
+    return merged, repointed
+
+
+def fill_coordinates(keep, extras):
+    """Copy coordinates from a duplicate when the kept location has none."""
+    location = Location.objects.get(pk=keep)
+    if location.latitude is not None:
+        return
+    donor = Location.objects.filter(pk__in=extras, latitude__isnull=False).order_by('pk').first()
+    if donor is not None:
+        location.latitude, location.longitude = donor.latitude, donor.longitude
+        location.save()
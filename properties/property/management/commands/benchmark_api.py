@@ -0,0 +1,90 @@
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import get_runner, override_settings
+from django.utils import timezone
+
+from property import benchmark
+from property.view_counter import view_counter
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the REST API hot paths against a throwaway test database seeded with '
+        'synthetic data, and write latency, throughput and query counts as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--properties', type=int, default=1000, help='Number of properties to seed.')
+        parser.add_argument('--iterations', type=int, default=50, help='Measured requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per scenario.')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for data and request choice.')
+        parser.add_argument('--scenario', action='append', dest='scenarios', help='Only run these scenarios.')
+        parser.add_argument('--with-cache', action='store_true', help='Keep the response cache enabled.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--baseline', help='Compare against an earlier results file.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed p95 latency growth against the baseline, as a fraction.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as fh:
+                baseline = json.load(fh)
+
+        runner = get_runner(settings)(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            with override_settings(
+                PROPERTY_RESPONSE_CACHE_ENABLED=options['with_cache'],
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            ):
+                cache.clear()
+                self.stdout.write(f'Seeding {options["properties"]} properties...')
+                sizes = benchmark.seed(options['properties'], rng_seed=options['seed'])
+                results = benchmark.run(
+                    iterations=options['iterations'], warmup=options['warmup'],
+                    rng_seed=options['seed'], only=options['scenarios'],
+                )
+                view_counter.flush()
+        finally:
+            runner.teardown_databases(old_config)
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'dataset': sizes,
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'seed': options['seed'],
+                'response_cache': options['with_cache'],
+                'environment': benchmark.environment(),
+            },
+            'scenarios': results,
+        }
+        self.print_table(results)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2, sort_keys=True)
+            self.stdout.write(f'Wrote {options["output"]}.')
+
+        if baseline is not None:
+            regressions = benchmark.compare(results, baseline['scenarios'], options['tolerance'])
+            for item in regressions:
+                self.stdout.write(self.style.ERROR(
+                    f'{item["scenario"]}: {item["metric"]} {item["baseline"]:.2f} -> {item["current"]:.2f}'
+                ))
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}.')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+    def print_table(self, results):
+        self.stdout.write(f'{"scenario":<28} {"p50":>8} {"p95":>8} {"p99":>8} {"rps":>8} {"queries":>8}  status')
+        for name, result in results.items():
+            latency = result['latency_ms']
+            self.stdout.write(
+                f'{name:<28} {latency["p50"]:>8.2f} {latency["p95"]:>8.2f} {latency["p99"]:>8.2f} '
+                f'{result["throughput_rps"]:>8.1f} {result["queries"]["mean"]:>8.1f}  {result["status_codes"]}'
+            )
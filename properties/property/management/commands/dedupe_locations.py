@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from property.browse import rebuild
+from property.locations import dedupe
+
+
+class Command(BaseCommand):
+    help = 'Recompute location keys and merge locations that normalize to the same address.'
+
+    def handle(self, *args, **options):
+        merged, repointed = dedupe()
+        # Browse nodes are keyed by the normalized names, which dedupe may have changed.
+        rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Merged {merged} duplicate locations; repointed {repointed} properties.'
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from property.exporter import STREAMERS, export_rows, parse_since
+
+
+class Command(BaseCommand):
+    help = 'Stream the property catalogue as CSV or JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(STREAMERS), default='jsonl')
+        parser.add_argument('--since', help='Only rows updated after this ISO date/datetime.')
+        parser.add_argument('--output', help='File to write to; defaults to stdout.')
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched per query.')
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_since(options['since'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        streamer, _ = STREAMERS[options['format']]
+        lines = streamer(export_rows(since, chunk_size=options['chunk_size']))
+        if options['output']:
+            with open(options['output'], 'w', newline='') as out:
+                out.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from property.view_counter import request_flush, view_counter
+
+
+class Command(BaseCommand):
+    help = 'Flush buffered property view counts to the database.'
+
+    def handle(self, *args, **options):
+        flushed = view_counter.flush()
+        request_flush()
+        self.stdout.write(self.style.SUCCESS(
+            f'Flushed {flushed} local counts and asked running workers to flush.'
+        ))
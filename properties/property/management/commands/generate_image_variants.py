@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from property.models import Profile, PropertyImage
+from property.thumbnails import backfill
+
+MODELS = {
+    'property-images': PropertyImage,
+    'profile-pictures': Profile,
+}
+
+
+class Command(BaseCommand):
+    help = 'Render resized variants for stored property images and profile pictures.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=sorted(MODELS), help='Limit the backfill to one kind of image.')
+        parser.add_argument('--workers', type=int, help='Worker processes; defaults to the CPU count.')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--force', action='store_true', help='Re-render images that already have variants.')
+
+    def handle(self, *args, **options):
+        names = [options['only']] if options['only'] else sorted(MODELS)
+        for name in names:
+            rendered, failed = backfill(
+                MODELS[name], workers=options['workers'], batch_size=options['batch_size'], force=options['force']
+            )
+            self.stdout.write(f'{name}: rendered {rendered}, failed {failed}.')
@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from property.importer import DEFAULT_CHUNK_SIZE, detect_format, import_properties
+from property.models import Profile
+
+
+class Command(BaseCommand):
+    help = 'Import property listings from a CSV or JSONL file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import.')
+        parser.add_argument('--owner', required=True, help='Username that will own the imported listings.')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--report', help='Write row errors as JSONL to this file.')
+
+    def handle(self, *args, **options):
+        owner = Profile.objects.filter(user__username=options['owner']).first()
+        if owner is None:
+            raise CommandError(f"No profile for user {options['owner']!r}.")
+        fmt = options['format'] or detect_format(options['path'])
+
+        with open(options['path'], 'rb') as stream:
+            report = import_properties(stream, fmt, owner, chunk_size=options['chunk_size'])
+
+        if options['report']:
+            with open(options['report'], 'w') as out:
+                for error in report.errors:
+                    out.write(json.dumps(error) + '\n')
+        else:
+            for error in report.errors:
+                self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(f'Imported {report.created} properties, {report.failed} rows failed.'))
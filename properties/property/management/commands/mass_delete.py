@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+from rest_framework.exceptions import ValidationError
+
+from property import mass_delete
+from property.models import Amenity, Location, Property
+
+MODELS = {'property': Property, 'location': Location, 'amenity': Amenity}
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete properties, locations or amenities in chunks, with the same scoping as the '
+        'DELETE endpoints: --filter city=Accra --filter property_type=LAND, --filter ids=1,2 or --all.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(MODELS))
+        parser.add_argument('--filter', action='append', default=[], metavar='NAME=VALUE')
+        parser.add_argument('--all', action='store_true', help='Delete every row.')
+        parser.add_argument('--chunk-size', type=int, help='Rows per transaction.')
+
+    def handle(self, *args, **options):
+        params = QueryDict(mutable=True)
+        for item in options['filter']:
+            name, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'Expected NAME=VALUE, got {item!r}.')
+            params[name] = value
+        if options['all']:
+            params['all'] = 'true'
+        try:
+            queryset = mass_delete.scoped_queryset(MODELS[options['model']], params)
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        def progress(done, total):
+            self.stdout.write(f'{done}/{total} {options["model"]} rows deleted')
+
+        counts = mass_delete.delete_queryset(queryset, chunk_size=options['chunk_size'], progress=progress)
+        for label, count in sorted(counts.items()):
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(self.style.SUCCESS('Done.'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from property.browse import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recount the available properties of every country/region/city/district browse node.'
+
+    def handle(self, *args, **options):
+        total = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} location browse nodes.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from property import fulltext
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for properties.'
+
+    def handle(self, *args, **options):
+        if not fulltext.is_enabled():
+            self.stdout.write('Full-text index is not available on this database; nothing to do.')
+            return
+        count = fulltext.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} properties.'))
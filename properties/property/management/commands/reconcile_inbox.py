@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from property.inbox import RECONCILE_CHUNK_SIZE, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Resync inquiry recipients and recount the unread inquiries of every profile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=RECONCILE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        total = reconcile(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Reconciled unread inquiries for {total} profiles.'))
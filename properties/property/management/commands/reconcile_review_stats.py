@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from property.review_stats import RECONCILE_CHUNK_SIZE, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized review aggregates on every property.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=RECONCILE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        total = reconcile(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Reconciled review stats for {total} properties.'))
@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from property.database import load_test
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent writers and readers against a scratch SQLite file, first with the bare '
+        'default setup and then with the tuned pragmas, and report throughput and lock errors.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per run.')
+        parser.add_argument('--timeout', type=float, default=5.0, help='Connect/busy timeout in seconds.')
+        parser.add_argument('--json', action='store_true', help='Print the raw results as JSON.')
+
+    def handle(self, *args, **options):
+        reports = load_test(
+            writers=options['writers'], readers=options['readers'],
+            duration=options['duration'], timeout=options['timeout'],
+        )
+        if options['json']:
+            self.stdout.write(json.dumps(reports, indent=2))
+            return
+        for label, report in reports.items():
+            for role, row in report.items():
+                p95 = f'{row["p95_ms"]:.2f}ms' if row['p95_ms'] is not None else '-'
+                self.stdout.write(
+                    f'{label:<9} {role:<7} {row["ops_per_second"]:>10.1f} ops/s  '
+                    f'p95 {p95:>10}  errors {row["errors"]}'
+                )
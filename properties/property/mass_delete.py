@@ -0,0 +1,267 @@
+"""
+Chunked mass deletes for properties, locations and amenities.
+
+QuerySet.delete() hands every row to Django's collector, which loads all
+dependent rows (images, amenity links, reviews, inquiries, favorites,
+subtype rows ...) into memory and deletes them in one transaction that
+holds SQLite's write lock until the end. ``delete_queryset`` instead walks
+the matching primary keys in chunks of PROPERTY_DELETE_CHUNK_SIZE, each in
+its own short transaction:
+
+* dependents that have dependents of their own (a location's properties)
+  are deleted first by the same chunked walk;
+* leaf dependents go with one ``DELETE ... WHERE <fk> IN (...)`` per table,
+  and SET_NULL references with one ``UPDATE``;
+* then the chunk's own rows.
+
+Any other on_delete (PROTECT, RESTRICT, SET_DEFAULT, SET()) is not safe
+to do in raw SQL, so such a model falls back to the collector, one chunk
+at a time.
+
+Raw SQL skips the model signals, so ``HOOKS`` refreshes what they would
+have maintained (the full-text index, browse counts, unread inquiry counts,
+the location resolver, favorite and response caches). Image files are
+removed after the chunk commits, on a background thread unless
+PROPERTY_DELETE_FILES_ASYNC is off.
+
+Settings:
+    PROPERTY_DELETE_CHUNK_SIZE    rows per chunk and transaction.
+    PROPERTY_DELETE_FILES_ASYNC   False removes image files inline, e.g. in tests.
+"""
+import logging
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, models, transaction
+from rest_framework.exceptions import ValidationError
+
+from . import browse, favorites, fulltext, inbox, locations, response_cache
+from .facets import FILTER_PARAMS
+from .filters import filter_properties, parse_bool, parse_ids
+from .models import Amenity, Favorite, Inquiry, Location, Property, PropertyAmenity, PropertyImage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+RAW_ACTIONS = (models.CASCADE, models.SET_NULL, models.DO_NOTHING)
+
+
+def chunk_size_setting():
+    return getattr(settings, 'PROPERTY_DELETE_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+def reverse_relations(model):
+    """(related model, foreign key field, on_delete) for every foreign key pointing at ``model``."""
+    return [
+        (rel.related_model, rel.field, rel.on_delete)
+        for rel in model._meta.related_objects
+        if rel.one_to_many or rel.one_to_one
+    ]
+
+
+def has_dependents(model):
+    return any(on_delete is not models.DO_NOTHING for _, _, on_delete in reverse_relations(model))
+
+
+@lru_cache(maxsize=None)
+def is_raw_safe(model):
+    """Whether ``model`` and everything cascading from it can be deleted with raw SQL."""
+    for related, _, on_delete in reverse_relations(model):
+        if on_delete not in RAW_ACTIONS:
+            return False
+        if on_delete is models.CASCADE and not is_raw_safe(related):
+            return False
+    return True
+
+
+def execute(sql, ids):
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(placeholders=', '.join(['%s'] * len(ids))), ids)
+        return cursor.rowcount
+
+
+def delete_files(names):
+    def run():
+        for name in names:
+            try:
+                default_storage.delete(name)
+            except Exception:
+                logger.exception('Could not delete file %s', name)
+
+    if getattr(settings, 'PROPERTY_DELETE_FILES_ASYNC', True):
+        threading.Thread(target=run, daemon=True).start()
+    else:
+        run()
+
+
+def property_effects(ids):
+    """Collect what the deleted properties leave behind; returns the follow-up to run after the deletes."""
+    names = []
+    for image, variants in PropertyImage.objects.filter(property_id__in=ids).values_list('image', 'variants'):
+        names.extend([image, *(variants or {}).values()])
+    unread = Inquiry.objects.filter(property_id__in=ids, status=inbox.UNREAD).order_by()
+    recipients = set()
+    for owner_id, manager_id in unread.values_list('property_owner_id', 'property_manager_id').distinct():
+        recipients |= inbox.recipients(owner_id, manager_id)
+    fans = set(Favorite.objects.filter(property_id__in=ids).order_by().values_list('user_id', flat=True).distinct())
+    available = browse.available_by_location(ids)
+
+    def after():
+        fulltext.remove_properties(ids)
+        browse.apply_deltas({location_id: -total for location_id, total in available.items()})
+        inbox.recompute(recipients)
+        for profile_id in fans - {None}:
+            favorites.invalidate(profile_id)
+        for pk in ids:
+            response_cache.bump('property', pk)
+        response_cache.bump('property')
+        if names:
+            transaction.on_commit(lambda: delete_files(names))
+    return after
+
+
+def location_effects(ids):
+    def after():
+        for pk in ids:
+            locations.forget(pk)
+            response_cache.bump('location', pk)
+        response_cache.bump('location')
+    return after
+
+
+def amenity_effects(ids):
+    property_ids = set(
+        PropertyAmenity.objects.filter(amenity_id__in=ids).order_by().values_list('property_id', flat=True).distinct()
+    )
+
+    def after():
+        # Expanded property responses and the facet counts embed amenities.
+        for pk in property_ids:
+            response_cache.bump('property', pk)
+        response_cache.bump('property')
+    return after
+
+
+# model -> function(ids) run before a chunk is deleted, returning a callable run after it.
+HOOKS = {
+    Property: property_effects,
+    Location: location_effects,
+    Amenity: amenity_effects,
+}
+
+
+def delete_chunk(model, ids, counts):
+    """Delete the ``ids`` of ``model`` and their leaf dependents in one transaction."""
+    qn = connection.ops.quote_name
+    with transaction.atomic():
+        hook = HOOKS.get(model)
+        after = hook(ids) if hook else None
+        if not is_raw_safe(model):
+            _, deleted = model._base_manager.filter(pk__in=ids).delete()
+            for label, count in deleted.items():
+                counts[label] = counts.get(label, 0) + count
+        else:
+            for related, field, on_delete in reverse_relations(model):
+                table, column = qn(related._meta.db_table), qn(field.column)
+                if on_delete is models.SET_NULL:
+                    execute(f'UPDATE {table} SET {column} = NULL WHERE {column} IN ({{placeholders}})', ids)
+                elif on_delete is models.CASCADE and not has_dependents(related):
+                    # Dependents with their own dependents were deleted by delete_queryset.
+                    count = execute(f'DELETE FROM {table} WHERE {column} IN ({{placeholders}})', ids)
+                    label = related._meta.label
+                    counts[label] = counts.get(label, 0) + count
+            count = execute(
+                f'DELETE FROM {qn(model._meta.db_table)} WHERE {qn(model._meta.pk.column)} IN ({{placeholders}})', ids,
+            )
+            counts[model._meta.label] = counts.get(model._meta.label, 0) + count
+        if after is not None:
+            after()
+
+
+def delete_queryset(queryset, chunk_size=None, progress=None, counts=None):
+    """
+    Delete the rows of ``queryset`` and everything cascading from them in
+    chunks. ``progress(done, total)`` is called after every chunk. Returns
+    {model label: rows deleted}.
+    """
+    model = queryset.model
+    chunk_size = chunk_size or chunk_size_setting()
+    counts = {} if counts is None else counts
+    queryset = queryset.order_by('pk')
+    total = queryset.count() if progress else None
+    done = 0
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        ids = list(page.values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            break
+        if is_raw_safe(model):
+            # Dependents with dependents of their own go first, chunk by chunk.
+            for related, field, on_delete in reverse_relations(model):
+                if on_delete is models.CASCADE and has_dependents(related):
+                    delete_queryset(
+                        related._base_manager.filter(**{f'{field.attname}__in': ids}), chunk_size, counts=counts,
+                    )
+        delete_chunk(model, ids, counts)
+        done += len(ids)
+        last_pk = ids[-1]
+        if progress:
+            progress(done, total)
+        logger.info('Deleted %s %s rows', done, model._meta.label)
+    return counts
+
+
+def scope_locations(queryset, params):
+    for name in ('country', 'region', 'city'):
+        if params.get(name):
+            queryset = queryset.filter(**{name: params[name]})
+    return queryset
+
+
+# model -> (query params that scope a delete, function(queryset, params) applying
+# them, params under which that function filters nothing; these also fill in
+# what the caller leaves unset, so ?city=X deletes unavailable listings too)
+SCOPES = {
+    Property: (FILTER_PARAMS, filter_properties, {'is_available': 'any'}),
+    Location: (('country', 'region', 'city'), scope_locations, {}),
+    Amenity: ((), lambda queryset, params: queryset, {}),
+}
+
+
+def applied_filters(model, params):
+    """
+    The names in ``params`` whose filter actually narrows the rows of
+    ``model``: ``any``, an empty list or an empty value filters nothing.
+    """
+    filter_params, apply, unfiltered = SCOPES[model]
+    queryset = model._base_manager.all()
+    baseline = str(apply(queryset, unfiltered).query)
+    return [
+        name for name in filter_params
+        if params.get(name) and str(apply(queryset, {**unfiltered, name: params[name]}).query) != baseline
+    ]
+
+
+def scoped_queryset(model, params):
+    """
+    The rows of ``model`` a mass delete with ``params`` targets: ``ids``,
+    the model's filters, or ``all=true``. Raises ValidationError when the
+    params do not scope the delete at all.
+    """
+    queryset = model._base_manager.all()
+    filter_params, apply, unfiltered = SCOPES[model]
+    ids = parse_ids(params, 'ids')
+    filtered = bool(applied_filters(model, params))
+    if not ids and not filtered:
+        if parse_bool(params, 'all') is True:
+            return queryset
+        names = ', '.join(['ids', *filter_params])
+        raise ValidationError({'error': f'Scope the delete with one of: {names}; or pass all=true.'})
+    if ids:
+        queryset = queryset.filter(pk__in=ids)
+    if not filtered:
+        return queryset
+    return apply(queryset, {**unfiltered, **{name: params[name] for name in params if params.get(name)}})
@@ -0,0 +1,223 @@
+"""
+Per-route request metrics in Prometheus text format.
+
+MetricsMiddleware times every request and counts its SQL through
+``connection.execute_wrapper`` (no DEBUG query log needed), then folds the
+numbers into an in-process registry keyed by the URL name from
+properties/urls.py. ``metrics_view`` serves the registry at ``/metrics``
+to the addresses in PROPERTY_METRICS_ALLOWED_IPS.
+
+A request that runs the same SQL statement (same text, any parameters)
+PROPERTY_METRICS_REPEATED_QUERY_THRESHOLD times or more is counted as a
+likely N+1 and its statement is logged once per route.
+
+The registry lives in the process: with several workers each one exposes
+its own numbers, which Prometheus sums by instance as usual.
+
+Settings:
+    PROPERTY_METRICS_ENABLED                   turn the middleware into a no-op.
+    PROPERTY_METRICS_ALLOWED_IPS               clients allowed to read /metrics.
+    PROPERTY_METRICS_REPEATED_QUERY_THRESHOLD  repeats that flag an N+1 pattern.
+"""
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+MAX_LOGGED_PATTERNS = 1000
+
+
+def is_enabled():
+    return getattr(settings, 'PROPERTY_METRICS_ENABLED', True)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class RouteStats:
+    def __init__(self):
+        self.requests = {}  # (method, status) -> count
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.response_bytes = 0
+        self.repeated_query_requests = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.logged_patterns = set()
+
+    def observe(self, route, method, status, duration, queries, db_seconds, serialization_seconds,
+                response_bytes, repeated_sql=None):
+        with self.lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = RouteStats()
+            key = (method, status)
+            stats.requests[key] = stats.requests.get(key, 0) + 1
+            stats.duration.observe(duration)
+            stats.queries.observe(queries)
+            stats.db_seconds += db_seconds
+            stats.serialization_seconds += serialization_seconds
+            stats.response_bytes += response_bytes
+            if repeated_sql is None:
+                return
+            stats.repeated_query_requests += 1
+            pattern = (route, repeated_sql)
+            if pattern in self.logged_patterns or len(self.logged_patterns) >= MAX_LOGGED_PATTERNS:
+                return
+            self.logged_patterns.add(pattern)
+        logger.warning('Repeated query on route %s (possible N+1): %s', route, repeated_sql)
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+            self.logged_patterns = set()
+
+    def render(self):
+        with self.lock:
+            routes = sorted(self.routes.items())
+            lines = []
+
+            def family(name, kind, help_text):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+
+            def histogram(name, route, hist):
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{route="{route}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{route="{route}",le="+Inf"}} {hist.count}')
+                lines.append(f'{name}_sum{{route="{route}"}} {hist.sum}')
+                lines.append(f'{name}_count{{route="{route}"}} {hist.count}')
+
+            family('property_http_requests_total', 'counter', 'Requests by route, method and status.')
+            for route, stats in routes:
+                for (method, status), count in sorted(stats.requests.items()):
+                    lines.append(
+                        f'property_http_requests_total{{route="{escape(route)}",method="{method}",status="{status}"}} {count}'
+                    )
+            family('property_http_request_duration_seconds', 'histogram', 'Time spent handling the request.')
+            for route, stats in routes:
+                histogram('property_http_request_duration_seconds', escape(route), stats.duration)
+            family('property_db_queries_per_request', 'histogram', 'SQL queries run per request.')
+            for route, stats in routes:
+                histogram('property_db_queries_per_request', escape(route), stats.queries)
+            scalars = [
+                ('property_db_query_duration_seconds_total', 'Time spent in SQL queries.', 'db_seconds'),
+                ('property_serialization_duration_seconds_total', 'Time spent rendering response bodies.',
+                 'serialization_seconds'),
+                ('property_response_size_bytes_total', 'Bytes of (non-streaming) response bodies.', 'response_bytes'),
+                ('property_repeated_query_requests_total', 'Requests that repeated one SQL statement (likely N+1).',
+                 'repeated_query_requests'),
+            ]
+            for name, help_text, attr in scalars:
+                family(name, 'counter', help_text)
+                for route, stats in routes:
+                    lines.append(f'{name}{{route="{escape(route)}"}} {getattr(stats, attr)}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+class QueryRecorder:
+    """execute_wrapper hook counting queries, their time and repeated statements."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] = self.statements.get(sql, 0) + 1
+
+    def repeated_statement(self, threshold):
+        if self.count < threshold:
+            return None
+        sql, repeats = max(self.statements.items(), key=lambda item: item[1])
+        return sql if repeats >= threshold else None
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_enabled():
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        request._metrics_serialization = 0.0
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        route = (match.url_name or match.route) if match else 'unmatched'
+        size = 0 if response.streaming else len(response.content)
+        threshold = getattr(settings, 'PROPERTY_METRICS_REPEATED_QUERY_THRESHOLD', 5)
+        registry.observe(
+            route, request.method, response.status_code, duration, recorder.count, recorder.seconds,
+            request._metrics_serialization, size, recorder.repeated_statement(threshold),
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook; time that step.
+        if not hasattr(request, '_metrics_serialization'):
+            return response
+        start = time.perf_counter()
+
+        def rendered(response):
+            request._metrics_serialization += time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+def metrics_view(request):
+    allowed = getattr(settings, 'PROPERTY_METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if request.META.get('REMOTE_ADDR') not in allowed:
+        raise Http404
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
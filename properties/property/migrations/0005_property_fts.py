@@ -0,0 +1,37 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE property_fts USING fts5("
+            "title, description, location, tokenize='unicode61 remove_diacritics 2')"
+        )
+    except OperationalError:
+        # SQLite built without FTS5; search falls back to icontains lookups.
+        return
+    schema_editor.execute(
+        "INSERT INTO property_fts (rowid, title, description, location) "
+        "SELECT p.id, p.title, p.description, "
+        "trim(coalesce(l.street, '') || ' ' || coalesce(l.district, '') || ' ' || l.city) "
+        "FROM property_property p JOIN property_location l ON l.id = p.location_id"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS property_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0004_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:29
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_review_stats(apps, schema_editor):
+    Property = apps.get_model('property', 'Property')
+    Review = apps.get_model('property', 'Review')
+    rows = (
+        Review.objects.filter(is_approved=True)
+        .values('property_id')
+        .annotate(
+            total=Count('id'),
+            rating_total=Sum('rating'),
+            **{f'rating_count_{r}': Count('id', filter=Q(rating=r)) for r in range(1, 6)},
+        )
+    )
+    for row in rows.iterator():
+        Property.objects.filter(pk=row['property_id']).update(
+            review_count=row['total'],
+            rating_sum=row['rating_total'],
+            rating_average=row['rating_total'] / row['total'],
+            **{f'rating_count_{r}': row[f'rating_count_{r}'] for r in range(1, 6)},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0007_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='rating_average',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_count_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_count_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_count_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_count_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_count_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['-rating_average', '-id'], name='property_rating_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['is_available', 'rating_average'], name='property_avail_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['property', 'is_approved', 'rating'], name='review_property_approved_idx'),
+        ),
+        migrations.RunPython(populate_review_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import IntegrityError, migrations, models, transaction
+from django.db.models import Count
+
+# Profile fields copied from a duplicate when the kept profile leaves them empty.
+MERGED_FIELDS = (
+    'bio', 'phone_number', 'profile_picture', 'date_of_birth', 'facebook', 'twitter', 'instagram',
+    'linkedin', 'country', 'city', 'address',
+)
+
+
+def merge_duplicate_profiles(apps, schema_editor):
+    """
+    Registration used to create a second profile next to the one made by the
+    post_save signal. Keep the oldest profile per user, fill its empty fields
+    from the others, point every reference at it and drop the duplicates.
+    """
+    Profile = apps.get_model('property', 'Profile')
+    duplicated = (
+        Profile.objects.values('user_id').annotate(total=Count('id')).filter(total__gt=1)
+        .values_list('user_id', flat=True)
+    )
+    # Reverse foreign keys pointing at Profile (Property.owner, Review.reviewer, ...).
+    relations = [rel for rel in Profile._meta.related_objects if rel.one_to_many or rel.one_to_one]
+    for user_id in list(duplicated):
+        profiles = list(Profile.objects.filter(user_id=user_id).order_by('id'))
+        keep, extras = profiles[0], profiles[1:]
+        for extra in extras:
+            for name in MERGED_FIELDS:
+                if not getattr(keep, name) and getattr(extra, name):
+                    setattr(keep, name, getattr(extra, name))
+        keep.save()
+
+        extra_ids = [extra.pk for extra in extras]
+        for rel in relations:
+            model, field = rel.related_model, rel.field.attname
+            rows = model._base_manager.filter(**{f'{field}__in': extra_ids})
+            try:
+                with transaction.atomic():
+                    rows.update(**{field: keep.pk})
+            except IntegrityError:
+                # A unique constraint (e.g. one review per property and
+                # reviewer) already holds a row for the kept profile.
+                for row in rows:
+                    try:
+                        with transaction.atomic():
+                            model._base_manager.filter(pk=row.pk).update(**{field: keep.pk})
+                    except IntegrityError:
+                        row.delete()
+        Profile.objects.filter(pk__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0009_location_geohash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_profiles, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='profile',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
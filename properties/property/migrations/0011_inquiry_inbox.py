@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def populate_inbox(apps, schema_editor):
+    Inquiry = apps.get_model('property', 'Inquiry')
+    Profile = apps.get_model('property', 'Profile')
+    Property = apps.get_model('property', 'Property')
+    Inquiry.objects.update(
+        property_owner_id=Subquery(Property.objects.filter(pk=OuterRef('property_id')).values('owner_id')[:1]),
+        property_manager_id=Subquery(Property.objects.filter(pk=OuterRef('property_id')).values('managed_by_id')[:1]),
+    )
+    unread = {}
+    rows = (
+        Inquiry.objects.filter(status='NEW')
+        .values('property_owner_id', 'property_manager_id')
+        .annotate(total=Count('id'))
+    )
+    for row in rows:
+        for profile_id in {row['property_owner_id'], row['property_manager_id']} - {None}:
+            unread[profile_id] = unread.get(profile_id, 0) + row['total']
+    for profile_id, total in unread.items():
+        Profile.objects.filter(pk=profile_id).update(unread_inquiries=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0010_profile_user_one_to_one'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inquiry',
+            name='property_manager',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='manager_inbox', to='property.profile'),
+        ),
+        migrations.AddField(
+            model_name='inquiry',
+            name='property_owner',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='owner_inbox', to='property.profile'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='unread_inquiries',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['property_owner', 'status', '-date_sent', '-id'], name='inquiry_owner_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['property_manager', 'status', '-date_sent', '-id'], name='inquiry_manager_status_idx'),
+        ),
+        migrations.RunPython(populate_inbox, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+LOCATION_FIELDS = ('country', 'region', 'city', 'district', 'street')
+
+
+def normalize(value):
+    return ' '.join(str(value or '').replace('|', ' ').split()).casefold()
+
+
+def merge_and_key_locations(apps, schema_editor):
+    """
+    unique_together never caught locations differing only in case, spacing
+    or a NULL vs empty district/street. Keep the oldest location per
+    normalized key, point every reference at it, drop the rest and store
+    the keys.
+    """
+    Location = apps.get_model('property', 'Location')
+    groups = {}
+    for row in Location.objects.order_by('id').values('id', *LOCATION_FIELDS):
+        key = '|'.join(normalize(row[name]) for name in LOCATION_FIELDS)
+        groups.setdefault(key, []).append(row['id'])
+    # Reverse foreign keys pointing at Location (Property.location).
+    relations = [rel for rel in Location._meta.related_objects if rel.one_to_many or rel.one_to_one]
+    for key, ids in groups.items():
+        keep, extras = ids[0], ids[1:]
+        if extras:
+            for rel in relations:
+                field = rel.field.attname
+                rel.related_model._base_manager.filter(**{f'{field}__in': extras}).update(**{field: keep})
+            location = Location.objects.get(pk=keep)
+            if location.latitude is None:
+                donor = Location.objects.filter(pk__in=extras, latitude__isnull=False).order_by('id').first()
+                if donor is not None:
+                    location.latitude, location.longitude, location.geohash = donor.latitude, donor.longitude, donor.geohash
+                    location.save()
+            Location.objects.filter(pk__in=extras).delete()
+        Location.objects.filter(pk=keep).update(normalized_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0011_inquiry_inbox'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='location',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='normalized_key',
+            field=models.CharField(editable=False, max_length=510, null=True),
+        ),
+        migrations.RunPython(merge_and_key_locations, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='location',
+            name='normalized_key',
+            field=models.CharField(editable=False, max_length=510, unique=True),
+        ),
+    ]
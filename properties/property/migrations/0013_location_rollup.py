@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:16
+
+from django.db import migrations, models
+from django.db.models import Count
+
+LEVELS = ('country', 'region', 'city', 'district')
+
+
+def normalize(value):
+    return ' '.join(str(value or '').replace('|', ' ').split()).casefold()
+
+
+def populate_rollup(apps, schema_editor):
+    Property = apps.get_model('property', 'Property')
+    LocationRollup = apps.get_model('property', 'LocationRollup')
+    rows = (
+        Property.objects.filter(is_available=True).order_by()
+        .values_list(*(f'location__{name}' for name in LEVELS)).annotate(total=Count('id'))
+    )
+    nodes = {}
+    for *parts, total in rows.iterator():
+        parent = ''
+        for level, value in enumerate(parts):
+            key = normalize(value)
+            if not key:
+                break
+            path = f'{parent}|{key}' if parent else key
+            node = nodes.setdefault(path, [parent, level, ' '.join(str(value).split()), 0])
+            node[3] += total
+            parent = path
+    LocationRollup.objects.bulk_create(
+        [
+            LocationRollup(path=path, parent=parent, level=level, name=name, available=total)
+            for path, (parent, level, name, total) in nodes.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0012_location_normalized_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=410, unique=True)),
+                ('parent', models.CharField(blank=True, max_length=410)),
+                ('level', models.PositiveSmallIntegerField(choices=[(0, 'Country'), (1, 'Region'), (2, 'City'), (3, 'District')])),
+                ('name', models.CharField(max_length=100)),
+                ('available', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['parent', 'name'], name='rollup_parent_name_idx')],
+            },
+        ),
+        migrations.RunPython(populate_rollup, migrations.RunPython.noop),
+    ]
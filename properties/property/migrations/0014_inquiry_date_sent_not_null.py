@@ -0,0 +1,24 @@
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Now
+
+
+def fill_date_sent(apps, schema_editor):
+    """The inbox pages by date_sent, which a NULL cannot be a cursor for."""
+    Inquiry = apps.get_model('property', 'Inquiry')
+    Inquiry.objects.filter(date_sent__isnull=True).update(date_sent=Coalesce('updated_at', Now()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0013_location_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_date_sent, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='inquiry',
+            name='date_sent',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+    ]
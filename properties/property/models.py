@@ -1,7 +1,7 @@
 from django.db import models
 # from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.models import User
-from django.core.validators import MinValueValidator
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
 from django.db.models.signals import post_save
@@ -19,7 +19,30 @@ from django.dispatch import receiver
 #         verbose_name = 'User'
 #         verbose_name_plural = 'Users'
 
-class Profile(models.Model):
+class CounterFieldsModel(models.Model):
+    """
+    Leaves ``counter_fields`` out of ordinary saves of existing rows. Their
+    maintainers write them with ``UPDATE`` (e.g. ``views = views + n``), so
+    saving an instance loaded before such an update would put the old
+    values back.
+    """
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            skipped = set(self.counter_fields) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class Profile(CounterFieldsModel):
+    counter_fields = ('unread_inquiries',)
     USER_TYPES = [
         ('INDIVIDUAL', 'Individual'),
         ('AGENT', 'Agent'),
@@ -31,11 +54,12 @@ class Profile(models.Model):
     
     
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='profile')
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     user_type = models.CharField(max_length=20, choices=USER_TYPES, default='INDIVIDUAL')
     bio = models.TextField(blank=True, null=True)
     phone_number = PhoneNumberField(blank=True, null=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    profile_picture_variants = models.JSONField(default=dict, blank=True)
     date_of_birth = models.DateField(blank=True, null=True)
     email_verified = models.BooleanField(default=False)
     phone_verified = models.BooleanField(default=False)
@@ -53,6 +77,9 @@ class Profile(models.Model):
     country = models.CharField(max_length=100, blank=True, null=True)
     city = models.CharField(max_length=100, blank=True, null=True)
     address = models.CharField(max_length=200, blank=True, null=True)
+
+    # NEW inquiries on properties this profile owns or manages, maintained by property/inbox.py.
+    unread_inquiries = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         ordering = ['-created_at']
@@ -76,13 +103,23 @@ class Location(models.Model):
     city = models.CharField(max_length=100)
     district = models.CharField(max_length=100, blank=True, null=True)
     street = models.CharField(max_length=100, blank=True, null=True)
+    latitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    # Derived from latitude/longitude by property.geo; indexed for proximity search.
+    geohash = models.CharField(max_length=12, blank=True, null=True, editable=False)
+    # Casefolded, whitespace-collapsed address parts, set by property.locations.
+    normalized_key = models.CharField(max_length=510, unique=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True,blank=True, null=True)
     updated_at = models.DateTimeField(auto_now=True,blank=True, null=True)
     created_by = models.ForeignKey(Profile, on_delete=models.SET_NULL, null=True, related_name='created_locations')
     modified_by = models.ForeignKey(Profile, on_delete=models.SET_NULL, null=True, blank=True, related_name='modified_locations')
 
     class Meta:
-        unique_together = ('country', 'region', 'city', 'district', 'street')
+        indexes = [
+            models.Index(fields=['city'], name='location_city_idx'),
+            models.Index(fields=['region', 'city'], name='location_region_city_idx'),
+            models.Index(fields=['geohash'], name='location_geohash_idx'),
+        ]
 
     def __str__(self):
         parts = [self.street, self.district, self.city, self.region, self.country]
@@ -101,7 +138,12 @@ class Amenity(models.Model):
         return self.name
 
 
-class Property(models.Model):
+class Property(CounterFieldsModel):
+    # Written by view_counter.py and review_stats.py.
+    counter_fields = (
+        'views', 'review_count', 'rating_sum', 'rating_average',
+        'rating_count_1', 'rating_count_2', 'rating_count_3', 'rating_count_4', 'rating_count_5',
+    )
     PROPERTY_TYPES = [
         ('LAND', 'Land'),
         ('RENTAL', 'Rental'),
@@ -128,6 +170,15 @@ class Property(models.Model):
     date_updated = models.DateTimeField(auto_now=True)
     featured = models.BooleanField(default=False)
     views = models.PositiveIntegerField(default=0)
+    # Approved review aggregates, maintained by property/review_stats.py.
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_average = models.FloatField(default=0)
+    rating_count_1 = models.PositiveIntegerField(default=0)
+    rating_count_2 = models.PositiveIntegerField(default=0)
+    rating_count_3 = models.PositiveIntegerField(default=0)
+    rating_count_4 = models.PositiveIntegerField(default=0)
+    rating_count_5 = models.PositiveIntegerField(default=0)
     amenities = models.ManyToManyField(Amenity, through='PropertyAmenity', related_name='properties')
     managed_by = models.ForeignKey(Profile, on_delete=models.SET_NULL, null=True, blank=True, 
                                  related_name='managed_properties')
@@ -137,6 +188,17 @@ class Property(models.Model):
     class Meta:
         ordering = ['-date_created']
         verbose_name_plural = 'Properties'
+        indexes = [
+            models.Index(fields=['-date_created', '-id'], name='property_created_id_idx'),
+            models.Index(fields=['is_available', 'property_type', 'price'], name='property_avail_type_price_idx'),
+            models.Index(fields=['is_available', 'price_period', 'price'], name='property_avail_period_idx'),
+            models.Index(fields=['is_available', 'price'], name='property_avail_price_idx'),
+            models.Index(fields=['location', 'is_available'], name='property_location_avail_idx'),
+            models.Index(fields=['featured', 'is_available'], name='property_featured_avail_idx'),
+            models.Index(fields=['date_updated', 'id'], name='property_updated_id_idx'),
+            models.Index(fields=['-rating_average', '-id'], name='property_rating_id_idx'),
+            models.Index(fields=['is_available', 'rating_average'], name='property_avail_rating_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.property_type}"
@@ -162,6 +224,7 @@ class PropertyAmenity(models.Model):
 class PropertyImage(models.Model):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='property_images/')
+    variants = models.JSONField(default=dict, blank=True)
     is_featured = models.BooleanField(default=False)
     caption = models.CharField(max_length=100, blank=True, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True,blank=True, null=True)
@@ -291,7 +354,8 @@ class Inquiry(models.Model):
     message = models.TextField()
     contact_phone = PhoneNumberField(blank=True, null=True)
     contact_email = models.EmailField(blank=True, null=True)
-    date_sent = models.DateTimeField(auto_now_add=True,blank=True, null=True)
+    # Not null: it is the inbox's keyset sort key.
+    date_sent = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True,blank=True, null=True)
     status = models.CharField(max_length=20, choices=INQUIRY_STATUS, default='NEW')
     responded_at = models.DateTimeField(blank=True, null=True)
@@ -299,10 +363,21 @@ class Inquiry(models.Model):
     response_notes = models.TextField(blank=True, null=True)
     created_by = models.ForeignKey(Profile, on_delete=models.SET_NULL, null=True, related_name='created_inquiries')
     modified_by = models.ForeignKey(Profile, on_delete=models.SET_NULL, null=True, blank=True, related_name='modified_inquiries')
+    # Copies of property.owner / property.managed_by kept by property/inbox.py so an
+    # inbox page is a single index range scan. The composite indexes below lead
+    # with these columns, so the usual single-column FK indexes are skipped.
+    property_owner = models.ForeignKey(Profile, on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+                                       db_index=False, related_name='owner_inbox')
+    property_manager = models.ForeignKey(Profile, on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+                                         db_index=False, related_name='manager_inbox')
 
     class Meta:
         ordering = ['-date_sent']
         verbose_name_plural = 'Inquiries'
+        indexes = [
+            models.Index(fields=['property_owner', 'status', '-date_sent', '-id'], name='inquiry_owner_status_idx'),
+            models.Index(fields=['property_manager', 'status', '-date_sent', '-id'], name='inquiry_manager_status_idx'),
+        ]
 
     def __str__(self):
         return f"Inquiry about {self.property.title} from {self.user.user.username}"
@@ -334,6 +409,33 @@ class Review(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ('property', 'reviewer')
+        indexes = [
+            models.Index(fields=['property', 'is_approved', 'rating'], name='review_property_approved_idx'),
+        ]
+
+    def __str__(self):
+        return f"Review by {self.reviewer.user.username} for {self.property.title}"
+
+class LocationRollup(models.Model):
+    """Available properties per country/region/city/district, maintained by property/browse.py."""
+    LEVELS = [
+        (0, 'Country'),
+        (1, 'Region'),
+        (2, 'City'),
+        (3, 'District'),
+    ]
+
+    # Normalized names from the country down, joined with '|' (a prefix of Location.normalized_key).
+    path = models.CharField(max_length=410, unique=True)
+    parent = models.CharField(max_length=410, blank=True)
+    level = models.PositiveSmallIntegerField(choices=LEVELS)
+    name = models.CharField(max_length=100)
+    available = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['parent', 'name'], name='rollup_parent_name_idx'),
+        ]
 
     def __str__(self):
-        return f"Review by {self.reviewer.user.username} for {self.property.title}"
\ No newline at end of file
+        return f'{self.name} ({self.available})'
@@ -0,0 +1,141 @@
+import base64
+import json
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class PropertyCursorPagination:
+    """
+    Keyset pagination over (<sort field> DESC, id DESC).
+
+    Each page is fetched with a range condition on the indexed sort key
+    instead of an OFFSET, so the cost of a page does not depend on how far
+    the client has paged. Cursors are opaque base64 tokens holding the
+    ordering, the boundary row's (sort value, id) and the paging direction.
+
+    ``?ordering=`` picks the sort field from ``orderings``; the default keeps
+    the model's ['-date_created'] order.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering_query_param = 'ordering'
+    orderings = {
+        'newest': 'date_created',
+        'rating': 'rating_average',
+    }
+    default_ordering = 'newest'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def __init__(self):
+        self.page_size = getattr(settings, 'PROPERTY_PAGE_SIZE', 20)
+        self.max_page_size = getattr(settings, 'PROPERTY_MAX_PAGE_SIZE', 100)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_query_param) or self.default_ordering
+        if ordering not in self.orderings:
+            raise ValidationError({self.ordering_query_param: f'Choose one of: {", ".join(self.orderings)}.'})
+        return ordering
+
+    def encode_cursor(self, obj, reverse):
+        value = getattr(obj, self.orderings[self.ordering])
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        payload = {'o': self.ordering, 'v': value, 'i': obj.pk, 'r': int(reverse)}
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode())
+        return token.decode('ascii')
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+            if payload['o'] != self.ordering:
+                raise ValueError('Cursor belongs to another ordering.')
+            field = model._meta.get_field(self.orderings[self.ordering])
+            value = field.to_python(payload['v'])
+            # Neither can be a range bound.
+            if value is None or (isinstance(value, float) and not math.isfinite(value)):
+                raise ValueError('Cursor holds no usable sort value.')
+            return value, int(payload['i']), bool(payload['r'])
+        except (ValueError, TypeError, KeyError, UnicodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request):
+        self.request = request
+        self.ordering = self.get_ordering(request)
+        field = self.orderings[self.ordering]
+        size = self.get_page_size(request)
+        cursor = self.decode_cursor(request, queryset.model)
+
+        if cursor is None:
+            reverse = False
+            queryset = queryset.order_by(f'-{field}', '-id')
+        else:
+            value, pk, reverse = cursor
+            if reverse:
+                # Rows that sort before the boundary, walked backwards.
+                queryset = queryset.filter(**{f'{field}__gte': value}).exclude(
+                    **{field: value, 'id__lte': pk}
+                ).order_by(field, 'id')
+            else:
+                queryset = queryset.filter(**{f'{field}__lte': value}).exclude(
+                    **{field: value, 'id__gte': pk}
+                ).order_by(f'-{field}', '-id')
+
+        rows = list(queryset[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next = bool(rows)
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None and bool(rows)
+
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1], False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[0], True))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class InquiryCursorPagination(PropertyCursorPagination):
+    """Keyset pagination over an inbox, newest inquiry first."""
+    orderings = {
+        'newest': 'date_sent',
+    }
@@ -0,0 +1,158 @@
+"""
+Response cache for the property and location read endpoints.
+
+Entries hold the serialized payload and its ETag, keyed on the request path
+plus a version number per scope: one per object ('property', pk) and one per
+collection ('property', None). Saving or deleting a model bumps only the
+versions it can affect, which orphans the stale entries; they then age out
+of the cache on their own.
+
+Settings:
+    PROPERTY_RESPONSE_CACHE_ENABLED  turn the cache off without code changes.
+    PROPERTY_RESPONSE_CACHE_TIMEOUT  lifetime of a cached response in seconds.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import (
+    Amenity, Apartment, CampusHostel, Land, Location, Property, PropertyAmenity, PropertyImage, Rental,
+)
+
+KEY_PREFIX = 'resp'
+
+
+def is_enabled():
+    return getattr(settings, 'PROPERTY_RESPONSE_CACHE_ENABLED', True)
+
+
+def version_key(namespace, pk=None):
+    return f'{KEY_PREFIX}:ver:{namespace}:{"list" if pk is None else pk}'
+
+
+def get_version(namespace, pk=None):
+    key = version_key(namespace, pk)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter can never resurrect the
+        # entries written under an earlier version.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump(namespace, pk=None):
+    key = version_key(namespace, pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def compute_etag(data):
+    body = json.dumps(data, cls=JSONEncoder, sort_keys=True, separators=(',', ':'))
+    return '"%s"' % hashlib.md5(body.encode()).hexdigest()
+
+
+def strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def etag_matches(request, etag):
+    """
+    Whether ``If-None-Match`` (a comma separated list, or ``*``) names
+    ``etag``. The comparison is weak as RFC 9110 requires for this header,
+    so proxies that mark the tag ``W/`` still get a 304.
+    """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or strip_weak(etag) in {strip_weak(tag) for tag in etags}
+
+
+def cached_response(request, namespace, pk, build):
+    """
+    Serve ``build()`` through the cache. Only 200 responses are stored;
+    ``If-None-Match`` is answered with 304 whether or not the entry was cached.
+    """
+    if not is_enabled():
+        return build()
+
+    path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    key = f'{KEY_PREFIX}:{namespace}:{"list" if pk is None else pk}:{get_version(namespace, pk)}:{path_hash}'
+    entry = cache.get(key)
+    if entry is None:
+        response = build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        data = response.data
+        entry = (data, compute_etag(data))
+        cache.set(key, entry, getattr(settings, 'PROPERTY_RESPONSE_CACHE_TIMEOUT', 300))
+
+    data, etag = entry
+    if etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return Response(data, headers={'ETag': etag})
+
+
+def invalidate_property(pk):
+    bump('property', pk)
+    bump('property')
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_saved_property(sender, instance, **kwargs):
+    invalidate_property(instance.pk)
+
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_save, sender=PropertyAmenity)
+@receiver(post_delete, sender=PropertyAmenity)
+@receiver(post_save, sender=Land)
+@receiver(post_delete, sender=Land)
+@receiver(post_save, sender=Rental)
+@receiver(post_delete, sender=Rental)
+@receiver(post_save, sender=Apartment)
+@receiver(post_delete, sender=Apartment)
+@receiver(post_save, sender=CampusHostel)
+@receiver(post_delete, sender=CampusHostel)
+def invalidate_property_child(sender, instance, **kwargs):
+    invalidate_property(instance.property_id)
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_location(sender, instance, created=False, **kwargs):
+    bump('location', instance.pk)
+    bump('location')
+    if created:
+        return
+    # Expanded property responses embed their location.
+    property_ids = Property.objects.filter(location_id=instance.pk).values_list('id', flat=True)
+    for property_id in property_ids.iterator():
+        bump('property', property_id)
+    bump('property')
+
+
+@receiver(post_save, sender=Amenity)
+@receiver(post_delete, sender=Amenity)
+def invalidate_amenity(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    # Expanded property responses and the facet counts embed amenity names.
+    property_ids = PropertyAmenity.objects.filter(amenity_id=instance.pk).values_list('property_id', flat=True)
+    for property_id in property_ids.iterator():
+        bump('property', property_id)
+    bump('property')
@@ -0,0 +1,132 @@
+"""
+Approved-review aggregates denormalized onto Property.
+
+Each Property carries review_count, rating_sum, rating_average and a 1-5
+histogram (rating_count_1 .. rating_count_5) over its approved reviews. The
+receivers below apply the change of a single review save or delete as one
+``UPDATE ... SET col = col + delta`` on the property row, so reading a
+rating or sorting by it never touches the reviews table.
+
+QuerySet.update()/bulk_create() on Review bypass the signals; run the
+``reconcile_review_stats`` command after such changes.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import response_cache
+from .models import Property, Review
+
+RATINGS = range(1, 6)
+RECONCILE_CHUNK_SIZE = 2000
+
+
+def histogram_field(rating):
+    return f'rating_count_{rating}'
+
+
+def contribution(review):
+    """(property_id, rating) counted for ``review``, or None if not approved."""
+    if review is None or not review.is_approved:
+        return None
+    return review.property_id, review.rating
+
+
+def apply_delta(property_id, rating, delta):
+    Property.objects.filter(pk=property_id).update(**{
+        'review_count': F('review_count') + delta,
+        'rating_sum': F('rating_sum') + delta * rating,
+        histogram_field(rating): F(histogram_field(rating)) + delta,
+        # SET expressions see the pre-update row, so fold the delta in here too.
+        'rating_average': Case(
+            When(review_count__gt=-delta, then=(
+                Cast(F('rating_sum') + delta * rating, FloatField())
+                / Cast(F('review_count') + delta, FloatField())
+            )),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+    })
+    response_cache.invalidate_property(property_id)
+
+
+def apply_change(old, new):
+    if old == new:
+        return
+    with transaction.atomic():
+        if old is not None:
+            apply_delta(*old, -1)
+        if new is not None:
+            apply_delta(*new, 1)
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_review(sender, instance, raw=False, **kwargs):
+    previous = None
+    if instance.pk is not None and not raw:
+        previous = Review.objects.filter(pk=instance.pk).only('property_id', 'rating', 'is_approved').first()
+    instance._previous_contribution = contribution(previous)
+
+
+@receiver(post_save, sender=Review)
+def update_stats_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    apply_change(getattr(instance, '_previous_contribution', None), contribution(instance))
+    instance._previous_contribution = contribution(instance)
+
+
+@receiver(post_delete, sender=Review)
+def update_stats_on_delete(sender, instance, **kwargs):
+    apply_change(contribution(instance), None)
+
+
+def recompute(property_ids):
+    """Rebuild the aggregates of ``property_ids`` from the reviews table."""
+    stats = {pk: {'review_count': 0, 'rating_sum': 0, **{histogram_field(r): 0 for r in RATINGS}}
+             for pk in property_ids}
+    rows = (
+        Review.objects.filter(property_id__in=property_ids, is_approved=True)
+        .values('property_id')
+        .annotate(
+            total=Count('id'),
+            rating_total=Sum('rating'),
+            **{histogram_field(r): Count('id', filter=Q(rating=r)) for r in RATINGS},
+        )
+    )
+    for row in rows:
+        entry = stats[row['property_id']]
+        entry['review_count'] = row['total']
+        entry['rating_sum'] = row['rating_total']
+        for r in RATINGS:
+            entry[histogram_field(r)] = row[histogram_field(r)]
+
+    properties = []
+    for pk, entry in stats.items():
+        prop = Property(pk=pk, **entry)
+        prop.rating_average = entry['rating_sum'] / entry['review_count'] if entry['review_count'] else 0.0
+        properties.append(prop)
+    fields = ['review_count', 'rating_sum', 'rating_average'] + [histogram_field(r) for r in RATINGS]
+    Property.objects.bulk_update(properties, fields)
+
+
+def reconcile(chunk_size=RECONCILE_CHUNK_SIZE):
+    """Recompute every property in chunks of ids. Returns the number of properties."""
+    total = 0
+    last_pk = 0
+    while True:
+        ids = list(
+            Property.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            recompute(ids)
+        for pk in ids:
+            response_cache.bump('property', pk)
+        total += len(ids)
+        last_pk = ids[-1]
+    response_cache.bump('property')
+    return total
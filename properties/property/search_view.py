@@ -0,0 +1,143 @@
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+from . import facets, fulltext, geo
+from .filters import MAX_ID, filter_properties, parse_decimal
+from .models import Property
+from .pagination import PropertyCursorPagination
+from .serializers import PropertySerializer, PropertyReadSerializer
+from .views import wants_expanded
+
+
+def parse_page(params, size):
+    try:
+        page = max(int(params.get('page', 1)), 1)
+    except ValueError:
+        return 1
+    # The offset must fit SQLite's 64-bit integers.
+    if (page - 1) * size > MAX_ID:
+        raise ValidationError({'page': 'Page out of range.'})
+    return page
+
+
+def parse_coordinate(params, name, limit):
+    value = parse_decimal(params, name)
+    # Decimal('NaN') raises on comparison, so check finiteness first.
+    if value is not None and (not value.is_finite() or not -limit <= value <= limit):
+        raise ValidationError({name: f'Expected a number between -{limit} and {limit}.'})
+    return None if value is None else float(value)
+
+
+def page_response(request, ids, page, size, extra=None):
+    """Serialize the ``ids`` of one page in order; ``extra`` maps id -> fields to add."""
+    queryset = Property.objects.filter(id__in=ids[:size])
+    serializer_class = PropertySerializer
+    if wants_expanded(request):
+        queryset = PropertyReadSerializer.setup_eager_loading(queryset)
+        serializer_class = PropertyReadSerializer
+    else:
+        queryset = queryset.prefetch_related('amenities')
+    by_id = {obj.pk: obj for obj in queryset}
+    ordered = [by_id[pk] for pk in ids[:size] if pk in by_id]
+    results = serializer_class(ordered, many=True).data
+    for row in results:
+        row.update((extra or {}).get(row['id'], {}))
+
+    url = request.build_absolute_uri()
+    return Response({
+        'next': replace_query_param(url, 'page', page + 1) if len(ids) > size else None,
+        'previous': replace_query_param(url, 'page', page - 1) if page > 1 else None,
+        'results': results,
+    })
+
+
+class PropertySearchView(APIView):
+    def get(self, request):
+        queryset = filter_properties(Property.objects.all(), request.query_params)
+        serializer_class = PropertySerializer
+        if wants_expanded(request):
+            queryset = PropertyReadSerializer.setup_eager_loading(queryset)
+            serializer_class = PropertyReadSerializer
+        else:
+            queryset = queryset.prefetch_related('amenities')
+
+        paginator = PropertyCursorPagination()
+        page = paginator.paginate_queryset(queryset, request)
+        serializer = serializer_class(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class PropertyFacetView(APIView):
+    def get(self, request):
+        return Response(facets.get_facets(request.query_params))
+
+
+class PropertyTextSearchView(APIView):
+    def get(self, request):
+        text = request.query_params.get('q', '')
+        if not fulltext.terms(text):
+            return Response({'error': 'Please provide a search term in "q".'}, status=status.HTTP_400_BAD_REQUEST)
+
+        size = PropertyCursorPagination().get_page_size(request)
+        page = parse_page(request.query_params, size)
+        ids = fulltext.search(text, limit=size + 1, offset=(page - 1) * size)
+        return page_response(request, ids, page, size)
+
+
+class PropertyNearbyView(APIView):
+    """
+    Properties around a point (``lat``, ``lng``, ``radius`` in km) or inside
+    ``bbox=south,west,north,east``, nearest first. Accepts the same filters
+    as the search endpoint, e.g. ``property_type=HOSTEL``.
+    """
+
+    def get(self, request):
+        params = request.query_params
+        latitude = parse_coordinate(params, 'lat', 90)
+        longitude = parse_coordinate(params, 'lng', 180)
+        if (latitude is None) != (longitude is None):
+            return Response({'error': 'Provide both "lat" and "lng".'}, status=status.HTTP_400_BAD_REQUEST)
+        box = self.parse_bbox(params)
+        if box is None and latitude is None:
+            return Response(
+                {'error': 'Provide "lat" and "lng", or "bbox".'}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = filter_properties(Property.objects.all(), params)
+        if box is not None:
+            south, west, north, east = box
+            if latitude is None:
+                latitude, longitude = (south + north) / 2, (west + east) / 2
+            matches = geo.within_box(queryset, south, west, north, east, latitude, longitude)
+        else:
+            max_radius = getattr(settings, 'PROPERTY_GEO_MAX_RADIUS_KM', 50)
+            radius = parse_decimal(params, 'radius')
+            radius = float(radius) if radius is not None else getattr(settings, 'PROPERTY_GEO_DEFAULT_RADIUS_KM', 5)
+            if not 0 < radius <= max_radius:
+                raise ValidationError({'radius': f'Expected a distance in km above 0 and up to {max_radius}.'})
+            matches = geo.within_radius(queryset, latitude, longitude, radius)
+
+        size = PropertyCursorPagination().get_page_size(request)
+        page = parse_page(params, size)
+        window = matches[(page - 1) * size:page * size + 1]
+        ids = [pk for pk, _ in window]
+        distances = {pk: {'distance_km': round(distance, 3)} for pk, distance in window}
+        return page_response(request, ids, page, size, distances)
+
+    def parse_bbox(self, params):
+        value = params.get('bbox')
+        if not value:
+            return None
+        try:
+            south, west, north, east = (float(part) for part in value.split(','))
+        except ValueError:
+            raise ValidationError({'bbox': 'Expected south,west,north,east.'})
+        if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+            raise ValidationError({'bbox': 'Expected south <= north within +-90 and west <= east within +-180.'})
+        max_span = getattr(settings, 'PROPERTY_GEO_MAX_BBOX_DEGREES', 1)
+        if north - south > max_span or east - west > max_span:
+            raise ValidationError({'bbox': f'The box may span at most {max_span} degrees each way.'})
+        return south, west, north, east
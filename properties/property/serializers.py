@@ -1,6 +1,15 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch
+from phonenumber_field.serializerfields import PhoneNumberField
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from . import locations
+from .authentication import is_revoked, revoke_token
 from .models import Profile, Property, Location, Amenity, PropertyAmenity, PropertyImage, Land, Rental, Apartment, CampusHostel, Favorite, Inquiry, Review
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -9,15 +18,43 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token = super().get_token(user)
         token['username'] = user.username
         token['email'] = user.email
+        # Read by StatelessJWTAuthentication so views need not load the profile.
+        profile = getattr(user, 'profile', None)
+        token['profile_id'] = profile.id if profile is not None else None
+        token['user_type'] = profile.user_type if profile is not None else None
         return token
 
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        if is_revoked(refresh):
+            raise InvalidToken('Token has been revoked')
+        data = super().validate(attrs)
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            # The blacklist app is not installed; retire the rotated token here.
+            revoke_token(refresh)
+        return data
+
+class VariantURLsField(serializers.ReadOnlyField):
+    """Turns a {variant: storage name} mapping into {variant: url}."""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for key, name in (value or {}).items():
+            url = default_storage.url(name)
+            urls[key] = request.build_absolute_uri(url) if request is not None else url
+        return urls
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'phone_number']
+        fields = ['id', 'username', 'email', 'first_name', 'last_name']
 
 class ProfileSerializer(serializers.ModelSerializer):
     user = UserSerializer()
+    profile_picture_variants = VariantURLsField()
     
     class Meta:
         model = Profile
@@ -25,6 +62,7 @@ class ProfileSerializer(serializers.ModelSerializer):
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
+    phone_number = PhoneNumberField(write_only=True, required=False)
     bio = serializers.CharField(write_only=True, required=False, allow_blank=True)
     profile_picture = serializers.ImageField(write_only=True, required=False)
 
@@ -35,30 +73,101 @@ class RegisterSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         profile_data = {
             'bio': validated_data.pop('bio', ''),
-            'profile_picture': validated_data.pop('profile_picture', None)
+            'phone_number': validated_data.pop('phone_number', None),
+            'profile_picture': validated_data.pop('profile_picture', None),
         }
-        
+
         user = User.objects.create_user(
             username=validated_data['username'],
             email=validated_data['email'],
             password=validated_data['password'],
             first_name=validated_data.get('first_name', ''),
             last_name=validated_data.get('last_name', ''),
-            phone_number=validated_data.get('phone_number', '')
         )
-        
-        Profile.objects.create(user=user, **profile_data)
+
+        # The post_save signal on User has already created the profile.
+        profile = user.profile
+        for name, value in profile_data.items():
+            setattr(profile, name, value)
+        profile.save()
         return user
+
+REVIEW_STAT_FIELDS = [
+    'review_count', 'rating_sum', 'rating_average',
+    'rating_count_1', 'rating_count_2', 'rating_count_3', 'rating_count_4', 'rating_count_5',
+]
+
+
+class LocationField(serializers.Field):
+    """
+    A location id, or an object of location fields that PropertySerializer
+    resolves to the matching location (created if new) when saving.
+    """
+    default_error_messages = {
+        'does_not_exist': 'Invalid pk "{pk_value}" - object does not exist.',
+        'incorrect_type': 'Incorrect type. Expected pk value or location object, received {data_type}.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict):
+            serializer = LocationSerializer(data=data)
+            serializer.is_valid(raise_exception=True)
+            return dict(serializer.validated_data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if not locations.exists(pk):
+            self.fail('does_not_exist', pk_value=pk)
+        return pk
+
+    def to_representation(self, value):
+        return value
+
 class PropertySerializer(serializers.ModelSerializer):
+    location = LocationField(source='location_id')
+
     class Meta:
         model = Property
         fields = '__all__'
+        read_only_fields = REVIEW_STAT_FIELDS + ['views']
+
+    def resolve_location(self, validated_data):
+        fields = validated_data.get('location_id')
+        if isinstance(fields, dict):
+            validated_data['location_id'], _ = locations.resolve(fields, validated_data.get('created_by'))
+        return validated_data
+
+    def create(self, validated_data):
+        return super().create(self.resolve_location(validated_data))
+
+    def update(self, instance, validated_data):
+        return super().update(instance, self.resolve_location(validated_data))
 
 class LocationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Location
         fields = '__all__'
 
+    def validate(self, data):
+        latitude = data.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = data.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError('Provide both latitude and longitude, or neither.')
+        if self.instance is not None:
+            fields = {name: data.get(name, getattr(self.instance, name)) for name in locations.LOCATION_FIELDS}
+            clash = Location.objects.filter(normalized_key=locations.location_key(fields)).exclude(pk=self.instance.pk)
+            if clash.exists():
+                raise serializers.ValidationError('Another location already has these details.')
+        return data
+
+    def create(self, validated_data):
+        # Creating a location that already exists (up to case and spacing) returns it.
+        location, _ = locations.get_or_create(validated_data)
+        return location
+
 # from .models import Amenity
 
 class AmenitySerializer(serializers.ModelSerializer):
@@ -71,12 +180,42 @@ class PropertyAmenitySerializer(serializers.ModelSerializer):
         model = PropertyAmenity
         fields = '__all__'
 
+class PropertyAmenityBatchItemSerializer(serializers.Serializer):
+    # Plain ids: existence is checked for the whole batch in one query per table.
+    property = serializers.IntegerField(min_value=1)
+    amenity = serializers.IntegerField(min_value=1)
+    notes = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+
+class PropertyAmenitySetSerializer(serializers.Serializer):
+    property = serializers.IntegerField(min_value=1)
+    amenities = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=True)
+
 
 class PropertyImageSerializer(serializers.ModelSerializer):
+    variants = VariantURLsField()
+
     class Meta:
         model = PropertyImage
         fields = '__all__'
 
+class PropertyImageBatchSerializer(serializers.Serializer):
+    images = serializers.ListField(child=serializers.ImageField(), allow_empty=False)
+    captions = serializers.ListField(child=serializers.CharField(max_length=100, allow_blank=True), required=False)
+    featured = serializers.IntegerField(min_value=0, required=False,
+                                        help_text='Index into images of the new featured image.')
+
+    def validate(self, attrs):
+        count = len(attrs['images'])
+        max_files = getattr(settings, 'PROPERTY_IMAGE_BATCH_MAX_FILES', 50)
+        if count > max_files:
+            raise serializers.ValidationError({'images': f'At most {max_files} images per request.'})
+        if len(attrs.get('captions', [])) > count:
+            raise serializers.ValidationError({'captions': 'More captions than images.'})
+        if attrs.get('featured') is not None and attrs['featured'] >= count:
+            raise serializers.ValidationError({'featured': 'Index out of range.'})
+        return attrs
+
+
 class LandSerializer(serializers.ModelSerializer):
     class Meta:
         model = Land
@@ -102,11 +241,100 @@ class FavoriteSerializer(serializers.ModelSerializer):
         model = Favorite
         fields = '__all__'
 
+class FavoriteBulkSerializer(serializers.Serializer):
+    add = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+    remove = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+
+    def validate(self, attrs):
+        max_batch = getattr(settings, 'PROPERTY_FAVORITES_MAX_BATCH', 200)
+        if len(attrs['add']) + len(attrs['remove']) > max_batch:
+            raise serializers.ValidationError(f'At most {max_batch} ids per request.')
+        if set(attrs['add']) & set(attrs['remove']):
+            raise serializers.ValidationError('An id cannot be both added and removed.')
+        return attrs
+
 class InquirySerializer(serializers.ModelSerializer):
     class Meta:
         model = Inquiry
         fields = '__all__'
 
+class InquiryTransitionSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+    status = serializers.ChoiceField(choices=Inquiry.INQUIRY_STATUS)
+
+    def validate_ids(self, value):
+        max_batch = getattr(settings, 'PROPERTY_INBOX_MAX_BATCH', 200)
+        if len(value) > max_batch:
+            raise serializers.ValidationError(f'At most {max_batch} ids per request.')
+        return value
+
+
+class OwnerSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    full_name = serializers.CharField(read_only=True)
+    profile_picture_variants = VariantURLsField()
+
+    class Meta:
+        model = Profile
+        fields = ['id', 'username', 'full_name', 'user_type', 'profile_picture', 'profile_picture_variants', 'identity_verified']
+
+
+class PropertyAmenityReadSerializer(serializers.ModelSerializer):
+    amenity = AmenitySerializer(read_only=True)
+
+    class Meta:
+        model = PropertyAmenity
+        fields = ['id', 'amenity', 'notes']
+
+
+class PropertyReadSerializer(serializers.ModelSerializer):
+    """
+    Expanded, read-only representation of a property that embeds its
+    location, owner, images, amenities and type-specific details.
+
+    Querysets must go through setup_eager_loading() so a page of results
+    costs a fixed number of queries regardless of its length.
+    """
+    location = LocationSerializer(read_only=True)
+    owner = OwnerSerializer(read_only=True)
+    images = PropertyImageSerializer(many=True, read_only=True)
+    amenities = PropertyAmenityReadSerializer(source='propertyamenity_set', many=True, read_only=True)
+    details = serializers.SerializerMethodField()
+    rating_histogram = serializers.SerializerMethodField()
+
+    DETAIL_SERIALIZERS = {
+        'LAND': ('land', LandSerializer),
+        'RENTAL': ('rental', RentalSerializer),
+        'APARTMENT': ('apartment', ApartmentSerializer),
+        'HOSTEL': ('campushostel', CampusHostelSerializer),
+    }
+
+    class Meta:
+        model = Property
+        fields = '__all__'
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related(
+            'location', 'owner__user', 'land', 'rental', 'apartment', 'campushostel'
+        ).prefetch_related(
+            'images',
+            Prefetch('propertyamenity_set', queryset=PropertyAmenity.objects.select_related('amenity')),
+        )
+
+    def get_rating_histogram(self, obj):
+        return {rating: getattr(obj, f'rating_count_{rating}') for rating in range(1, 6)}
+
+    def get_details(self, obj):
+        accessor, serializer_class = self.DETAIL_SERIALIZERS.get(obj.property_type, (None, None))
+        if accessor is None:
+            return None
+        # A missing subtype row raises RelatedObjectDoesNotExist, an AttributeError.
+        detail = getattr(obj, accessor, None)
+        if detail is None:
+            return None
+        return serializer_class(detail).data
+
 
 class ReviewSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField()  # Shows username instead of ID
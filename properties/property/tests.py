@@ -1,7 +1,39 @@
-from django.test import TestCase
-from rest_framework.test import APIClient
+import base64
+import json
+import math
+import os
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from random import Random
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.db.migrations.executor import MigrationExecutor
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from rest_framework import status
-from .models import PropertyAmenity, Property, Amenity, Location
+from . import benchmark, browse, favorites, fulltext, geo, inbox, locations, mass_delete, metrics
+from .database import ReadReplicaRouter, load_test
+from .authentication import (
+    ProfileTokenUser, RevocationList, StatelessJWTAuthentication, get_profile_id, revocations,
+)
+from .filters import filter_properties
+from .importer import import_properties
+from .view_counter import view_counter
+from .models import PropertyAmenity, Property, Amenity, Location, LocationRollup, Profile, PropertyImage, Apartment, CampusHostel, Favorite, Inquiry, Land, Review
 from django.contrib.auth.models import User
 
 class PropertyAmenityViewSetTests(TestCase):
@@ -16,7 +48,7 @@ class PropertyAmenityViewSetTests(TestCase):
             street='Street'
         )
         self.property = Property.objects.create(
-            owner=self.user,
+            owner=Profile.objects.get(user=self.user),
             title='Test Property',
             description='Test Description',
             location=self.location,
@@ -39,19 +71,19 @@ class PropertyAmenityViewSetTests(TestCase):
         self.assertEqual(PropertyAmenity.objects.get().notes, 'Test notes')
 
     def test_list_property_amenities(self):
-        PropertyAmenity.objects.create(**self.property_amenity_data)
+        PropertyAmenity.objects.create(property=self.property, amenity=self.amenity, notes='Test notes')
         response = self.client.get('/propertyamenities/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
 
     def test_retrieve_property_amenity(self):
-        pa = PropertyAmenity.objects.create(**self.property_amenity_data)
+        pa = PropertyAmenity.objects.create(property=self.property, amenity=self.amenity, notes='Test notes')
         response = self.client.get(f'/propertyamenities/{pa.id}/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['notes'], 'Test notes')
 
     def test_update_property_amenity(self):
-        pa = PropertyAmenity.objects.create(**self.property_amenity_data)
+        pa = PropertyAmenity.objects.create(property=self.property, amenity=self.amenity, notes='Test notes')
         updated_data = {
             'property': self.property.id,
             'amenity': self.amenity.id,
@@ -62,7 +94,2052 @@ class PropertyAmenityViewSetTests(TestCase):
         self.assertEqual(PropertyAmenity.objects.get().notes, 'Updated notes')
 
     def test_delete_property_amenity(self):
-        pa = PropertyAmenity.objects.create(**self.property_amenity_data)
+        pa = PropertyAmenity.objects.create(property=self.property, amenity=self.amenity, notes='Test notes')
         response = self.client.delete(f'/propertyamenities/{pa.id}/')
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(PropertyAmenity.objects.count(), 0)
+
+
+class PropertyPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        self.location = Location.objects.create(country='Country', region='Region', city='City')
+        # Several rows share a timestamp so the id tie-breaker is exercised.
+        stamp = timezone.now()
+        for i in range(7):
+            Property.objects.create(
+                owner=self.profile,
+                title=f'Property {i}',
+                description='Description',
+                location=self.location,
+                property_type='LAND',
+                price=1000 + i,
+                date_created=stamp - timedelta(minutes=i // 3),
+            )
+
+    def collect(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_pages_cover_every_row_once_in_order(self):
+        expected = list(Property.objects.order_by('-date_created', '-id').values_list('id', flat=True))
+        self.assertEqual(self.collect('/api/properties/?page_size=3'), expected)
+
+    def test_previous_link_returns_prior_page(self):
+        first = self.client.get('/api/properties/?page_size=3')
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [row['id'] for row in back.data['results']],
+            [row['id'] for row in first.data['results']],
+        )
+
+    @override_settings(PROPERTY_MAX_PAGE_SIZE=4)
+    def test_page_size_is_capped(self):
+        cache.clear()
+        # The page, then the amenities of all its rows.
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/properties/?page_size=50')
+        self.assertEqual(len(response.data['results']), 4)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/properties/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_without_a_usable_value(self):
+        for ordering, value in (('newest', None), ('rating', None), ('rating', 'NaN'), ('rating', 'Infinity')):
+            payload = json.dumps({'o': ordering, 'v': value, 'i': 1, 'r': 0})
+            token = base64.urlsafe_b64encode(payload.encode()).decode()
+            response = self.client.get('/api/properties/', {'cursor': token, 'ordering': ordering})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, payload)
+
+
+@override_settings(PROPERTY_VIEW_FLUSH_INTERVAL=0)
+class PropertyExpandedSerializationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        self.wifi = Amenity.objects.create(name='WiFi')
+        self.parking = Amenity.objects.create(name='Parking')
+
+    def create_properties(self, count):
+        for i in range(count):
+            location = Location.objects.create(country='Country', region='Region', city=f'City {i}')
+            prop = Property.objects.create(
+                owner=self.profile,
+                title=f'Apartment {i}',
+                description='Description',
+                location=location,
+                property_type='APARTMENT',
+                price=500,
+                price_period='MONTHLY',
+            )
+            Apartment.objects.create(
+                property=prop, apartment_type='2BED', bedrooms=2, bathrooms=1,
+                floor_number=1, total_floors=4,
+            )
+            PropertyImage.objects.create(property=prop, image='property_images/photo.jpg', is_featured=True)
+            PropertyAmenity.objects.create(property=prop, amenity=self.wifi)
+            PropertyAmenity.objects.create(property=prop, amenity=self.parking)
+
+    def count_queries(self, page_size):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/properties/?expand=true&page_size={page_size}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), page_size)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.create_properties(10)
+        self.assertEqual(self.count_queries(2), self.count_queries(10))
+
+    def test_expanded_detail_embeds_related_rows(self):
+        self.create_properties(1)
+        prop = Property.objects.get()
+        response = self.client.get(f'/api/property/{prop.pk}/?expand=1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['location']['city'], 'City 0')
+        self.assertEqual(response.data['owner']['username'], 'owner')
+        self.assertEqual(len(response.data['images']), 1)
+        self.assertEqual({a['amenity']['name'] for a in response.data['amenities']}, {'WiFi', 'Parking'})
+        self.assertEqual(response.data['details']['apartment_type'], '2BED')
+
+
+class PropertySearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        self.accra = Location.objects.create(country='Ghana', region='Greater Accra', city='Accra')
+        self.kumasi = Location.objects.create(country='Ghana', region='Ashanti', city='Kumasi')
+        self.wifi = Amenity.objects.create(name='WiFi')
+        self.land = self.create_property('Plot', self.accra, 'LAND', 5000)
+        self.rental = self.create_property('House', self.kumasi, 'RENTAL', 800, price_period='MONTHLY', featured=True)
+        self.hostel = self.create_property('Hostel', self.accra, 'HOSTEL', 300, price_period='YEARLY')
+        self.taken = self.create_property('Taken', self.accra, 'RENTAL', 700, is_available=False)
+        PropertyAmenity.objects.create(property=self.hostel, amenity=self.wifi)
+
+    def create_property(self, title, location, property_type, price, **kwargs):
+        return Property.objects.create(
+            owner=self.profile, title=title, description='Description', location=location,
+            property_type=property_type, price=price, **kwargs
+        )
+
+    def search(self, query):
+        response = self.client.get(f'/api/properties/search/?{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {row['id'] for row in response.data['results']}
+
+    def test_defaults_to_available_listings(self):
+        self.assertEqual(self.search(''), {self.land.id, self.rental.id, self.hostel.id})
+        self.assertEqual(self.search('is_available=false'), {self.taken.id})
+
+    def test_filters(self):
+        self.assertEqual(self.search('property_type=rental,hostel'), {self.rental.id, self.hostel.id})
+        self.assertEqual(self.search('min_price=500&max_price=1000'), {self.rental.id})
+        self.assertEqual(self.search('price_period=monthly'), {self.rental.id})
+        self.assertEqual(self.search('featured=true'), {self.rental.id})
+        self.assertEqual(self.search('city=Accra&is_available=any'), {self.land.id, self.hostel.id, self.taken.id})
+        self.assertEqual(self.search('region=Ashanti'), {self.rental.id})
+        self.assertEqual(self.search(f'amenity={self.wifi.id}'), {self.hostel.id})
+
+    def test_invalid_filter(self):
+        response = self.client.get('/api/properties/search/?property_type=castle')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('property_type', response.data)
+
+    def test_non_finite_and_out_of_range_values_are_rejected(self):
+        for query in ('min_price=NaN', 'max_price=Infinity', 'min_price=-inf', 'amenity=99999999999999999999999',
+                      'amenity=0', 'amenity=-3'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/properties/search/?{query}')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(connection.vendor == 'sqlite', 'Query plans are checked against SQLite')
+    def test_filter_combinations_use_an_index(self):
+        combinations = [
+            '', 'is_available=any', 'property_type=LAND', 'property_type=LAND&min_price=100',
+            'is_available=any&property_type=RENTAL', 'price_period=MONTHLY', 'min_price=100',
+            'max_price=100&is_available=false', 'featured=true', 'city=Accra', 'region=Ashanti',
+            f'amenity={self.wifi.id}', f'city=Accra&property_type=HOSTEL&amenity={self.wifi.id}',
+            'min_rating=4',
+        ]
+        for query in combinations:
+            with self.subTest(query=query):
+                queryset = filter_properties(Property.objects.all(), QueryDict(query))
+                plan = queryset.order_by('-date_created', '-id')[:21].explain()
+                self.assertNotRegex(plan, r'SCAN property_property(?! USING)')
+                self.assertIn('SEARCH property_property USING', plan)
+
+
+class PropertyFullTextSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        self.location = Location.objects.create(country='Ghana', region='Ashanti', city='Kumasi', street='Harper Road')
+        self.villa = self.create_property('Garden villa', 'Quiet house with a large garden')
+        self.flat = self.create_property('City flat', 'Two bedrooms close to the garden market')
+
+    def create_property(self, title, description):
+        return Property.objects.create(
+            owner=self.profile, title=title, description=description,
+            location=self.location, property_type='RENTAL', price=100,
+        )
+
+    def search(self, query):
+        response = self.client.get('/api/properties/search/text/', {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in response.data['results']]
+
+    def test_missing_table_is_introspected_once(self):
+        with mock.patch.object(fulltext, '_enabled', None), \
+                mock.patch.object(connection.introspection, 'table_names', return_value=[]) as table_names:
+            self.assertFalse(fulltext.is_enabled())
+            self.create_property('Another', 'Description')
+            self.assertFalse(fulltext.is_enabled())
+            self.assertEqual(table_names.call_count, 1)
+            fulltext.reset_enabled(sender=None)
+            fulltext.is_enabled()
+            self.assertEqual(table_names.call_count, 2)
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search('garden'), [self.villa.id, self.flat.id])
+
+    def test_prefix_and_location_terms(self):
+        self.assertEqual(self.search('bedro'), [self.flat.id])
+        self.assertEqual(set(self.search('harper kumasi')), {self.villa.id, self.flat.id})
+
+    def test_index_follows_saves_and_deletes(self):
+        self.flat.title = 'Penthouse'
+        self.flat.save()
+        self.assertEqual(self.search('penthouse'), [self.flat.id])
+        self.location.city = 'Tamale'
+        self.location.save()
+        self.assertEqual(set(self.search('tamale')), {self.villa.id, self.flat.id})
+        self.villa.delete()
+        self.assertEqual(self.search('tamale'), [self.flat.id])
+
+    def test_rebuild_command(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(set(self.search('garden')), {self.villa.id, self.flat.id})
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search('garden" OR title:*'), [])
+
+    def test_missing_term(self):
+        response = self.client.get('/api/properties/search/text/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_page_beyond_any_offset(self):
+        response = self.client.get('/api/properties/search/text/', {'q': 'garden', 'page': '99999999999999999999'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/properties/search/text/', {'q': 'garden', 'page': '1000'})
+        self.assertEqual(response.data['results'], [])
+
+
+@override_settings(PROPERTY_VIEW_FLUSH_INTERVAL=3600)
+class PropertyViewCounterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        location = Location.objects.create(country='Country', region='Region', city='City')
+        self.first, self.second = [
+            Property.objects.create(
+                owner=self.profile, title=f'Property {i}', description='Description',
+                location=location, property_type='LAND', price=100,
+            )
+            for i in range(2)
+        ]
+
+    def tearDown(self):
+        view_counter.flush()
+
+    def test_detail_views_are_buffered_and_flushed_in_one_update(self):
+        for _ in range(3):
+            self.client.get(f'/api/property/{self.first.pk}/')
+        self.client.get(f'/api/property/{self.second.pk}/')
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.views, 0)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(view_counter.flush(), 2)
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('CASE', updates[0]['sql'])
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.views, self.second.views), (3, 1))
+
+    @override_settings(PROPERTY_VIEW_FLUSH_ON_ERROR='requeue')
+    def test_failed_flush_requeues_counts(self):
+        view_counter.record(self.first.pk)
+        with mock.patch('property.view_counter.apply_increments', side_effect=DatabaseError):
+            with self.assertLogs('property.view_counter', level='ERROR'):
+                self.assertEqual(view_counter.flush(), 0)
+        self.assertEqual(view_counter.pending(), {self.first.pk: 1})
+
+    @override_settings(PROPERTY_VIEW_FLUSH_ON_ERROR='drop')
+    def test_failed_flush_can_drop_counts(self):
+        view_counter.record(self.first.pk)
+        with mock.patch('property.view_counter.apply_increments', side_effect=DatabaseError):
+            with self.assertLogs('property.view_counter', level='ERROR'):
+                view_counter.flush()
+        self.assertEqual(view_counter.pending(), {})
+
+    def test_flush_command(self):
+        view_counter.record(self.second.pk, count=5)
+        call_command('flush_property_views', stdout=StringIO())
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.views, 5)
+
+
+@override_settings(PROPERTY_VIEW_FLUSH_INTERVAL=0)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        self.location = Location.objects.create(country='Country', region='Region', city='City')
+        self.first, self.second = [
+            Property.objects.create(
+                owner=self.profile, title=f'Property {i}', description='Description',
+                location=self.location, property_type='LAND', price=100,
+            )
+            for i in range(2)
+        ]
+
+    def get(self, url, **headers):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, headers=headers)
+        # View counts are written through in these tests; ignore those writes.
+        reads = [q for q in ctx.captured_queries if not q['sql'].startswith('UPDATE')]
+        return response, len(reads)
+
+    def test_repeat_reads_are_served_from_cache(self):
+        for url in ('/api/properties/', f'/api/property/{self.first.pk}/?expand=1',
+                    '/api/locations/', f'/api/location/{self.location.pk}/'):
+            with self.subTest(url=url):
+                first, _ = self.get(url)
+                second, queries = self.get(url)
+                self.assertEqual(queries, 0)
+                self.assertEqual(first.data, second.data)
+                self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_conditional_get(self):
+        url = f'/api/property/{self.first.pk}/'
+        response, _ = self.get(url)
+        not_modified, queries = self.get(url, if_none_match=response['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(queries, 0)
+
+    def test_conditional_get_with_weak_tags_and_lists(self):
+        url = f'/api/property/{self.first.pk}/'
+        etag = self.get(url)[0]['ETag']
+        for header in (f'W/{etag}', f'"stale", {etag}', f'W/"stale", W/{etag}'):
+            with self.subTest(header=header):
+                self.assertEqual(self.get(url, if_none_match=header)[0].status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.get(url, if_none_match='W/"stale"')[0].status_code, status.HTTP_200_OK)
+
+    def test_saves_invalidate_only_affected_entries(self):
+        first_url = f'/api/property/{self.first.pk}/?expand=1'
+        second_url = f'/api/property/{self.second.pk}/?expand=1'
+        self.get(first_url)
+        self.get(second_url)
+
+        PropertyImage.objects.create(property=self.first, image='property_images/a.jpg')
+        response, queries = self.get(first_url)
+        self.assertGreater(queries, 0)
+        self.assertEqual(len(response.data['images']), 1)
+        _, queries = self.get(second_url)
+        self.assertEqual(queries, 0)
+
+        self.second.title = 'Renamed'
+        self.second.save()
+        response, _ = self.get(second_url)
+        self.assertEqual(response.data['title'], 'Renamed')
+
+    def test_location_save_invalidates_location_and_embedding_properties(self):
+        location_url = f'/api/location/{self.location.pk}/'
+        property_url = f'/api/property/{self.first.pk}/?expand=1'
+        self.get(location_url)
+        self.get(property_url)
+        self.location.city = 'Elsewhere'
+        self.location.save()
+        self.assertEqual(self.get(location_url)[0].data['city'], 'Elsewhere')
+        self.assertEqual(self.get(property_url)[0].data['location']['city'], 'Elsewhere')
+
+    def test_list_reflects_deletes(self):
+        self.get('/api/properties/')
+        self.second.delete()
+        response, _ = self.get('/api/properties/')
+        self.assertEqual([row['id'] for row in response.data['results']], [self.first.pk])
+
+
+class PropertyImportTests(TestCase):
+    CSV = (
+        'title,description,property_type,price,price_period,country,region,city,district,street,amenities,'
+        'land_type,area,rental_type,bedrooms,bathrooms,furnished\n'
+        'Plot A,Flat land,LAND,5000,,Ghana,Ashanti,Kumasi,,,"WiFi, Parking",RESIDENTIAL,120.5,,,,\n'
+        'House B,Family home,RENTAL,800,MONTHLY,Ghana,Ashanti,Kumasi,Adum,,Parking,,,HOUSE,3,2,true\n'
+        'Broken,No price,RENTAL,,MONTHLY,Ghana,Ashanti,Kumasi,,,,,,HOUSE,3,2,\n'
+        'Castle,Bad type,CASTLE,10,,Ghana,Ashanti,Kumasi,,,,,,,,,\n'
+        'Plot C,Second plot,LAND,7000,,Ghana,Ashanti,Kumasi,,,,COMMERCIAL,80,,,,\n'
+    )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='agency', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        self.existing = Location.objects.create(country='Ghana', region='Ashanti', city='Kumasi')
+        Amenity.objects.create(name='Parking')
+
+    def run_command(self, content, suffix='.csv', **options):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False) as handle:
+            handle.write(content)
+        self.addCleanup(os.remove, handle.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_properties', handle.name, owner='agency', stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_command_imports_rows_and_reports_errors(self):
+        out, err = self.run_command(self.CSV, chunk_size=2)
+        self.assertIn('Imported 3 properties, 2 rows failed.', out)
+        self.assertIn('row 4:', err)
+        self.assertIn('row 5:', err)
+
+        plot = Property.objects.get(title='Plot A')
+        self.assertEqual(plot.owner, self.profile)
+        self.assertEqual(plot.land.area, Decimal('120.50'))
+        self.assertEqual(set(plot.amenities.values_list('name', flat=True)), {'WiFi', 'Parking'})
+        house = Property.objects.get(title='House B')
+        self.assertTrue(house.rental.furnished)
+        self.assertEqual(house.location.district, 'Adum')
+
+    def test_locations_are_deduplicated_including_null_columns(self):
+        self.run_command(self.CSV)
+        self.assertEqual(Property.objects.get(title='Plot A').location, self.existing)
+        self.assertEqual(Property.objects.get(title='Plot C').location, self.existing)
+        self.assertEqual(Location.objects.count(), 2)
+        self.assertEqual(Amenity.objects.filter(name='Parking').count(), 1)
+
+    def test_imported_rows_are_searchable(self):
+        self.run_command(self.CSV)
+        response = self.client.get('/api/properties/search/text/', {'q': 'family'})
+        self.assertEqual([row['title'] for row in response.data['results']], ['House B'])
+
+    def test_api_imports_jsonl(self):
+        lines = [
+            {'title': 'Hostel', 'description': 'Near campus', 'property_type': 'HOSTEL', 'price': 300,
+             'country': 'Ghana', 'region': 'Central', 'city': 'Cape Coast', 'amenities': ['WiFi'],
+             'hostel_type': 'MIXED', 'room_type': 'SHARED', 'capacity': 4, 'distance_to_campus': '0.8'},
+            {'title': 'Missing city', 'description': 'x', 'property_type': 'LAND', 'price': 1,
+             'country': 'Ghana', 'region': 'Central'},
+        ]
+        upload = SimpleUploadedFile('listings.jsonl', '\n'.join(json.dumps(line) for line in lines).encode())
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/properties/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+        self.assertIn('city', response.data['errors'][0]['errors'])
+        self.assertEqual(CampusHostel.objects.get().capacity, 4)
+
+    def test_non_string_amenities_fail_only_their_row(self):
+        base = {'title': 'Plot', 'description': 'x', 'property_type': 'LAND', 'price': 1, 'land_type': 'RESIDENTIAL',
+                'area': 100, 'country': 'Ghana', 'region': 'Central', 'city': 'Winneba'}
+        lines = [{**base, 'amenities': [1, None, {'a': 1}]}, {**base, 'amenities': {'a': 1}}, base]
+        report = import_properties(StringIO('\n'.join(json.dumps(line) for line in lines)), 'jsonl', self.profile)
+        self.assertEqual((report.created, report.failed), (1, 2))
+        self.assertEqual([error['row'] for error in report.errors], [1, 2])
+        self.assertIn('amenities', report.errors[0]['errors'])
+
+    def test_api_requires_authentication(self):
+        upload = SimpleUploadedFile('listings.csv', self.CSV.encode())
+        response = self.client.post('/api/properties/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PropertyExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='partner', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        location = Location.objects.create(country='Ghana', region='Ashanti', city='Kumasi', district='Adum')
+        self.old = Property.objects.create(
+            owner=self.profile, title='Old plot', description='Plot', location=location,
+            property_type='LAND', price=100,
+        )
+        Land.objects.create(property=self.old, land_type='RESIDENTIAL', area=50)
+        self.new = Property.objects.create(
+            owner=self.profile, title='New flat', description='Flat', location=location,
+            property_type='APARTMENT', price=900, price_period='MONTHLY',
+        )
+        Apartment.objects.create(
+            property=self.new, apartment_type='STUDIO', bedrooms=1, bathrooms=1, floor_number=2, total_floors=5,
+        )
+        PropertyAmenity.objects.create(property=self.new, amenity=Amenity.objects.create(name='WiFi'))
+        Property.objects.filter(pk=self.old.pk).update(date_updated=timezone.now() - timedelta(days=10))
+
+    def export(self, **params):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/properties/export/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_jsonl_rows_include_location_and_subtype_fields(self):
+        rows = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.old.pk, self.new.pk])
+        self.assertEqual(rows[0]['land_type'], 'RESIDENTIAL')
+        self.assertEqual(rows[1]['district'], 'Adum')
+        self.assertEqual(rows[1]['apartment_type'], 'STUDIO')
+        self.assertEqual(rows[1]['amenities'], ['WiFi'])
+
+    def test_incremental_export(self):
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        rows = [json.loads(line) for line in self.export(since=since).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.new.pk])
+
+    def test_csv_export_round_trips_through_import(self):
+        content = self.export(export_format='csv')
+        self.assertTrue(content.startswith('id,title,description'))
+        report = import_properties(StringIO(content), 'csv', self.profile)
+        self.assertEqual((report.created, report.failed), (2, 0))
+        self.assertEqual(Apartment.objects.filter(apartment_type='STUDIO').count(), 2)
+
+    def test_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dump.jsonl')
+            call_command('export_properties', output=path, chunk_size=1)
+            with open(path) as handle:
+                self.assertEqual(len(handle.readlines()), 2)
+
+    def test_requires_authentication(self):
+        response = self.client.get('/api/properties/export/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(
+    PROPERTY_VIEW_FLUSH_INTERVAL=0,
+    PROPERTY_IMAGE_ASYNC=False,
+    PROPERTY_IMAGE_VARIANTS={'thumb': 64, 'medium': 128},
+    PROPERTY_IMAGE_FORMATS=['webp', 'jpeg'],
+)
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.media_root = media.name
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        location = Location.objects.create(country='Country', region='Region', city='City')
+        self.property = Property.objects.create(
+            owner=self.profile, title='Flat', description='Flat', location=location,
+            property_type='APARTMENT', price=100,
+        )
+
+    def png(self, name='photo.png', size=(400, 300)):
+        buffer = BytesIO()
+        Image.new('RGBA', size, (200, 30, 30, 255)).save(buffer, format='PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_upload_records_variants_and_serializer_exposes_urls(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = PropertyImage.objects.create(property=self.property, image=self.png())
+        image.refresh_from_db()
+        self.assertEqual(set(image.variants), {'thumb_webp', 'thumb_jpeg', 'medium_webp', 'medium_jpeg'})
+        with Image.open(os.path.join(self.media_root, image.variants['thumb_jpeg'])) as thumb:
+            self.assertEqual(thumb.size, (64, 48))
+
+        response = self.client.get(f'/api/property/{self.property.pk}/?expand=1')
+        urls = response.data['images'][0]['variants']
+        self.assertTrue(urls['medium_webp'].endswith('_medium.webp'))
+
+    def test_backfill_command_renders_existing_images_across_processes(self):
+        PropertyImage.objects.bulk_create([
+            PropertyImage(property=self.property, image=default_storage.save(f'property_images/p{i}.png', self.png()))
+            for i in range(3)
+        ])
+        out = StringIO()
+        call_command('generate_image_variants', only='property-images', workers=2, stdout=out)
+        self.assertIn('rendered 3, failed 0', out.getvalue())
+        self.assertTrue(all(len(v) == 4 for v in PropertyImage.objects.values_list('variants', flat=True)))
+
+        out = StringIO()
+        call_command('generate_image_variants', only='property-images', workers=2, stdout=out)
+        self.assertIn('rendered 0, failed 0', out.getvalue())
+
+
+@override_settings(PROPERTY_IMAGE_ASYNC=False)
+class PropertyImageBatchUploadTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        location = Location.objects.create(country='Country', region='Region', city='City')
+        self.property = Property.objects.create(
+            owner=self.profile, title='Flat', description='Flat', location=location,
+            property_type='APARTMENT', price=100,
+        )
+        self.old = PropertyImage.objects.create(property=self.property, image='property_images/old.jpg', is_featured=True)
+        self.url = f'/api/property/{self.property.pk}/images/'
+        self.client.force_authenticate(self.user)
+
+    def jpeg(self, name):
+        buffer = BytesIO()
+        Image.new('RGB', (40, 30), (10, 120, 10)).save(buffer, format='JPEG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def test_batch_upload_creates_rows_in_one_insert(self):
+        payload = {
+            'images': [self.jpeg(f'{i}.jpg') for i in range(5)],
+            'captions': ['Kitchen', 'Lounge'],
+            'featured': 1,
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, payload, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "property_propertyimage"')]
+        self.assertEqual(len(inserts), 1)
+
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual([row['caption'] for row in response.data[:3]], ['Kitchen', 'Lounge', None])
+        featured = PropertyImage.objects.filter(property=self.property, is_featured=True)
+        self.assertEqual(list(featured.values_list('pk', flat=True)), [response.data[1]['id']])
+        self.assertEqual(PropertyImage.objects.get(pk=response.data[0]['id']).uploaded_by, self.profile)
+        self.assertTrue(default_storage.exists(PropertyImage.objects.get(pk=response.data[4]['id']).image.name))
+
+    def test_existing_featured_image_kept_without_featured_index(self):
+        response = self.client.post(self.url, {'images': [self.jpeg('a.jpg')]}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.old.refresh_from_db()
+        self.assertTrue(self.old.is_featured)
+
+    def test_invalid_file_rejects_whole_batch(self):
+        payload = {'images': [self.jpeg('a.jpg'), SimpleUploadedFile('b.jpg', b'not an image')]}
+        response = self.client.post(self.url, payload, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(PropertyImage.objects.count(), 1)
+
+    def test_featured_index_out_of_range(self):
+        payload = {'images': [self.jpeg('a.jpg')], 'featured': 3}
+        response = self.client.post(self.url, payload, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('featured', response.data)
+
+    def test_only_owner_or_manager_may_upload(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(self.url, {'images': [self.jpeg('a.jpg')]}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        manager = User.objects.create_user(username='manager', password='testpass')
+        self.client.force_authenticate(manager)
+        response = self.client.post(self.url, {'images': [self.jpeg('a.jpg')]}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(PropertyImage.objects.count(), 1)
+
+        Property.objects.filter(pk=self.property.pk).update(managed_by=Profile.objects.get(user=manager))
+        response = self.client.post(self.url, {'images': [self.jpeg('a.jpg')]}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class ReviewStatsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        self.reviewers = [
+            Profile.objects.get(user=User.objects.create_user(username=f'reviewer{i}', password='x'))
+            for i in range(3)
+        ]
+        location = Location.objects.create(country='Country', region='Region', city='City')
+        self.good, self.poor, self.unrated = [
+            Property.objects.create(
+                owner=self.profile, title=title, description='Description', location=location,
+                property_type='RENTAL', price=100,
+            )
+            for title in ('Good', 'Poor', 'Unrated')
+        ]
+
+    def review(self, prop, reviewer, rating, approved=True):
+        return Review.objects.create(
+            property=prop, reviewer=reviewer, rating=rating, title='Review', comment='Comment', is_approved=approved,
+        )
+
+    def stats(self, prop):
+        prop.refresh_from_db()
+        return prop.review_count, prop.rating_sum, prop.rating_average, [
+            getattr(prop, f'rating_count_{r}') for r in range(1, 6)
+        ]
+
+    def test_saving_a_stale_instance_keeps_the_counters(self):
+        stale = Property.objects.get(pk=self.good.pk)
+        profile = Profile.objects.get(pk=self.profile.pk)
+        self.review(self.good, self.reviewers[0], 4)
+        Property.objects.filter(pk=self.good.pk).update(views=7)
+        Inquiry.objects.create(property=self.good, user=self.reviewers[0], message='Available?')
+
+        stale.title = 'Renamed'
+        stale.save()
+        profile.bio = 'Landlord'
+        profile.save()
+        self.good.refresh_from_db()
+        self.assertEqual((self.good.title, self.good.views, self.good.review_count, self.good.rating_average),
+                         ('Renamed', 7, 1, 4.0))
+        self.assertEqual(Profile.objects.get(pk=self.profile.pk).unread_inquiries, 1)
+
+    def test_saves_and_deletes_update_aggregates_incrementally(self):
+        first = self.review(self.good, self.reviewers[0], 5)
+        second = self.review(self.good, self.reviewers[1], 4)
+        pending = self.review(self.good, self.reviewers[2], 1, approved=False)
+        self.assertEqual(self.stats(self.good), (2, 9, 4.5, [0, 0, 0, 1, 1]))
+
+        pending.is_approved = True
+        pending.save()
+        self.assertEqual(self.stats(self.good), (3, 10, 10 / 3, [1, 0, 0, 1, 1]))
+
+        second.rating = 2
+        second.save()
+        self.assertEqual(self.stats(self.good), (3, 8, 8 / 3, [1, 1, 0, 0, 1]))
+
+        first.is_approved = False
+        first.save()
+        pending.delete()
+        self.assertEqual(self.stats(self.good), (1, 2, 2.0, [0, 1, 0, 0, 0]))
+        second.delete()
+        self.assertEqual(self.stats(self.good), (0, 0, 0.0, [0, 0, 0, 0, 0]))
+
+    def test_reconcile_command_repairs_drift(self):
+        self.review(self.good, self.reviewers[0], 5)
+        self.review(self.poor, self.reviewers[0], 2, approved=False)
+        # update() skips the signals, leaving the aggregates stale.
+        Review.objects.update(is_approved=True)
+        call_command('reconcile_review_stats', chunk_size=2, stdout=StringIO())
+        self.assertEqual(self.stats(self.poor), (1, 2, 2.0, [0, 1, 0, 0, 0]))
+        self.assertEqual(self.stats(self.good), (1, 5, 5.0, [0, 0, 0, 0, 1]))
+
+    def test_sort_and_filter_by_rating(self):
+        self.review(self.good, self.reviewers[0], 5)
+        self.review(self.good, self.reviewers[1], 4)
+        self.review(self.poor, self.reviewers[0], 2)
+
+        ids = []
+        url = '/api/properties/?ordering=rating&page_size=1'
+        while url:
+            response = self.client.get(url)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(ids, [self.good.pk, self.poor.pk, self.unrated.pk])
+
+        response = self.client.get('/api/properties/search/?min_rating=3&min_reviews=2')
+        self.assertEqual([row['id'] for row in response.data['results']], [self.good.pk])
+        self.assertEqual(response.data['results'][0]['rating_average'], 4.5)
+
+    def test_unknown_ordering(self):
+        response = self.client.get('/api/properties/?ordering=cheapest')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rating_filters_reject_bad_numbers(self):
+        for query in ('min_reviews=NaN', 'min_reviews=Infinity', 'min_reviews=1.5', 'min_rating=NaN'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/properties/search/?{query}')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_aggregates_are_read_only_in_the_api(self):
+        response = self.client.put(f'/api/property/{self.unrated.pk}/', {
+            'owner': self.profile.pk, 'title': 'Unrated', 'description': 'Description',
+            'location': self.unrated.location_id, 'property_type': 'RENTAL', 'price': 100,
+            'review_count': 99, 'rating_average': 5,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stats(self.unrated)[:3], (0, 0, 0.0))
+
+
+class ProximitySearchTests(TestCase):
+    CAMPUS = (5.6506, -0.1962)
+    KM_LAT = 1 / 111.195
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        lat, lng = self.CAMPUS
+        km_lng = self.KM_LAT / math.cos(math.radians(lat))
+        self.near = self.create_property('HOSTEL', 'North gate', lat + 0.5 * self.KM_LAT, lng)
+        self.east = self.create_property('HOSTEL', 'East wing', lat, lng + 1.5 * km_lng)
+        self.far = self.create_property('HOSTEL', 'South hall', lat - 3 * self.KM_LAT, lng)
+        self.rental = self.create_property('RENTAL', 'Campus flat', lat + 0.2 * self.KM_LAT, lng)
+        self.unplaced = self.create_property('HOSTEL', 'Somewhere', None, None)
+
+    def create_property(self, property_type, street, latitude, longitude):
+        location = Location.objects.create(
+            country='Ghana', region='Greater Accra', city='Legon', street=street,
+            latitude=latitude, longitude=longitude,
+        )
+        return Property.objects.create(
+            owner=self.profile, title=street, description='Description', location=location,
+            property_type=property_type, price=100,
+        )
+
+    def nearby(self, query):
+        return self.client.get(f'/api/properties/nearby/?{query}')
+
+    def test_encode(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geo.encode(-25.382708, -49.265506, 8), '6gkzwgjz')
+
+    def test_geohash_follows_coordinates(self):
+        location = self.near.location
+        self.assertEqual(location.geohash, geo.encode(location.latitude, location.longitude))
+        location.latitude = location.longitude = None
+        location.save()
+        self.assertIsNone(Location.objects.get(pk=location.pk).geohash)
+
+    def test_covering_cells_cover_the_box(self):
+        random = Random(7)
+        for south, west, north, east in [
+            geo.bounding_box(*self.CAMPUS, 2), geo.bounding_box(0, 179.99, 5), (10.0, 20.0, 10.9, 20.4),
+        ]:
+            cells = geo.covering_cells(south, west, north, east)
+            self.assertLessEqual(len(cells), geo.MAX_CELLS)
+            for _ in range(200):
+                lat = random.uniform(south, north)
+                lng = (random.uniform(west, east) + 180) % 360 - 180
+                self.assertTrue(any(geo.encode(lat, lng).startswith(cell) for cell in cells))
+
+    def test_radius_search_sorted_by_distance(self):
+        lat, lng = self.CAMPUS
+        response = self.nearby(f'lat={lat}&lng={lng}&radius=2&property_type=HOSTEL')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([row['id'] for row in results], [self.near.pk, self.east.pk])
+        self.assertAlmostEqual(results[0]['distance_km'], 0.5, places=2)
+        self.assertAlmostEqual(results[1]['distance_km'], 1.5, places=2)
+
+    def test_radius_search_pages(self):
+        lat, lng = self.CAMPUS
+        ids = []
+        url = f'/api/properties/nearby/?lat={lat}&lng={lng}&radius=4&page_size=2'
+        while url:
+            response = self.client.get(url)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(ids, [self.rental.pk, self.near.pk, self.east.pk, self.far.pk])
+
+    def test_bbox_search(self):
+        lat, lng = self.CAMPUS
+        bbox = f'{lat - 0.01},{lng - 0.01},{lat + 0.01},{lng + 0.01}'
+        response = self.nearby(f'bbox={bbox}&property_type=HOSTEL')
+        self.assertEqual([row['id'] for row in response.data['results']], [self.near.pk])
+
+    def test_invalid_parameters(self):
+        for query in ['', 'lat=5.6', 'lat=91&lng=0', 'lat=5&lng=0&radius=500', 'lat=5&lng=0&radius=-1',
+                      'bbox=1,2,3', 'bbox=5,1,4,2', 'bbox=0,0,5,5', 'lat=NaN&lng=1', 'lat=5&lng=-Infinity',
+                      'lat=5&lng=0&radius=NaN', 'bbox=nan,0,0.5,0.5']:
+            with self.subTest(query=query):
+                self.assertEqual(self.nearby(query).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_uses_geohash_index(self):
+        cells = geo.covering_cells(*geo.bounding_box(*self.CAMPUS, 2))
+        plan = Property.objects.filter(geo.cells_filter(cells, 'location__')).explain()
+        self.assertIn('location_geohash_idx', plan)
+        self.assertNotRegex(plan, r'SCAN property_location(?! USING)')
+
+    def test_location_api_requires_both_coordinates(self):
+        response = self.client.post('/api/locations/', {
+            'country': 'Ghana', 'region': 'Greater Accra', 'city': 'Legon', 'latitude': 5.6,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        accra = Location.objects.create(country='Ghana', region='Greater Accra', city='Accra')
+        kumasi = Location.objects.create(country='Ghana', region='Ashanti', city='Kumasi')
+        self.wifi = Amenity.objects.create(name='WiFi')
+        self.parking = Amenity.objects.create(name='Parking')
+        rows = [
+            (accra, 'HOSTEL', 'MONTHLY', [self.wifi, self.parking]),
+            (accra, 'HOSTEL', 'MONTHLY', [self.wifi]),
+            (accra, 'RENTAL', 'MONTHLY', [self.wifi]),
+            (kumasi, 'HOSTEL', 'YEARLY', [self.parking]),
+            (kumasi, 'LAND', 'ONETIME', []),
+        ]
+        for i, (location, property_type, period, amenities) in enumerate(rows):
+            prop = Property.objects.create(
+                owner=self.profile, title=f'Property {i}', description='Description', location=location,
+                property_type=property_type, price_period=period, price=100 * (i + 1),
+            )
+            for amenity in amenities:
+                PropertyAmenity.objects.create(property=prop, amenity=amenity)
+        Property.objects.create(
+            owner=self.profile, title='Taken', description='Description', location=accra,
+            property_type='HOSTEL', price=50, is_available=False,
+        )
+
+    def facets(self, query=''):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/properties/search/facets/?{query}')
+        return response, len(ctx.captured_queries)
+
+    def test_counts_per_dimension(self):
+        response, queries = self.facets()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, 4)
+        data = response.data
+        self.assertEqual(data['total'], 5)
+        self.assertEqual(
+            [(row['name'], row['count']) for row in data['amenity']], [('WiFi', 3), ('Parking', 2)]
+        )
+        self.assertEqual(
+            [(row['value'], row['count']) for row in data['property_type']], [('HOSTEL', 3), ('LAND', 1), ('RENTAL', 1)]
+        )
+        self.assertEqual(data['property_type'][0]['label'], 'Campus Hostel')
+        self.assertEqual([(row['value'], row['count']) for row in data['city']], [('Accra', 3), ('Kumasi', 2)])
+
+    def test_counts_follow_filters(self):
+        response, _ = self.facets(f'city=Accra&amenity={self.wifi.id}&is_available=any')
+        data = response.data
+        self.assertEqual(data['total'], 3)
+        self.assertEqual([(row['name'], row['count']) for row in data['amenity']], [('WiFi', 3), ('Parking', 1)])
+        self.assertEqual([(row['value'], row['count']) for row in data['price_period']], [('MONTHLY', 3)])
+
+    def test_cached_per_filter_signature(self):
+        self.facets('property_type=hostel,rental')
+        # Order, case and unrelated parameters do not change the signature.
+        response, queries = self.facets('property_type=RENTAL,HOSTEL&page_size=5')
+        self.assertEqual(queries, 0)
+        self.assertEqual(response.data['total'], 4)
+
+        _, queries = self.facets('property_type=HOSTEL')
+        self.assertEqual(queries, 4)
+
+    def test_cache_invalidated_by_writes(self):
+        self.facets()
+        self.parking.name = 'Garage'
+        self.parking.save()
+        response, queries = self.facets()
+        self.assertEqual(queries, 4)
+        self.assertIn('Garage', [row['name'] for row in response.data['amenity']])
+
+        Property.objects.filter(title='Taken').get().delete()
+        Property.objects.create(
+            owner=self.profile, title='New', description='Description', location=Location.objects.get(city='Kumasi'),
+            property_type='LAND', price=10,
+        )
+        response, _ = self.facets()
+        self.assertEqual(response.data['total'], 6)
+
+    def test_invalid_filter(self):
+        response, _ = self.facets('min_price=cheap')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(PROPERTY_VIEW_FLUSH_INTERVAL=0, PROPERTY_RESPONSE_CACHE_ENABLED=False)
+class BenchmarkHarnessTests(TestCase):
+    def test_seed_and_run(self):
+        sizes = benchmark.seed(properties=20)
+        self.assertEqual(Property.objects.filter(title__endswith=' 19').count(), 1)
+        self.assertEqual(PropertyImage.objects.count(), 20 * sizes['images_per_property'])
+        self.assertEqual(
+            Review.objects.filter(is_approved=True).count(),
+            sum(Property.objects.values_list('review_count', flat=True)),
+        )
+
+        results = benchmark.run(iterations=3, warmup=1, only=['property_detail', 'location_list', 'amenity_list'])
+        self.assertEqual(set(results), {'property_detail', 'location_list', 'amenity_list'})
+        detail = results['property_detail']
+        self.assertEqual(detail['status_codes'], {'200': 3})
+        self.assertLessEqual(detail['latency_ms']['p50'], detail['latency_ms']['p99'])
+        self.assertEqual(results['location_list']['queries']['mean'], 1)
+
+    def test_compare(self):
+        def result(p95, queries):
+            return {'latency_ms': {'p95': p95}, 'queries': {'mean': queries}}
+
+        baseline = {'fast': result(10, 2), 'slow': result(10, 2), 'chatty': result(10, 2)}
+        current = {'fast': result(12, 2), 'slow': result(20, 2), 'chatty': result(9, 5), 'new': result(1, 1)}
+        regressions = benchmark.compare(current, baseline, latency_tolerance=0.25)
+        self.assertEqual(
+            [(item['scenario'], item['metric']) for item in regressions],
+            [('slow', 'latency_ms.p95'), ('chatty', 'queries.mean')],
+        )
+        self.assertEqual(benchmark.percentile([1, 2, 3, 4], 50), 2)
+        self.assertEqual(benchmark.percentile([1, 2, 3, 4], 99), 4)
+
+
+@override_settings(PROPERTY_VIEW_FLUSH_INTERVAL=0)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        self.location = Location.objects.create(country='Country', region='Region', city='City')
+        self.property = Property.objects.create(
+            owner=self.profile, title='Property', description='Description', location=self.location,
+            property_type='LAND', price=100,
+        )
+
+    def scrape(self, **extra):
+        return self.client.get('/metrics', **extra)
+
+    def test_records_per_route(self):
+        self.client.get(f'/api/property/{self.property.pk}/')
+        self.client.get('/api/property/999999/')
+        body = self.scrape().content.decode()
+
+        self.assertIn('property_http_requests_total{route="Property-detail",method="GET",status="200"} 1', body)
+        self.assertIn('property_http_requests_total{route="Property-detail",method="GET",status="404"} 1', body)
+        self.assertIn('property_http_request_duration_seconds_count{route="Property-detail"} 2', body)
+        self.assertIn('property_db_queries_per_request_bucket{route="Property-detail",le="+Inf"} 2', body)
+        self.assertRegex(body, r'property_response_size_bytes_total\{route="Property-detail"\} [1-9]\d*')
+        self.assertRegex(body, r'property_serialization_duration_seconds_total\{route="Property-detail"\} \d')
+        self.assertIn('property_repeated_query_requests_total{route="Property-detail"} 0', body)
+
+    def test_query_counts(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/locations/')
+        stats = metrics.registry.routes['locations-list']
+        self.assertEqual(stats.queries.sum, len(ctx.captured_queries))
+        self.assertGreater(stats.db_seconds, 0)
+
+    def test_flags_repeated_statements(self):
+        recorder = metrics.QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for location_id in range(6):
+                list(Property.objects.filter(location_id=location_id))
+            Location.objects.count()
+        self.assertEqual(recorder.count, 7)
+        repeated = recorder.repeated_statement(5)
+        self.assertIn('"location_id" = %s', repeated)
+        self.assertIsNone(recorder.repeated_statement(7))
+
+        with self.assertLogs('property.metrics', 'WARNING') as logs:
+            metrics.registry.observe('property-list', 'GET', 200, 0.1, 7, 0.01, 0.0, 10, repeated)
+            metrics.registry.observe('property-list', 'GET', 200, 0.1, 7, 0.01, 0.0, 10, repeated)
+        self.assertEqual(len(logs.output), 1)
+        self.assertEqual(metrics.registry.routes['property-list'].repeated_query_requests, 2)
+
+    def test_metrics_endpoint_is_local_only(self):
+        response = self.scrape()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertEqual(self.scrape(REMOTE_ADDR='203.0.113.9').status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(PROPERTY_METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.client.get('/api/properties/')
+        self.assertEqual(metrics.registry.routes, {})
+
+
+class AuthenticationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_register_fills_the_signal_created_profile(self):
+        response = self.client.post('/api/auth/register/', {
+            'username': 'newcomer', 'email': 'newcomer@example.com', 'password': 'testpass',
+            'bio': 'Student', 'phone_number': '+233201234567',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        profile = Profile.objects.get(user__username='newcomer')
+        self.assertEqual(Profile.objects.filter(user__username='newcomer').count(), 1)
+        self.assertEqual(profile.bio, 'Student')
+        self.assertEqual(str(profile.phone_number), '+233201234567')
+        self.assertEqual(response.data['profile']['id'], profile.id)
+
+    def test_login_uses_one_query(self):
+        user = User.objects.create_user(username='tenant', email='tenant@example.com', password='testpass')
+        Profile.objects.filter(user=user).update(bio='Tenant')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/auth/login/', {'username': 'tenant', 'password': 'testpass'},
+                                        format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertIn('JOIN "property_profile"', ctx.captured_queries[0]['sql'])
+        self.assertEqual(response.data['user']['username'], 'tenant')
+        self.assertEqual(response.data['profile']['bio'], 'Tenant')
+        self.assertEqual(response.data['profile']['user']['email'], 'tenant@example.com')
+        self.assertIn('access', response.data)
+
+    def test_login_rejects_bad_credentials(self):
+        User.objects.create_user(username='tenant', password='testpass')
+        for username, password in (('tenant', 'wrong'), ('nobody', 'testpass')):
+            response = self.client.post('/api/auth/login/', {'username': username, 'password': password},
+                                        format='json')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_is_one_to_one(self):
+        user = User.objects.create_user(username='tenant', password='testpass')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Profile.objects.create(user=user)
+        user = User.objects.get(pk=user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.profile.user_id, user.pk)
+
+
+class ProfileOneToOneMigrationTests(TransactionTestCase):
+    before = [('property', '0009_location_geohash')]
+    after = [('property', '0010_profile_user_one_to_one')]
+
+    def tearDown(self):
+        call_command('migrate', 'property', verbosity=0)
+
+    def test_duplicate_profiles_are_merged(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        HistoricalUser = apps.get_model('auth', 'User')
+        HistoricalProfile = apps.get_model('property', 'Profile')
+        HistoricalLocation = apps.get_model('property', 'Location')
+        HistoricalProperty = apps.get_model('property', 'Property')
+        HistoricalReview = apps.get_model('property', 'Review')
+
+        user = HistoricalUser.objects.create(username='twice')
+        other = HistoricalUser.objects.create(username='other')
+        kept = HistoricalProfile.objects.create(user=user)
+        extra = HistoricalProfile.objects.create(user=user, bio='From registration')
+        owner = HistoricalProfile.objects.create(user=other)
+        location = HistoricalLocation.objects.create(country='Country', region='Region', city='City')
+        listing = HistoricalProperty.objects.create(
+            owner=extra, title='Listing', description='Description', location=location,
+            property_type='LAND', price=100,
+        )
+        reviewed = HistoricalProperty.objects.create(
+            owner=owner, title='Reviewed', description='Description', location=location,
+            property_type='LAND', price=100,
+        )
+        HistoricalReview.objects.create(property=reviewed, reviewer=kept, rating=5, title='A', comment='A')
+        HistoricalReview.objects.create(property=reviewed, reviewer=extra, rating=1, title='B', comment='B')
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        apps = executor.loader.project_state(self.after).apps
+        Profile = apps.get_model('property', 'Profile')
+        Property = apps.get_model('property', 'Property')
+        Review = apps.get_model('property', 'Review')
+
+        self.assertEqual(list(Profile.objects.filter(user_id=user.pk).values_list('id', flat=True)), [kept.pk])
+        self.assertEqual(Profile.objects.get(pk=kept.pk).bio, 'From registration')
+        self.assertEqual(Property.objects.get(pk=listing.pk).owner_id, kept.pk)
+        self.assertEqual(list(Review.objects.values_list('reviewer_id', 'rating')), [(kept.pk, 5)])
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        revocations.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='tenant', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        Profile.objects.filter(pk=self.profile.pk).update(user_type='STUDENT')
+
+    def login(self):
+        response = self.client.post('/api/auth/login/', {'username': 'tenant', 'password': 'testpass'}, format='json')
+        return response.data['access'], response.data['refresh']
+
+    def logout(self, access, **data):
+        return self.client.post('/api/auth/logout/', data, format='json', HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_token_validated_without_queries(self):
+        access, _ = self.login()
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        with self.assertNumQueries(0):
+            user, token = StatelessJWTAuthentication().authenticate(request)
+        self.assertTrue(user.is_authenticated)
+        self.assertEqual(str(user.id), str(self.user.id))
+        self.assertEqual(user.profile_id, self.profile.id)
+        self.assertEqual(user.user_type, 'STUDENT')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_profile_id(user), self.profile.id)
+
+    def test_profile_id_fallbacks(self):
+        legacy = RefreshToken.for_user(self.user).access_token
+        self.assertEqual(get_profile_id(ProfileTokenUser(legacy)), self.profile.id)
+        self.assertEqual(get_profile_id(self.user), self.profile.id)
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        access, refresh = self.login()
+        self.assertEqual(self.logout(access, refresh=refresh).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.logout(access).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post('/api/auth/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_everywhere(self):
+        first, _ = self.login()
+        self.assertEqual(self.logout(self.login()[0], all=True).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.logout(first).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rotates_and_retires_the_old_token(self):
+        _, refresh = self.login()
+        response = self.client.post('/api/auth/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(AccessToken(response.data['access'])['profile_id'], self.profile.id)
+        self.assertNotEqual(response.data['refresh'], refresh)
+        again = self.client.post('/api/auth/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(again.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_entries_expire(self):
+        entries = RevocationList()
+        now = time.time()
+        entries.set('old', True, now - 1)
+        entries.set('short', True, now + 10)
+        entries.set('long', True, now + 100)
+        self.assertEqual(len(entries), 2)
+        self.assertIsNone(entries.get('old'))
+        with mock.patch('property.authentication.time.time', return_value=now + 50):
+            self.assertIsNone(entries.get('short'))
+            self.assertTrue(entries.get('long'))
+            entries.set('new', True, now + 200)
+        self.assertEqual(sorted(entries.entries), ['long', 'new'])
+
+
+class FavoritesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='tenant', password='testpass')
+        self.profile = Profile.objects.get(user=self.user)
+        self.client.force_authenticate(self.user)
+        location = Location.objects.create(country='Country', region='Region', city='City')
+        self.ids = [
+            Property.objects.create(
+                owner=self.profile, title=f'Property {i}', description='Description',
+                location=location, property_type='LAND', price=1000 + i,
+            ).id
+            for i in range(4)
+        ]
+
+    def bulk(self, **data):
+        return self.client.post('/api/favorites/bulk/', data, format='json')
+
+    def lookup(self, ids):
+        return self.client.get('/api/favorites/ids/', {'ids': ','.join(map(str, ids))})
+
+    def test_bulk_add_and_remove_are_idempotent(self):
+        missing = max(self.ids) + 100
+        response = self.bulk(add=self.ids[:3] + [missing])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'added': self.ids[:3], 'removed': [], 'missing': [missing]})
+        response = self.bulk(add=self.ids[:3])
+        self.assertEqual(response.data['added'], [])
+        self.assertEqual(Favorite.objects.filter(user=self.profile).count(), 3)
+
+        self.assertEqual(self.bulk(remove=self.ids[:2]).data['removed'], self.ids[:2])
+        self.assertEqual(self.bulk(remove=self.ids[:2]).data['removed'], [])
+        self.assertEqual(list(Favorite.objects.values_list('property_id', flat=True)), [self.ids[2]])
+
+    def test_bulk_rejects_conflicting_ids(self):
+        response = self.bulk(add=self.ids[:1], remove=self.ids[:1])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_lookup_is_answered_from_the_cached_set(self):
+        self.bulk(add=[self.ids[1], self.ids[3]])
+        self.lookup(self.ids)
+        with self.assertNumQueries(0):
+            response = self.lookup(self.ids)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['favorites'], {
+            self.ids[0]: False, self.ids[1]: True, self.ids[2]: False, self.ids[3]: True,
+        })
+
+    @override_settings(PROPERTY_FAVORITES_MAX_BATCH=2)
+    def test_lookup_batch_limit(self):
+        self.assertEqual(self.lookup(self.ids).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_single_favorite_endpoints_invalidate_the_set(self):
+        self.assertEqual(favorites.favorite_ids(self.profile.id), set())
+        response = self.client.post('/api/favorites/', {'property': self.ids[0]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(self.lookup(self.ids[:1]).data['favorites'][self.ids[0]])
+
+        response = self.client.delete(f'/api/favorite/{response.data["id"]}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(self.lookup(self.ids[:1]).data['favorites'][self.ids[0]])
+
+    def test_favorites_are_private(self):
+        other = Profile.objects.get(user=User.objects.create_user(username='other', password='testpass'))
+        favorite = Favorite.objects.create(user=other, property_id=self.ids[0])
+        response = self.client.get(f'/api/favorite/{favorite.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/favorites/').data, [])
+
+    def test_out_of_band_delete_is_re_added(self):
+        self.bulk(add=self.ids[:2])
+        self.assertTrue(self.lookup(self.ids[:1]).data['favorites'][self.ids[0]])
+        Favorite.objects.filter(user=self.profile, property_id=self.ids[0]).delete()
+        self.assertFalse(self.lookup(self.ids[:1]).data['favorites'][self.ids[0]])
+        response = self.bulk(add=self.ids[:2])
+        self.assertEqual(response.data['added'], self.ids[:1])
+        self.assertEqual(Favorite.objects.filter(user=self.profile).count(), 2)
+
+    def test_user_without_profile_is_refused(self):
+        Favorite.objects.create(user=self.profile, property_id=self.ids[0])
+        user = User.objects.create_user(username='orphan', password='testpass')
+        Profile.objects.filter(user=user).delete()
+        self.client.force_authenticate(User.objects.get(pk=user.pk))
+        self.assertEqual(self.client.get('/api/favorites/').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.lookup(self.ids).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.bulk(add=self.ids).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Favorite.objects.count(), 1)
+
+
+class InquiryInboxTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner_user = User.objects.create_user(username='owner', password='testpass')
+        self.owner = Profile.objects.get(user=self.owner_user)
+        self.manager = Profile.objects.get(user=User.objects.create_user(username='agent', password='testpass'))
+        self.tenant = Profile.objects.get(user=User.objects.create_user(username='tenant', password='testpass'))
+        location = Location.objects.create(country='Country', region='Region', city='City')
+        self.managed = Property.objects.create(
+            owner=self.owner, managed_by=self.manager, title='Managed', description='Description',
+            location=location, property_type='LAND', price=1000,
+        )
+        self.own = Property.objects.create(
+            owner=self.owner, managed_by=self.owner, title='Own', description='Description',
+            location=location, property_type='LAND', price=2000,
+        )
+
+    def inquire(self, prop, **kwargs):
+        return Inquiry.objects.create(property=prop, user=self.tenant, message='Still available?', **kwargs)
+
+    def unread(self):
+        return {p.pk: p.unread_inquiries for p in Profile.objects.filter(pk__in=[self.owner.pk, self.manager.pk])}
+
+    def test_unread_counts_follow_saves_and_deletes(self):
+        first = self.inquire(self.managed)
+        self.inquire(self.own)
+        self.inquire(self.own, status='CLOSED')
+        self.assertEqual(self.unread(), {self.owner.pk: 2, self.manager.pk: 1})
+
+        first.status = 'CONTACTED'
+        first.save()
+        self.assertEqual(self.unread(), {self.owner.pk: 1, self.manager.pk: 0})
+        first.status = 'NEW'
+        first.save()
+        first.delete()
+        self.assertEqual(self.unread(), {self.owner.pk: 1, self.manager.pk: 0})
+
+        inbox.recompute([self.owner.pk, self.manager.pk])
+        self.assertEqual(self.unread(), {self.owner.pk: 1, self.manager.pk: 0})
+
+    def test_inbox_pages_by_keyset(self):
+        stamp = timezone.now()
+        ids = []
+        for i in range(5):
+            inquiry = self.inquire(self.managed if i % 2 else self.own)
+            Inquiry.objects.filter(pk=inquiry.pk).update(date_sent=stamp - timedelta(minutes=i // 2))
+            ids.append(inquiry.pk)
+        self.inquire(self.managed, status='CLOSED')
+        self.client.force_authenticate(self.owner_user)
+
+        seen = []
+        url = '/api/inquiries/inbox/?status=new&page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['unread'], 5)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        # Newest first, id descending within a shared timestamp.
+        self.assertEqual(seen, [ids[1], ids[0], ids[3], ids[2], ids[4]])
+
+        manager_view = inbox.received(self.manager.pk, 'manager').filter(status='NEW')
+        self.assertEqual(sorted(manager_view.values_list('id', flat=True)), ids[1::2])
+
+    def test_owner_queue_reads_one_index(self):
+        queryset = inbox.received(self.owner.pk, 'owner').filter(status='NEW').order_by('-date_sent', '-id')[:21]
+        plan = queryset.explain()
+        self.assertIn('inquiry_owner_status_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_bulk_transition_is_one_update(self):
+        inquiries = [self.inquire(self.managed), self.inquire(self.own), self.inquire(self.own)]
+        foreign = Property.objects.create(
+            owner=self.tenant, title='Other', description='Description', location=self.own.location,
+            property_type='LAND', price=10,
+        )
+        other = self.inquire(foreign)
+        self.client.force_authenticate(self.owner_user)
+        ids = [inquiry.pk for inquiry in inquiries] + [other.pk]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/inquiries/inbox/status/', {'ids': ids, 'status': 'CONTACTED'},
+                                        format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], ids[:3])
+        self.assertEqual(response.data['unread'], 0)
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "property_inquiry"')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertEqual(Inquiry.objects.get(pk=other.pk).status, 'NEW')
+        for inquiry in Inquiry.objects.filter(pk__in=ids[:3]):
+            self.assertEqual(inquiry.status, 'CONTACTED')
+            self.assertEqual(inquiry.responded_by_id, self.owner.pk)
+            self.assertIsNotNone(inquiry.responded_at)
+        self.assertEqual(self.unread(), {self.owner.pk: 0, self.manager.pk: 0})
+
+        response = self.client.post('/api/inquiries/inbox/status/', {'ids': ids, 'status': 'CONTACTED'},
+                                    format='json')
+        self.assertEqual(response.data['updated'], [])
+
+    def test_user_without_profile_sees_no_inquiries(self):
+        unmanaged = Property.objects.create(
+            owner=self.owner, title='Unmanaged', description='Description', location=self.own.location,
+            property_type='LAND', price=10,
+        )
+        inquiry = self.inquire(unmanaged)
+        user = User.objects.create_user(username='orphan', password='testpass')
+        Profile.objects.filter(user=user).delete()
+        self.client.force_authenticate(User.objects.get(pk=user.pk))
+
+        self.assertEqual(self.client.get('/api/inquiries/inbox/?role=manager').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get('/api/inquiries/inbox/unread/').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get(f'/api/inquiry/{inquiry.pk}/').status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.post('/api/inquiries/inbox/status/', {'ids': [inquiry.pk], 'status': 'CLOSED'},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Inquiry.objects.get(pk=inquiry.pk).status, 'NEW')
+        self.assertFalse(inbox.received(None, 'manager').exists())
+
+    def test_new_owner_takes_over_the_inquiries(self):
+        self.inquire(self.managed)
+        self.managed.owner = self.tenant
+        self.managed.managed_by = None
+        self.managed.save()
+        self.assertEqual(self.unread(), {self.owner.pk: 0, self.manager.pk: 0})
+        self.assertEqual(Profile.objects.get(pk=self.tenant.pk).unread_inquiries, 1)
+        self.assertEqual(inbox.received(self.tenant.pk).count(), 1)
+
+    def test_reconcile_repairs_bulk_writes(self):
+        Inquiry.objects.bulk_create([Inquiry(property=self.managed, user=self.tenant, message='Hello')])
+        call_command('reconcile_inbox', stdout=StringIO())
+        self.assertEqual(self.unread(), {self.owner.pk: 1, self.manager.pk: 1})
+        self.assertEqual(inbox.received(self.manager.pk, 'manager').count(), 1)
+
+    def test_inquiry_detail_is_limited_to_participants(self):
+        inquiry = self.inquire(self.managed)
+        stranger = User.objects.create_user(username='stranger', password='testpass')
+        for user, expected in ((self.owner_user, status.HTTP_200_OK), (stranger, status.HTTP_404_NOT_FOUND)):
+            self.client.force_authenticate(user)
+            self.assertEqual(self.client.get(f'/api/inquiry/{inquiry.pk}/').status_code, expected)
+
+
+class SQLiteTuningTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'tuning.sqlite3')
+
+    def open(self, name):
+        wrapper = SQLiteDatabaseWrapper({**connection.settings_dict, 'NAME': name}, alias='tuning')
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(PROPERTY_SQLITE_JOURNAL_MODE='WAL')
+    def test_new_connections_are_tuned(self):
+        wrapper = self.open(self.path)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), settings.PROPERTY_SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), settings.PROPERTY_SQLITE_PRAGMAS['cache_size'])
+        self.assertEqual(self.pragma(wrapper, 'temp_store'), 2)  # MEMORY
+        self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+
+    @override_settings(PROPERTY_SQLITE_JOURNAL_MODE=None)
+    def test_journal_mode_is_left_alone(self):
+        wrapper = self.open(self.path)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+        self.assertFalse(os.path.exists(self.path + '-wal'))
+
+    @override_settings(PROPERTY_SQLITE_JOURNAL_MODE='WAL')
+    def test_replica_connection_is_read_only(self):
+        with self.open(self.path).cursor() as cursor:
+            cursor.execute('CREATE TABLE sample (id INTEGER PRIMARY KEY)')
+        replica = self.open(f'file:{self.path}?mode=ro')
+        self.assertEqual(self.pragma(replica, 'query_only'), 1)
+        self.assertEqual(self.pragma(replica, 'journal_mode'), 'wal')
+        with self.assertRaises(DatabaseError), replica.cursor() as cursor:
+            cursor.execute('INSERT INTO sample DEFAULT VALUES')
+
+    def test_router_sends_reads_outside_transactions_to_the_replica(self):
+        router = ReadReplicaRouter()
+        self.assertIsNone(router.db_for_read(Property))
+        with override_settings(PROPERTY_SQLITE_READ_REPLICA=True):
+            # TestCase wraps every test in a transaction.
+            self.assertEqual(router.db_for_read(Property), 'default')
+            with mock.patch.object(connection, 'in_atomic_block', False):
+                self.assertEqual(router.db_for_read(Property), 'replica')
+        self.assertEqual(router.db_for_write(Property), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'property'))
+
+    def test_load_test_reports_both_setups(self):
+        reports = load_test(writers=2, readers=2, duration=0.2)
+        self.assertEqual(set(reports), {'baseline', 'tuned'})
+        for report in reports.values():
+            self.assertEqual(set(report), {'writer', 'reader'})
+        self.assertEqual(reports['tuned']['writer']['errors'], 0)
+        self.assertGreater(reports['tuned']['writer']['ops'], 0)
+        self.assertGreater(reports['tuned']['reader']['ops'], 0)
+
+
+class PropertyAmenityBatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        owner = Profile.objects.get(user=User.objects.create_user(username='owner', password='testpass'))
+        location = Location.objects.create(country='Country', region='Region', city='City')
+        self.properties = [
+            Property.objects.create(
+                owner=owner, title=f'Property {i}', description='Description', location=location,
+                property_type='LAND', price=1000,
+            )
+            for i in range(2)
+        ]
+        self.amenities = [Amenity.objects.create(name=f'Amenity {i}') for i in range(20)]
+
+    def amenity_ids(self, prop):
+        return set(PropertyAmenity.objects.filter(property=prop).values_list('amenity_id', flat=True))
+
+    def test_set_amenities_diffs_against_existing_links(self):
+        prop = self.properties[0]
+        kept = PropertyAmenity.objects.create(property=prop, amenity=self.amenities[0], notes='Keep me')
+        PropertyAmenity.objects.create(property=prop, amenity=self.amenities[1])
+        wanted = [a.id for a in self.amenities[0:1] + self.amenities[2:]]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/propertyamenities/set/', {'property': prop.id, 'amenities': wanted},
+                                        format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['deleted']), (18, 1))
+        self.assertEqual(self.amenity_ids(prop), set(wanted))
+        self.assertEqual(PropertyAmenity.objects.get(pk=kept.pk).notes, 'Keep me')
+        [result] = response.data['results']
+        self.assertEqual(sorted(row['amenity']['id'] for row in result['amenities']), sorted(wanted))
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+        deletes = [q for q in queries.captured_queries if q['sql'].startswith('DELETE')]
+        self.assertEqual((len(inserts), len(deletes)), (1, 1))
+
+        response = self.client.post('/propertyamenities/set/', {'property': prop.id, 'amenities': wanted},
+                                    format='json')
+        self.assertEqual((response.data['created'], response.data['deleted']), (0, 0))
+
+    def test_set_many_properties_in_one_transaction(self):
+        first, second = self.properties
+        response = self.client.post('/propertyamenities/set/', [
+            {'property': first.id, 'amenities': [self.amenities[0].id]},
+            {'property': second.id, 'amenities': [self.amenities[1].id, 999]},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('999', str(response.data['amenity']))
+        self.assertFalse(PropertyAmenity.objects.exists())
+
+        response = self.client.post('/propertyamenities/set/', [
+            {'property': first.id, 'amenities': [self.amenities[0].id]},
+            {'property': second.id, 'amenities': []},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['property'] for row in response.data['results']], [first.id, second.id])
+        self.assertEqual(self.amenity_ids(first), {self.amenities[0].id})
+        self.assertEqual(self.amenity_ids(second), set())
+
+    def test_batch_create_and_list(self):
+        first, second = self.properties
+        PropertyAmenity.objects.create(property=first, amenity=self.amenities[0], notes='Existing')
+        rows = [
+            {'property': first.id, 'amenity': self.amenities[0].id, 'notes': 'Ignored'},
+            {'property': first.id, 'amenity': self.amenities[1].id},
+            {'property': second.id, 'amenity': self.amenities[2].id, 'notes': 'New'},
+        ]
+        with self.assertNumQueries(7):
+            # 2 id checks, SAVEPOINT, diff, INSERT, RELEASE, then the final read.
+            response = self.client.post('/propertyamenities/', rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(PropertyAmenity.objects.get(property=first, amenity=self.amenities[0]).notes, 'Existing')
+
+        response = self.client.get(f'/propertyamenities/?property={first.id},{second.id}')
+        self.assertEqual(len(response.data), 3)
+        response = self.client.get(f'/propertyamenities/?property={second.id}')
+        self.assertEqual([row['notes'] for row in response.data], ['New'])
+
+    @override_settings(PROPERTY_AMENITY_BATCH_MAX=5)
+    def test_batch_size_limit(self):
+        response = self.client.post('/propertyamenities/set/', {
+            'property': self.properties[0].id, 'amenities': [a.id for a in self.amenities[:6]],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(PROPERTY_DELETE_FILES_ASYNC=False)
+class MassDeleteTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.client = APIClient()
+        self.owner = Profile.objects.get(user=User.objects.create_user(username='owner', password='testpass'))
+        self.tenant = Profile.objects.get(user=User.objects.create_user(username='tenant', password='testpass'))
+        self.accra = Location.objects.create(country='Ghana', region='Greater Accra', city='Accra')
+        self.kumasi = Location.objects.create(country='Ghana', region='Ashanti', city='Kumasi')
+        self.wifi = Amenity.objects.create(name='Wifi')
+        self.properties = [
+            self.create_property(self.accra if i < 5 else self.kumasi, f'Lodge {i}') for i in range(7)
+        ]
+
+    def create_property(self, location, title):
+        prop = Property.objects.create(
+            owner=self.owner, title=title, description='Description', location=location,
+            property_type='LAND', price=1000,
+        )
+        Land.objects.create(property=prop, land_type='RESIDENTIAL', area=500)
+        PropertyAmenity.objects.create(property=prop, amenity=self.wifi)
+        PropertyImage.objects.create(
+            property=prop, image=default_storage.save(f'property_images/{title}.jpg', BytesIO(b'jpeg')),
+        )
+        Review.objects.create(property=prop, reviewer=self.tenant, rating=4, title='Nice', comment='Nice')
+        Favorite.objects.create(user=self.tenant, property=prop)
+        Inquiry.objects.create(property=prop, user=self.tenant, message='Available?')
+        return prop
+
+    def test_chunked_delete_removes_dependents_without_the_collector(self):
+        doomed = Property.objects.filter(location=self.accra)
+        names = list(PropertyImage.objects.filter(property__in=doomed).values_list('image', flat=True))
+        favorites.favorite_ids(self.tenant.id)
+        seen = []
+        with mock.patch('django.db.models.deletion.Collector.collect', side_effect=AssertionError), \
+                self.captureOnCommitCallbacks(execute=True):
+            counts = mass_delete.delete_queryset(doomed, chunk_size=2, progress=lambda *args: seen.append(args))
+
+        self.assertEqual(seen, [(2, 5), (4, 5), (5, 5)])
+        self.assertEqual(counts['property.Property'], 5)
+        for model in (Land, PropertyAmenity, PropertyImage, Review, Favorite, Inquiry):
+            self.assertEqual(counts[model._meta.label], 5)
+            self.assertEqual(model.objects.count(), 2)
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+        self.assertEqual(Profile.objects.get(pk=self.owner.pk).unread_inquiries, 2)
+        self.assertEqual(favorites.favorite_ids(self.tenant.id), {p.id for p in self.properties[5:]})
+        self.assertEqual(sorted(fulltext.search('Lodge', limit=10)), [p.id for p in self.properties[5:]])
+
+    def test_unscoped_delete_is_refused(self):
+        response = self.client.delete('/api/properties/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Property.objects.count(), 7)
+
+    def test_filters_that_filter_nothing_do_not_scope_a_delete(self):
+        for query in ('property_type=,', 'is_available=any', 'featured=any', 'city=', 'is_available=any&amenity=,'):
+            response = self.client.delete(f'/api/properties/?{query}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+        self.assertEqual(self.client.delete('/api/locations/?country=').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Property.objects.count(), 7)
+        self.assertEqual(mass_delete.applied_filters(Property, {'is_available': 'false', 'featured': 'any'}),
+                         ['is_available'])
+
+    def test_property_delete_uses_the_search_filters(self):
+        response = self.client.delete('/api/properties/?city=Kumasi')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted']['property.Property'], 2)
+        self.assertEqual(Property.objects.filter(location=self.kumasi).count(), 0)
+        self.assertEqual(Property.objects.count(), 5)
+
+        response = self.client.delete(f'/api/properties/?ids={self.properties[0].id}')
+        self.assertEqual(response.data['deleted']['property.Property'], 1)
+        response = self.client.delete('/api/properties/?all=true')
+        self.assertEqual(response.data['deleted']['property.Property'], 4)
+        self.assertFalse(Property.objects.exists())
+
+    def test_filtered_delete_includes_unavailable_listings(self):
+        hidden, kept = self.properties[5], self.properties[6]
+        Property.objects.filter(pk__in=[hidden.pk, kept.pk]).update(is_available=False)
+        response = self.client.delete('/api/properties/?city=Kumasi')
+        self.assertEqual(response.data['deleted']['property.Property'], 2)
+        self.assertFalse(Property.objects.filter(location=self.kumasi).exists())
+
+        response = self.client.delete(f'/api/properties/?ids={self.properties[0].pk}&is_available=false')
+        self.assertEqual(response.data['deleted'], {})
+        self.assertTrue(Property.objects.filter(pk=self.properties[0].pk).exists())
+
+    @override_settings(PROPERTY_DELETE_CHUNK_SIZE=2)
+    def test_location_delete_cascades_through_properties_in_chunks(self):
+        response = self.client.delete('/api/locations/?city=Accra')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted']['property.Location'], 1)
+        self.assertEqual(response.data['deleted']['property.Property'], 5)
+        self.assertEqual(response.data['deleted']['property.Review'], 5)
+        self.assertEqual(list(Location.objects.all()), [self.kumasi])
+        self.assertEqual(Review.objects.count(), 2)
+
+    def test_amenity_delete_keeps_properties(self):
+        response = self.client.delete('/api/amenities/?all=true')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted'], {'property.PropertyAmenity': 7, 'property.Amenity': 1})
+        self.assertEqual(Property.objects.count(), 7)
+
+    def test_management_command(self):
+        out = StringIO()
+        call_command('mass_delete', 'property', '--filter', 'city=Kumasi', '--chunk-size', '1', stdout=out)
+        self.assertIn('2/2 property rows deleted', out.getvalue())
+        self.assertEqual(Property.objects.count(), 5)
+
+
+class LocationResolverTests(TestCase):
+    def setUp(self):
+        locations.cache.clear()
+        self.addCleanup(locations.cache.clear)
+        self.client = APIClient()
+        self.owner = Profile.objects.get(user=User.objects.create_user(username='owner', password='testpass'))
+        self.accra = Location.objects.create(country='Ghana', region='Greater Accra', city='Accra')
+
+    def property_data(self, location, title='Plot'):
+        return {
+            'owner': self.owner.id, 'title': title, 'description': 'Description', 'location': location,
+            'property_type': 'LAND', 'price': '1000.00',
+        }
+
+    def location_queries(self, queries):
+        return [q['sql'] for q in queries if 'FROM "property_location"' in q['sql']]
+
+    def test_key_is_casefolded_whitespace_collapsed_and_null_safe(self):
+        self.assertEqual(self.accra.normalized_key, 'ghana|greater accra|accra||')
+        self.assertEqual(
+            locations.location_key({'country': ' GHANA', 'region': 'Greater   Accra', 'city': 'accra ', 'street': ''}),
+            self.accra.normalized_key,
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Location.objects.create(country='ghana', region='greater accra', city='ACCRA', district='')
+
+    def test_creating_a_known_location_returns_it(self):
+        response = self.client.post(
+            '/api/locations/', {'country': 'ghana ', 'region': 'GREATER ACCRA', 'city': 'Accra'}, format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['id'], self.accra.id)
+        self.assertEqual(Location.objects.count(), 1)
+
+    def test_update_into_another_location_is_rejected(self):
+        kumasi = Location.objects.create(country='Ghana', region='Ashanti', city='Kumasi')
+        response = self.client.put(
+            f'/api/location/{kumasi.id}/', {'country': 'Ghana', 'region': 'Greater Accra', 'city': 'ACCRA'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Location.objects.get(pk=kumasi.pk).city, 'Kumasi')
+
+    def test_property_create_resolves_nested_locations_through_the_cache(self):
+        fields = {'country': 'Ghana', 'region': 'Ashanti', 'city': 'Kumasi', 'district': 'Adum'}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/properties/', self.property_data(fields, 'First'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        kumasi = Location.objects.get(city='Kumasi')
+        self.assertEqual(response.data['location'], kumasi.id)
+
+        fields = {'country': 'ghana', 'region': ' ashanti', 'city': 'KUMASI', 'district': 'adum'}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/properties/', self.property_data(fields, 'Second'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['location'], kumasi.id)
+        self.assertEqual(self.location_queries(queries), [])
+        self.assertEqual(Location.objects.count(), 2)
+
+    def test_property_create_still_accepts_location_ids(self):
+        response = self.client.post('/api/properties/', self.property_data(self.accra.id), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/properties/', self.property_data(self.accra.id), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.location_queries(queries), [])
+
+        response = self.client.post('/api/properties/', self.property_data(self.accra.id + 100), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('location', response.data)
+
+    def test_import_matches_locations_by_normalized_key(self):
+        rows = [
+            {'title': 'A', 'description': 'D', 'property_type': 'LAND', 'price': '100', 'country': 'ghana',
+             'region': 'greater accra', 'city': 'ACCRA', 'land_type': 'RESIDENTIAL', 'area': '10'},
+            {'title': 'B', 'description': 'D', 'property_type': 'LAND', 'price': '100', 'country': 'Ghana',
+             'region': 'Ashanti', 'city': 'Kumasi', 'land_type': 'RESIDENTIAL', 'area': '10'},
+            {'title': 'C', 'description': 'D', 'property_type': 'LAND', 'price': '100', 'country': 'GHANA ',
+             'region': 'ashanti', 'city': 'kumasi', 'land_type': 'RESIDENTIAL', 'area': '10'},
+        ]
+        source = StringIO('\n'.join(json.dumps(row) for row in rows))
+        report = import_properties(source, 'jsonl', self.owner)
+        self.assertEqual(report.created, 3)
+        self.assertEqual(Location.objects.count(), 2)
+        self.assertEqual(Property.objects.get(title='A').location_id, self.accra.id)
+        self.assertEqual(Property.objects.filter(location__city__iexact='kumasi').count(), 2)
+
+    def test_dedupe_command_merges_and_repoints(self):
+        # Rows keyed by an older normalization, e.g. before NULL and '' were folded together.
+        stale = Location.objects.bulk_create([
+            Location(country='Ghana', region='Greater Accra', city='Accra', district='', normalized_key='old-1'),
+            Location(
+                country='Ghana', region='Ashanti', city='Kumasi', normalized_key='old-2', latitude=6.7, longitude=-1.6,
+            ),
+        ])
+        prop = Property.objects.create(
+            owner=self.owner, title='Plot', description='Description', location=stale[0],
+            property_type='LAND', price=1000,
+        )
+        out = StringIO()
+        call_command('dedupe_locations', stdout=out)
+        self.assertIn('Merged 1 duplicate locations; repointed 1 properties.', out.getvalue())
+        self.assertEqual(Property.objects.get(pk=prop.pk).location_id, self.accra.id)
+        self.assertEqual(
+            dict(Location.objects.values_list('id', 'normalized_key')),
+            {self.accra.id: 'ghana|greater accra|accra||', stale[1].id: 'ghana|ashanti|kumasi||'},
+        )
+
+
+class LocationNormalizedKeyMigrationTests(TransactionTestCase):
+    before = [('property', '0011_inquiry_inbox')]
+    after = [('property', '0012_location_normalized_key')]
+
+    def tearDown(self):
+        call_command('migrate', 'property', verbosity=0)
+
+    def test_near_duplicate_locations_are_merged(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        HistoricalUser = apps.get_model('auth', 'User')
+        HistoricalProfile = apps.get_model('property', 'Profile')
+        HistoricalLocation = apps.get_model('property', 'Location')
+        HistoricalProperty = apps.get_model('property', 'Property')
+
+        owner = HistoricalProfile.objects.create(user=HistoricalUser.objects.create(username='owner'))
+        kept = HistoricalLocation.objects.create(country='Ghana', region='Ashanti', city='Kumasi')
+        extra = HistoricalLocation.objects.create(
+            country='ghana ', region='ASHANTI', city='Kumasi', district='', latitude=6.7, longitude=-1.6,
+        )
+        other = HistoricalLocation.objects.create(country='Ghana', region='Greater Accra', city='Accra')
+        listing = HistoricalProperty.objects.create(
+            owner=owner, title='Listing', description='Description', location=extra,
+            property_type='LAND', price=100,
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        apps = executor.loader.project_state(self.after).apps
+        Location = apps.get_model('property', 'Location')
+        Property = apps.get_model('property', 'Property')
+
+        self.assertEqual(
+            dict(Location.objects.values_list('id', 'normalized_key')),
+            {kept.pk: 'ghana|ashanti|kumasi||', other.pk: 'ghana|greater accra|accra||'},
+        )
+        self.assertEqual(Location.objects.get(pk=kept.pk).latitude, 6.7)
+        self.assertEqual(Property.objects.get(pk=listing.pk).location_id, kept.pk)
+
+
+@override_settings(PROPERTY_DELETE_FILES_ASYNC=False)
+class LocationBrowseTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = Profile.objects.get(user=User.objects.create_user(username='owner', password='testpass'))
+        self.adum = Location.objects.create(country='Ghana', region='Ashanti', city='Kumasi', district='Adum')
+        self.bantama = Location.objects.create(country='ghana', region='ASHANTI', city='Kumasi ', district='Bantama')
+        self.accra = Location.objects.create(country='Ghana', region='Greater Accra', city='Accra')
+        self.properties = [
+            self.create_property(self.adum), self.create_property(self.adum),
+            self.create_property(self.bantama), self.create_property(self.accra),
+            self.create_property(self.accra, is_available=False),
+        ]
+
+    def create_property(self, location, is_available=True):
+        return Property.objects.create(
+            owner=self.owner, title='Plot', description='Description', location=location,
+            property_type='LAND', price=1000, is_available=is_available,
+        )
+
+    def counts(self):
+        return dict(LocationRollup.objects.filter(available__gt=0).values_list('path', 'available'))
+
+    def assertMatchesRebuild(self):
+        counts = self.counts()
+        browse.rebuild()
+        self.assertEqual(counts, self.counts())
+
+    def test_drill_down(self):
+        response = self.client.get('/api/locations/browse/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'level': 'country', 'parent': None, 'results': [{'name': 'Ghana', 'available': 4}],
+        })
+        response = self.client.get('/api/locations/browse/?country=GHANA')
+        self.assertEqual(response.data['level'], 'region')
+        self.assertEqual(response.data['parent'], {'name': 'Ghana', 'available': 4})
+        self.assertEqual(
+            response.data['results'], [{'name': 'Ashanti', 'available': 3}, {'name': 'Greater Accra', 'available': 1}],
+        )
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/locations/browse/?country=Ghana&region=Ashanti&city=kumasi')
+        self.assertEqual(response.data['level'], 'district')
+        self.assertEqual(
+            response.data['results'], [{'name': 'Adum', 'available': 2}, {'name': 'Bantama', 'available': 1}],
+        )
+
+    def test_bad_paths(self):
+        response = self.client.get('/api/locations/browse/?region=Ashanti')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/locations/browse/?country=Togo')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_signals_follow_availability_moves_and_deletes(self):
+        prop = self.properties[0]
+        prop.is_available = False
+        prop.save()
+        self.assertEqual(self.counts()['ghana|ashanti|kumasi|adum'], 1)
+        prop.is_available = True
+        prop.location = self.accra
+        prop.save()
+        self.assertEqual(self.counts()['ghana|ashanti|kumasi|adum'], 1)
+        self.assertEqual(self.counts()['ghana|greater accra|accra'], 2)
+        self.properties[4].is_available = True
+        self.properties[4].save()
+        self.properties[2].delete()
+        counts = self.counts()
+        self.assertEqual(counts['ghana'], 4)
+        self.assertNotIn('ghana|ashanti|kumasi|bantama', counts)
+        self.assertMatchesRebuild()
+
+    def test_renaming_a_location_moves_its_counts(self):
+        self.accra.city = 'Tema'
+        self.accra.save()
+        counts = self.counts()
+        self.assertEqual(counts['ghana|greater accra|tema'], 1)
+        self.assertNotIn('ghana|greater accra|accra', counts)
+        self.assertMatchesRebuild()
+
+    def test_bulk_paths_keep_counts(self):
+        rows = [
+            {'title': 'A', 'description': 'D', 'property_type': 'LAND', 'price': '100', 'country': 'Ghana',
+             'region': 'Ashanti', 'city': 'Kumasi', 'district': 'Adum', 'land_type': 'RESIDENTIAL', 'area': '10'},
+            {'title': 'B', 'description': 'D', 'property_type': 'LAND', 'price': '100', 'country': 'Ghana',
+             'region': 'Volta', 'city': 'Ho', 'is_available': 'false', 'land_type': 'RESIDENTIAL', 'area': '10'},
+        ]
+        import_properties(StringIO('\n'.join(json.dumps(row) for row in rows)), 'jsonl', self.owner)
+        self.assertEqual(self.counts()['ghana|ashanti|kumasi|adum'], 3)
+        self.assertMatchesRebuild()
+
+        mass_delete.delete_queryset(Location.objects.filter(pk=self.adum.pk))
+        self.assertEqual(self.counts()['ghana'], 2)
+        self.assertMatchesRebuild()
+
+    def test_rebuild_command(self):
+        LocationRollup.objects.update(available=0)
+        out = StringIO()
+        call_command('rebuild_location_rollup', stdout=out)
+        self.assertIn('Rebuilt 7 location browse nodes.', out.getvalue())
+        self.assertEqual(self.counts()['ghana|ashanti|kumasi'], 3)
+
+
+@override_settings(PROPERTY_DELETE_FILES_ASYNC=False)
+class AdminQueryCountTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        admin_user = User.objects.create_superuser(username='admin', password='testpass')
+        self.client.force_login(admin_user)
+        self.location = Location.objects.create(country='Ghana', region='Ashanti', city='Kumasi')
+        self.amenities = [Amenity.objects.create(name=f'Amenity {i}') for i in range(6)]
+        self.users = 0
+        self.properties = []
+
+    def add_rows(self, count):
+        for _ in range(count):
+            self.users += 1
+            owner = Profile.objects.get(user=User.objects.create_user(username=f'owner{self.users}', password='x'))
+            prop = Property.objects.create(
+                owner=owner, title=f'Plot {self.users}', description='Description', location=self.location,
+                property_type='LAND', price=1000,
+            )
+            Land.objects.create(property=prop, land_type='RESIDENTIAL', area=500)
+            PropertyAmenity.objects.create(property=prop, amenity=self.amenities[self.users % 6])
+            PropertyImage.objects.create(
+                property=prop, image=default_storage.save('property_images/plot.jpg', BytesIO(b'jpeg')),
+            )
+            Favorite.objects.create(user=owner, property=prop)
+            Inquiry.objects.create(property=prop, user=owner, message='Available?')
+            Review.objects.create(property=prop, reviewer=owner, rating=4, title='Nice', comment='Nice')
+            self.properties.append(prop)
+
+    def queries_for(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries]
+
+    def test_changelists_do_not_query_per_row(self):
+        urls = [
+            f'/admin/property/{name}/'
+            for name in ('property', 'propertyamenity', 'propertyimage', 'favorite', 'inquiry', 'review', 'land',
+                         'profile', 'location')
+        ]
+        self.add_rows(2)
+        before = {url: len(self.queries_for(url)) for url in urls}
+        self.add_rows(5)
+        after = {url: len(self.queries_for(url)) for url in urls}
+        self.assertEqual(before, after)
+
+    def test_unfiltered_changelist_does_not_count_the_table(self):
+        self.add_rows(3)
+        queries = self.queries_for('/admin/property/property/')
+        self.assertFalse([sql for sql in queries if 'COUNT(' in sql and 'property_property' in sql])
+        response = self.client.get('/admin/property/property/?is_available__exact=1')
+        self.assertEqual(response.context['cl'].result_count, 3)
+
+    def test_property_change_form_inlines_do_not_query_per_row(self):
+        self.add_rows(1)
+        prop = self.properties[0]
+        url = f'/admin/property/property/{prop.pk}/change/'
+        self.queries_for(url)  # Warms the content type cache.
+        before = len(self.queries_for(url))
+        for amenity in self.amenities[2:]:
+            PropertyAmenity.objects.create(property=prop, amenity=amenity)
+        for _ in range(3):
+            PropertyImage.objects.create(
+                property=prop, image=default_storage.save('property_images/plot.jpg', BytesIO(b'jpeg')),
+            )
+        self.assertEqual(len(self.queries_for(url)), before)
@@ -0,0 +1,186 @@
+"""
+Resized WebP/JPEG variants for PropertyImage.image and Profile.profile_picture.
+
+Variants are rendered in a ProcessPoolExecutor (no broker needed) after the
+upload's transaction commits, and their storage names are recorded in the
+model's ``variants`` JSON field as ``{"<size>_<format>": name}``. The pool
+uses the spawn start method and runs image_worker.render_variants, which
+does not import Django, so workers stay cheap and fork-safe.
+
+Settings:
+    PROPERTY_IMAGE_VARIANTS  {size name: max width/height in pixels}
+    PROPERTY_IMAGE_FORMATS   output formats, e.g. ['webp', 'jpeg']
+    PROPERTY_IMAGE_WORKERS   pool size (defaults to the CPU count)
+    PROPERTY_IMAGE_ASYNC     False renders inline, e.g. in tests
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from . import response_cache
+from .image_worker import render_variants
+from .models import Profile, PropertyImage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VARIANTS = {'thumb': 320, 'medium': 800, 'large': 1600}
+DEFAULT_FORMATS = ['webp', 'jpeg']
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+# model -> (image field, variants field)
+TARGETS = {
+    PropertyImage: ('image', 'variants'),
+    Profile: ('profile_picture', 'profile_picture_variants'),
+}
+
+
+def variant_specs():
+    sizes = getattr(settings, 'PROPERTY_IMAGE_VARIANTS', DEFAULT_VARIANTS)
+    formats = getattr(settings, 'PROPERTY_IMAGE_FORMATS', DEFAULT_FORMATS)
+    return [(size, width, fmt) for size, width in sizes.items() for fmt in formats]
+
+
+def variant_name(name, size, fmt):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'variants', f'{stem}_{size}.{EXTENSIONS[fmt]}')
+
+
+def build_job(name):
+    """Map an image's storage name to (source path, targets, {key: variant name})."""
+    targets = []
+    names = {}
+    for size, width, fmt in variant_specs():
+        key = f'{size}_{fmt}'
+        names[key] = variant_name(name, size, fmt)
+        targets.append((key, width, fmt, default_storage.path(names[key])))
+    return default_storage.path(name), targets, names
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def make_pool(workers=None):
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = make_pool(getattr(settings, 'PROPERTY_IMAGE_WORKERS', None))
+        return _executor
+
+
+def record_variants(model, pk, variants):
+    _, variants_field = TARGETS[model]
+    # update() rather than save(): it skips auto_now and our own post_save hook.
+    model.objects.filter(pk=pk).update(**{variants_field: variants})
+    if model is PropertyImage:
+        property_id = PropertyImage.objects.filter(pk=pk).values_list('property_id', flat=True).first()
+        if property_id is not None:
+            response_cache.invalidate_property(property_id)
+
+
+def generate_for(instance):
+    model = type(instance)
+    image_field, _ = TARGETS[model]
+    name = getattr(instance, image_field).name
+    if not name:
+        return
+    source, targets, names = build_job(name)
+
+    if not getattr(settings, 'PROPERTY_IMAGE_ASYNC', True):
+        try:
+            written = render_variants(source, targets)
+        except Exception:
+            logger.exception('Rendering variants for %s %s failed.', model.__name__, instance.pk)
+            return
+        record_variants(model, instance.pk, {key: names[key] for key in written})
+        return
+
+    future = get_executor().submit(render_variants, source, targets)
+
+    def done(future):
+        try:
+            written = future.result()
+            record_variants(model, instance.pk, {key: names[key] for key in written})
+        except Exception:
+            logger.exception('Rendering variants for %s %s failed.', model.__name__, instance.pk)
+        finally:
+            connections.close_all()
+
+    future.add_done_callback(done)
+
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_save, sender=Profile)
+def schedule_variants(sender, instance, raw=False, **kwargs):
+    image_field, _ = TARGETS[sender]
+    if raw or not getattr(instance, image_field) or has_current_variants(instance):
+        return
+    transaction.on_commit(lambda: generate_for(instance))
+
+
+def has_current_variants(instance):
+    """True when the recorded variants were rendered from the current file."""
+    image_field, variants_field = TARGETS[type(instance)]
+    name = getattr(instance, image_field).name
+    recorded = getattr(instance, variants_field) or {}
+    return bool(recorded) and all(
+        recorded.get(f'{size}_{fmt}') == variant_name(name, size, fmt)
+        for size, _, fmt in variant_specs()
+    )
+
+
+def backfill(model, workers=None, batch_size=100, force=False):
+    """
+    Render missing variants for every stored image of ``model`` across a
+    process pool. Returns (rendered, failed) counts.
+    """
+    image_field, variants_field = TARGETS[model]
+    queryset = model.objects.exclude(**{f'{image_field}__isnull': True}).exclude(**{image_field: ''})
+    queryset = queryset.only('pk', image_field, variants_field).order_by('pk')
+    rendered = failed = 0
+    with make_pool(workers) as pool:
+        batch = []
+        for instance in queryset.iterator(chunk_size=batch_size):
+            if force or not has_current_variants(instance):
+                batch.append(instance)
+            if len(batch) >= batch_size:
+                done, errors = _render_batch(pool, model, batch)
+                rendered, failed, batch = rendered + done, failed + errors, []
+        if batch:
+            done, errors = _render_batch(pool, model, batch)
+            rendered, failed = rendered + done, failed + errors
+    return rendered, failed
+
+
+def _render_batch(pool, model, batch):
+    image_field, variants_field = TARGETS[model]
+    jobs = []
+    for instance in batch:
+        source, targets, names = build_job(getattr(instance, image_field).name)
+        jobs.append((instance, names, pool.submit(render_variants, source, targets)))
+
+    updated, failed = [], 0
+    for instance, names, future in jobs:
+        try:
+            written = future.result()
+        except Exception:
+            logger.exception('Rendering variants for %s %s failed.', model.__name__, instance.pk)
+            failed += 1
+            continue
+        setattr(instance, variants_field, {key: names[key] for key in written})
+        updated.append(instance)
+    model.objects.bulk_update(updated, [variants_field])
+    return len(updated), failed
@@ -0,0 +1,150 @@
+"""
+Write-behind buffer for Property.views.
+
+Detail hits only bump an in-process counter. A daemon thread folds the
+pending counts into the database every PROPERTY_VIEW_FLUSH_INTERVAL seconds
+with one ``UPDATE ... SET views = views + CASE ... END`` per chunk of ids, so
+reads never wait on the SQLite writer lock.
+
+Settings:
+    PROPERTY_VIEW_FLUSH_INTERVAL  seconds between flushes; 0 writes through.
+    PROPERTY_VIEW_FLUSH_ON_ERROR  'requeue' keeps counts after a failed flush
+                                  and retries next interval, 'drop' discards.
+    PROPERTY_VIEW_MAX_PENDING     number of buffered ids that triggers an
+                                  early flush.
+
+``request_flush()`` (used by the ``flush_property_views`` command) leaves a
+marker in the default cache; every process polls it and flushes. Processes
+only see each other's marker when the cache backend is shared.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from .models import Property
+
+logger = logging.getLogger(__name__)
+
+FLUSH_REQUEST_KEY = 'property:views:flush-requested'
+CHUNK_SIZE = 500
+POLL_SECONDS = 1.0
+
+
+def flush_interval():
+    return getattr(settings, 'PROPERTY_VIEW_FLUSH_INTERVAL', 10)
+
+
+def apply_increments(counts):
+    """Add ``counts`` ({property_id: n}) to Property.views in batched UPDATEs."""
+    ids = sorted(counts)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        increment = Case(
+            *[When(pk=pk, then=Value(counts[pk])) for pk in chunk],
+            default=Value(0),
+            output_field=PositiveIntegerField(),
+        )
+        Property.objects.filter(pk__in=chunk).update(views=F('views') + increment)
+
+
+class ViewCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._wake = threading.Event()
+        self._thread = None
+        self._retry_at = 0.0
+        self._last_flush = time.monotonic()
+        self._seen_request = None
+
+    def record(self, pk, count=1):
+        if flush_interval() <= 0:
+            apply_increments({pk: count})
+            return
+        with self._lock:
+            self._pending[pk] += count
+            overflow = len(self._pending) >= getattr(settings, 'PROPERTY_VIEW_MAX_PENDING', 5000)
+        self._ensure_thread()
+        if overflow:
+            self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self):
+        """Write buffered counts now. Returns the number of properties updated."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+        try:
+            apply_increments(pending)
+        except DatabaseError:
+            policy = getattr(settings, 'PROPERTY_VIEW_FLUSH_ON_ERROR', 'requeue')
+            logger.exception('Flushing %d property view counts failed (%s).', len(pending), policy)
+            if policy == 'requeue':
+                with self._lock:
+                    self._pending.update(pending)
+            self._retry_at = time.monotonic() + flush_interval()
+            return 0
+        self._last_flush = time.monotonic()
+        return len(pending)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='property-view-counter', daemon=True)
+                self._thread.start()
+
+    def _flush_requested(self):
+        try:
+            requested = cache.get(FLUSH_REQUEST_KEY)
+        except Exception:
+            return False
+        if requested is None or requested == self._seen_request:
+            return False
+        self._seen_request = requested
+        return True
+
+    def _run(self):
+        while True:
+            woken = self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+            now = time.monotonic()
+            if now < self._retry_at:
+                continue
+            due = now - self._last_flush >= flush_interval()
+            if woken or due or self._flush_requested():
+                try:
+                    self.flush()
+                finally:
+                    connections.close_all()
+
+
+view_counter = ViewCounter()
+
+
+def record_view(pk):
+    view_counter.record(pk)
+
+
+def request_flush():
+    cache.set(FLUSH_REQUEST_KEY, time.time(), None)
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        view_counter.flush()
+    except Exception:
+        logger.exception('Could not flush property view counts at exit.')
@@ -1,27 +1,57 @@
+from django.conf import settings
+from django.db.models import Q
 from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from .models import Property, Favorite, Inquiry, Review, User
-from .serializers import PropertySerializer, FavoriteSerializer, InquirySerializer, ReviewSerializer
-from rest_framework.permissions import AllowAny
-from .serializers import RegisterSerializer, CustomTokenObtainPairSerializer, ProfileSerializer
-from rest_framework_simplejwt.views import TokenObtainPairView
+from .serializers import PropertySerializer, PropertyReadSerializer, FavoriteSerializer, FavoriteBulkSerializer, InquirySerializer, ReviewSerializer
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from .serializers import RegisterSerializer, CustomTokenObtainPairSerializer, ProfileSerializer, RevocableTokenRefreshSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
+from . import favorites, mass_delete
+from .authentication import HasProfile, get_profile_id, revoke_token, revoke_user
+from .filters import parse_ids
+from .pagination import PropertyCursorPagination
+from .response_cache import cached_response
+from .view_counter import record_view
+
+def wants_expanded(request):
+    return request.query_params.get('expand', '').lower() in ('1', 'true', 'yes')
+
 
 class PropertyView(APIView):
     def get(self, request, pk=None):
+        response = cached_response(request, 'property', pk, lambda: self.build_get(request, pk))
+        if pk is not None and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            record_view(pk)
+        return response
+
+    def build_get(self, request, pk=None):
+        if wants_expanded(request):
+            queryset = PropertyReadSerializer.setup_eager_loading(Property.objects.all())
+            serializer_class = PropertyReadSerializer
+        else:
+            # The plain serializer lists the amenity ids of every row.
+            queryset = Property.objects.prefetch_related('amenities')
+            serializer_class = PropertySerializer
+
         if pk is not None:
             try:
-                property_obj = Property.objects.get(pk=pk)
+                property_obj = queryset.get(pk=pk)
             except Property.DoesNotExist:
                 return Response({'error': 'Property not found.'}, status=status.HTTP_404_NOT_FOUND)
-            serializer = PropertySerializer(property_obj)
+            serializer = serializer_class(property_obj)
             return Response(serializer.data)
         else:
-            properties = Property.objects.all()
-            serializer = PropertySerializer(properties, many=True)
-            return Response(serializer.data)
+            paginator = PropertyCursorPagination()
+            page = paginator.paginate_queryset(queryset, request)
+            serializer = serializer_class(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         serializer = PropertySerializer(data=request.data)
@@ -53,25 +83,27 @@ class PropertyView(APIView):
             property_obj.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
         else:
-            Property.objects.all().delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
+            queryset = mass_delete.scoped_queryset(Property, request.query_params)
+            return Response({'deleted': mass_delete.delete_queryset(queryset)})
 
 class FavoriteView(APIView):
+    permission_classes = [IsAuthenticated, HasProfile]
+
     def get(self, request, pk=None):
         if pk:
             try:
-                favorite = Favorite.objects.get(pk=pk)
+                favorite = Favorite.objects.get(pk=pk, user_id=get_profile_id(request.user))
             except Favorite.DoesNotExist:
                 return Response({'error': 'Favorite not found'}, status=status.HTTP_404_NOT_FOUND)
             serializer = FavoriteSerializer(favorite)
             return Response(serializer.data)
-        favorites = Favorite.objects.filter(user=request.user.profile)
+        favorites = Favorite.objects.filter(user_id=get_profile_id(request.user))
         serializer = FavoriteSerializer(favorites, many=True)
         return Response(serializer.data)
 
     def post(self, request):
         data = request.data.copy()
-        data['user'] = request.user.profile.id
+        data['user'] = get_profile_id(request.user)
         serializer = FavoriteSerializer(data=data)
         if serializer.is_valid():
             serializer.save()
@@ -79,29 +111,66 @@ class FavoriteView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, pk):
+        profile_id = get_profile_id(request.user)
         try:
-            favorite = Favorite.objects.get(pk=pk, user=request.user.profile)
+            favorite = Favorite.objects.get(pk=pk, user_id=profile_id)
         except Favorite.DoesNotExist:
             return Response({'error': 'Favorite not found'}, status=status.HTTP_404_NOT_FOUND)
         favorite.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+class FavoriteLookupView(APIView):
+    """
+    ``GET ?ids=1,2,3`` -> ``{"favorites": {"1": true, "2": false, ...}}``.
+    Answered from the user's cached favorite id set.
+    """
+    permission_classes = [IsAuthenticated, HasProfile]
+
+    def get(self, request):
+        ids = parse_ids(request.query_params, 'ids')
+        max_batch = getattr(settings, 'PROPERTY_FAVORITES_MAX_BATCH', 200)
+        if len(ids) > max_batch:
+            raise ValidationError({'ids': f'At most {max_batch} ids per request.'})
+        return Response({'favorites': favorites.membership(get_profile_id(request.user), ids)})
+
+class FavoriteBulkView(APIView):
+    """
+    ``POST {"add": [...], "remove": [...]}``. Repeating a request is
+    harmless: ids already in the wanted state are reported as unchanged.
+    """
+    permission_classes = [IsAuthenticated, HasProfile]
+
+    def post(self, request):
+        serializer = FavoriteBulkSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        profile_id = get_profile_id(request.user)
+        added, missing = favorites.add_favorites(profile_id, serializer.validated_data['add'])
+        removed = favorites.remove_favorites(profile_id, serializer.validated_data['remove'])
+        return Response({'added': added, 'removed': removed, 'missing': missing})
+
 class InquiryView(APIView):
+    permission_classes = [IsAuthenticated, HasProfile]
+
     def get(self, request, pk=None):
         if pk:
+            profile_id = get_profile_id(request.user)
             try:
-                inquiry = Inquiry.objects.get(pk=pk)
+                # Visible to the sender and to the property's owner and manager.
+                inquiry = Inquiry.objects.get(
+                    Q(user_id=profile_id) | Q(property_owner_id=profile_id) | Q(property_manager_id=profile_id), pk=pk,
+                )
             except Inquiry.DoesNotExist:
                 return Response({'error': 'Inquiry not found'}, status=status.HTTP_404_NOT_FOUND)
             serializer = InquirySerializer(inquiry)
             return Response(serializer.data)
-        inquiries = Inquiry.objects.filter(user=request.user.profile)
+        inquiries = Inquiry.objects.filter(user_id=get_profile_id(request.user))
         serializer = InquirySerializer(inquiries, many=True)
         return Response(serializer.data)
 
     def post(self, request):
         data = request.data.copy()
-        data['user'] = request.user.profile.id
+        data['user'] = get_profile_id(request.user)
         serializer = InquirySerializer(data=data)
         if serializer.is_valid():
             serializer.save()
@@ -109,6 +178,8 @@ class InquiryView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class ReviewView(APIView):
+    permission_classes = [IsAuthenticated]
+
     def get(self, request, pk=None):
         if pk:
             try:
@@ -117,13 +188,13 @@ class ReviewView(APIView):
                 return Response({'error': 'Review not found'}, status=status.HTTP_404_NOT_FOUND)
             serializer = ReviewSerializer(review)
             return Response(serializer.data)
-        reviews = Review.objects.filter(reviewer=request.user.profile)
+        reviews = Review.objects.filter(reviewer_id=get_profile_id(request.user))
         serializer = ReviewSerializer(reviews, many=True)
         return Response(serializer.data)
 
     def post(self, request):
         data = request.data.copy()
-        data['reviewer'] = request.user.profile.id
+        data['reviewer'] = get_profile_id(request.user)
         serializer = ReviewSerializer(data=data)
         if serializer.is_valid():
             serializer.save()
@@ -138,7 +209,7 @@ class RegisterView(APIView):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
+            refresh = CustomTokenObtainPairSerializer.get_token(user)
             
             profile = ProfileSerializer(user.profile)
             
@@ -158,18 +229,50 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
     def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        
-        if response.status_code == 200:
-            user = User.objects.get(username=request.data['username'])
-            profile = ProfileSerializer(user.profile)
-            
-            response.data['user'] = {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email
-            }
-            response.data['profile'] = profile.data
-            
-        return response
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+
+        # Reuse the user the serializer authenticated; ProfileModelBackend
+        # fetched its profile in the same query.
+        user = serializer.user
+        profile = getattr(user, 'profile', None)
+        data = dict(serializer.validated_data)
+        data['user'] = {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email
+        }
+        data['profile'] = ProfileSerializer(profile).data if profile is not None else None
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class RevocableTokenRefreshView(TokenRefreshView):
+    serializer_class = RevocableTokenRefreshSerializer
+
+
+class LogoutView(APIView):
+    """
+    Revoke the access token of the request and, when given, the ``refresh``
+    token. ``all=true`` revokes every token issued to the user so far.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if request.auth is not None:
+            revoke_token(request.auth)
+        raw_refresh = request.data.get('refresh')
+        if raw_refresh:
+            try:
+                refresh = RefreshToken(raw_refresh)
+            except TokenError:
+                return Response({'error': 'Invalid refresh token.'}, status=status.HTTP_400_BAD_REQUEST)
+            if str(refresh.get(api_settings.USER_ID_CLAIM)) != str(request.user.id):
+                return Response({'error': 'Refresh token belongs to another user.'}, status=status.HTTP_400_BAD_REQUEST)
+            revoke_token(refresh)
+        if str(request.data.get('all', '')).lower() in ('1', 'true', 'yes'):
+            revoke_user(request.user.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 # Create your views here.